@@ -0,0 +1,643 @@
+"""
+Performance benchmarks for the bot's models
+Run a single benchmark with: python benchmarks.py <name>
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from models.batching import run_bucketed, token_lengths
+
+
+WORDS = (
+    "lol gg ok yeah no wait what bro that was actually insane did you see "
+    "the new update patch notes nerf buff server raid tonight anyone want "
+    "to play i think this is fine but honestly the matchmaking is broken"
+).split()
+
+
+def discord_messages(count, seed=0):
+    """
+    Build synthetic messages with a Discord-like length distribution
+
+    Most messages are a few words, some are a sentence or two, and a
+    small tail are long pastes.
+    """
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.70:
+            words = rng.randint(1, 8)
+        elif roll < 0.95:
+            words = rng.randint(9, 60)
+        else:
+            words = rng.randint(100, 300)
+        messages.append(" ".join(rng.choice(WORDS) for _ in range(words)))
+    return messages
+
+
+def bench_padding(args):
+    print("=" * 50)
+    print("BENCHMARK: LENGTH-BUCKETED PADDING")
+    print("=" * 50)
+
+    from models.sentiment_analyzer import SentimentAnalyzer
+
+    pipe = SentimentAnalyzer(model_type="basic").model
+    texts = discord_messages(args.messages)
+    tokens = sum(token_lengths(pipe.tokenizer, texts))
+
+    # Warm up both paths so one-off allocation costs are not measured
+    pipe(texts[:args.batch_size], batch_size=args.batch_size, truncation=True)
+    run_bucketed(pipe, texts[:args.batch_size], max_batch_size=args.batch_size)
+
+    start = time.perf_counter()
+    pipe(texts, batch_size=args.batch_size, truncation=True)
+    naive = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_bucketed(pipe, texts, max_batch_size=args.batch_size)
+    bucketed = time.perf_counter() - start
+
+    print(f"Messages: {len(texts)}, real tokens: {tokens}")
+    print(f"Arrival order: {naive:.2f}s ({tokens / naive:,.0f} tokens/s)")
+    print(f"Bucketed:      {bucketed:.2f}s ({tokens / bucketed:,.0f} tokens/s)")
+    print(f"Speedup: {naive / bucketed:.2f}x\n")
+
+
+def bench_chat(args):
+    print("=" * 50)
+    print("BENCHMARK: CHAT LATENCY OVER A LONG CONVERSATION")
+    print("=" * 50)
+
+    from models.chatbot import Chatbot
+
+    bot = Chatbot()
+    rng = random.Random(0)
+
+    for cached in (0, 8):
+        bot.max_cached_conversations = cached
+        state = bot.new_conversation()
+        latencies = []
+        for _ in range(args.turns):
+            message = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+            start = time.perf_counter()
+            bot.respond(message, state=state)
+            latencies.append(time.perf_counter() - start)
+
+        label = "KV-cache reuse" if cached else "Re-encode history"
+        first = sum(latencies[:5]) / 5
+        last = sum(latencies[-5:]) / 5
+        print(f"{label}: first 5 turns {first * 1000:.0f} ms/turn, "
+              f"last 5 turns {last * 1000:.0f} ms/turn")
+    print()
+
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+if {eager}:
+    import torch, transformers  # what importing the models used to cost
+import bot
+imported = time.perf_counter() - start
+print(f"import: {{imported:.2f}}s")
+
+if {connect}:
+    @bot.bot.listen('on_ready')
+    async def report_ready():
+        print(f"on_ready: {{time.perf_counter() - start:.2f}}s")
+        await bot.bot.close()
+
+    bot.bot.run(bot.TOKEN, log_handler=None)
+"""
+
+
+def bench_startup(args):
+    print("=" * 50)
+    print("BENCHMARK: STARTUP TIME")
+    print("=" * 50)
+
+    # Connecting needs a real token, otherwise only the import is timed
+    connect = bool(os.getenv('DISCORD_TOKEN'))
+    if not connect:
+        print("DISCORD_TOKEN not set, timing imports only")
+
+    for label, eager in (("Eager ML imports (before)", True), ("Deferred imports (after)", False)):
+        script = STARTUP_SCRIPT.format(eager=eager, connect=connect)
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        timings = ", ".join(
+            line for line in result.stdout.splitlines()
+            if line.startswith(("import:", "on_ready:"))
+        )
+        print(f"{label}: {timings or result.stderr.strip()[-200:]}")
+    print()
+
+
+EVAL_TEXTS = [
+    "I love this server, everyone is so nice",
+    "This is the worst update they have ever shipped",
+    "gg",
+    "You're stupid and useless!",
+    "I'm not sure how I feel about the new patch",
+    "Thanks for the help earlier, really appreciate it",
+    "shut up nobody asked you",
+    "The raid tonight was actually insane",
+]
+
+EVAL_CONTEXT = (
+    "Sive is a Discord bot written in Python. It uses transformer models for "
+    "sentiment analysis, content moderation, text generation, question "
+    "answering, and conversation. The bot was created in 2024 and runs on a "
+    "single CPU server."
+)
+EVAL_QUESTIONS = [
+    "What language is Sive written in?",
+    "When was the bot created?",
+    "What does the bot run on?",
+]
+EVAL_PROMPTS = ["Once upon a time", "The best thing about gaming is"]
+
+# Runs in a fresh interpreter per precision, so RSS only includes one model
+PRECISION_SCRIPT = """
+import json, time, torch
+torch.manual_seed(0)
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+model_key, precision = {model!r}, {precision!r}
+texts, context, questions, prompts = {texts!r}, {context!r}, {questions!r}, {prompts!r}
+baseline = rss_mb()
+start = time.perf_counter()
+
+if model_key == 'sentiment':
+    from models.sentiment_analyzer import SentimentAnalyzer
+    model = SentimentAnalyzer(model_type="basic", precision=precision)
+    run = lambda: [model.analyze(text) for text in texts]
+elif model_key == 'moderator':
+    from models.content_moderator import ContentModerator
+    model = ContentModerator(model_type="toxic", precision=precision)
+    run = lambda: [model.check(text) for text in texts]
+elif model_key == 'qa':
+    from models.qa_system import QASystem
+    model = QASystem(precision=precision)
+    run = lambda: [model.answer(q, context) for q in questions]
+elif model_key == 'generator':
+    from models.text_generator import TextGenerator
+    model = TextGenerator(precision=precision)
+    run = lambda: [model.generator(p, max_new_tokens=20, do_sample=False)[0]['generated_text']
+                   for p in prompts]
+else:
+    from models.chatbot import Chatbot
+    model = Chatbot(precision=precision)
+    # respond() samples, so compare greedy continuations instead
+    def run():
+        outputs = []
+        for p in prompts:
+            ids = model.tokenizer.encode(p + model.tokenizer.eos_token, return_tensors='pt')
+            out = model.model.generate(ids, attention_mask=torch.ones_like(ids), max_new_tokens=20,
+                                       do_sample=False, pad_token_id=model.tokenizer.eos_token_id)
+            outputs.append(model.tokenizer.decode(out[0, ids.shape[-1]:], skip_special_tokens=True))
+        return outputs
+
+load_seconds = time.perf_counter() - start
+run()  # warmup
+start = time.perf_counter()
+outputs = run()
+print("RESULT " + json.dumps({{
+    'load_seconds': load_seconds,
+    'latency_ms': (time.perf_counter() - start) * 1000 / len(outputs),
+    'rss_mb': rss_mb() - baseline,
+    'outputs': outputs,
+}}, default=float))
+"""
+
+
+def _drift(model_key, reference, outputs):
+    """Describe how far outputs are from the fp32 reference outputs"""
+    if model_key in ('sentiment', 'moderator'):
+        agree = sum(a['label'] == b['label'] for a, b in zip(reference, outputs))
+        field = 'score' if model_key == 'sentiment' else 'confidence'
+        diff = max(abs(a[field] - b[field]) for a, b in zip(reference, outputs))
+        return f"labels {agree}/{len(reference)} same, max score diff {diff:.4f}"
+    if model_key == 'qa':
+        agree = sum(a['answer'] == b['answer'] for a, b in zip(reference, outputs))
+        return f"answers {agree}/{len(reference)} same"
+    agree = sum(a == b for a, b in zip(reference, outputs))
+    return f"greedy outputs {agree}/{len(reference)} same"
+
+
+def bench_precision(args):
+    print("=" * 50)
+    print(f"BENCHMARK: MODEL PRECISION ({args.model})")
+    print("=" * 50)
+
+    reference = None
+    for precision in ("fp32", "bf16", "int8"):
+        script = PRECISION_SCRIPT.format(
+            model=args.model, precision=precision, texts=EVAL_TEXTS,
+            context=EVAL_CONTEXT, questions=EVAL_QUESTIONS, prompts=EVAL_PROMPTS
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        lines = [line for line in result.stdout.splitlines() if line.startswith("RESULT ")]
+        if not lines:
+            print(f"{precision}: failed: {result.stderr.strip()[-200:]}")
+            continue
+
+        data = json.loads(lines[-1][len("RESULT "):])
+        if precision == "fp32":
+            reference = data['outputs']
+            drift = "reference"
+        else:
+            drift = _drift(args.model, reference, data['outputs']) if reference else "no fp32 reference"
+        print(f"{precision}: {data['latency_ms']:.1f} ms/request, "
+              f"+{data['rss_mb']:.0f} MB RSS, load {data['load_seconds']:.1f}s, {drift}")
+    print()
+
+
+def bench_onnx(args):
+    print("=" * 50)
+    print(f"BENCHMARK: PYTORCH VS ONNX RUNTIME ({args.model})")
+    print("=" * 50)
+
+    if args.model == 'sentiment':
+        from models.sentiment_analyzer import SentimentAnalyzer
+        pipes = {b: SentimentAnalyzer(model_type="basic", backend=b).model for b in ("torch", "onnx")}
+    elif args.model == 'moderator':
+        from models.content_moderator import ContentModerator
+        pipes = {b: ContentModerator(model_type="toxic", backend=b).model for b in ("torch", "onnx")}
+    elif args.model == 'qa':
+        from models.qa_system import QASystem
+        pipes = {b: QASystem(backend=b).qa_pipeline for b in ("torch", "onnx")}
+    else:
+        print("The onnx backend covers the sentiment, moderator and qa models")
+        return
+
+    texts = discord_messages(32)
+    questions = [EVAL_QUESTIONS[i % len(EVAL_QUESTIONS)] for i in range(32)]
+
+    def run(pipe, batch_size):
+        if args.model == 'qa':
+            return pipe(question=questions[:batch_size], context=[EVAL_CONTEXT] * batch_size,
+                        batch_size=batch_size)
+        return pipe(texts[:batch_size], batch_size=batch_size, truncation=True)
+
+    for batch_size in (1, 2, 4, 8, 16, 32):
+        timings = {}
+        for backend, pipe in pipes.items():
+            run(pipe, batch_size)  # warmup
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                outputs = run(pipe, batch_size)
+            timings[backend] = (time.perf_counter() - start) * 1000 / args.repeats
+            if backend == "torch":
+                reference = outputs
+
+        outputs = outputs if isinstance(outputs, list) else [outputs]
+        reference = reference if isinstance(reference, list) else [reference]
+        same = sum(
+            (a['answer'] == b['answer']) if args.model == 'qa' else (a['label'] == b['label'])
+            for a, b in zip(reference, outputs)
+        )
+        print(f"batch {batch_size:2d}: torch {timings['torch']:7.1f} ms, "
+              f"onnx {timings['onnx']:7.1f} ms ({timings['torch'] / timings['onnx']:.2f}x), "
+              f"{same}/{len(outputs)} outputs match")
+    print()
+
+
+def bench_qa(args):
+    print("=" * 50)
+    print("BENCHMARK: MULTI-QUESTION AND LONG-DOCUMENT QA")
+    print("=" * 50)
+
+    from models.qa_system import QASystem
+
+    qa = QASystem()
+    rng = random.Random(0)
+    # 2k tokens, with the eval facts at the start
+    context = EVAL_CONTEXT + " " + " ".join(rng.choice(WORDS) for _ in range(2000))
+    offsets = qa.qa_pipeline.tokenizer(
+        context, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+    )['offset_mapping']
+    context = context[:offsets[min(2000, len(offsets)) - 1][1]]
+    print(f"Context: {min(2000, len(offsets))} tokens")
+
+    qa.answer_multiple(EVAL_QUESTIONS, context)  # warmup
+    for count in (1, 8, 32):
+        questions = [EVAL_QUESTIONS[i % len(EVAL_QUESTIONS)] for i in range(count)]
+
+        start = time.perf_counter()
+        looped = [qa.answer(q, context) for q in questions]
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = qa.answer_multiple(questions, context, batch_size=args.batch_size)
+        batch_seconds = time.perf_counter() - start
+
+        same = sum(a['answer'] == b['answer'] for a, b in zip(looped, batched))
+        print(f"{count:2d} questions: per-question {count / loop_seconds:5.1f} q/s, "
+              f"batched {count / batch_seconds:5.1f} q/s "
+              f"({loop_seconds / batch_seconds:.2f}x), {same}/{count} answers match")
+
+    # Long documents: every window vs the BM25-selected chunks only
+    question = EVAL_QUESTIONS[0]
+    for chars in (10000, 50000, 100000):
+        filler = " ".join(rng.choice(WORDS) for _ in range(chars // 5))
+        document = filler[:chars // 2] + " " + EVAL_CONTEXT + " " + filler[chars // 2:chars]
+
+        start = time.perf_counter()
+        full = qa.answer(question, document)
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        retrieved = qa.answer_long(question, document)
+        long_seconds = time.perf_counter() - start
+
+        print(f"{len(document):6d} chars: all windows {full_seconds:5.2f}s "
+              f"({full['answer']!r}), retrieval {long_seconds:5.2f}s ({retrieved['answer']!r})")
+    print()
+
+
+def bench_kb(args):
+    print("=" * 50)
+    print("BENCHMARK: KNOWLEDGE BASE RETRIEVAL")
+    print("=" * 50)
+
+    import tempfile
+    from models.knowledge_base import KnowledgeBase
+
+    rng = random.Random(0)
+    # A larger vocabulary than WORDS, so postings lists look like real text
+    vocabulary = WORDS + [f"term{i}" for i in range(5000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kb = KnowledgeBase(db_path=os.path.join(tmp, "kb.db"))
+
+        # ~10k chunks: 1000 documents of ~10 chunks each, added one by one
+        start = time.perf_counter()
+        for doc in range(1000):
+            text = " ".join(rng.choice(vocabulary) for _ in range(900))
+            kb.add_document(1, f"doc {doc}", text)
+        build_seconds = time.perf_counter() - start
+        stats = kb.stats()
+        print(f"Indexed {stats['documents']} documents / {stats['chunks']} chunks "
+              f"in {build_seconds:.1f}s ({build_seconds / stats['documents'] * 1000:.1f} ms/document)")
+
+        latencies = []
+        for _ in range(200):
+            query = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 10)))
+            start = time.perf_counter()
+            kb.search(1, query, top_k=3)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"Query latency: p50 {latencies[len(latencies) // 2]:.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)]:.1f} ms, max {latencies[-1]:.1f} ms")
+    print()
+
+
+def bench_cascade(args):
+    print("=" * 50)
+    print("BENCHMARK: CASCADE MODERATION")
+    print("=" * 50)
+
+    from models.content_moderator import ContentModerator
+    from models.cascade_moderator import CascadeModerator, LexicalModel
+
+    # Mostly chatter with some abuse mixed in, some of it not on the wordlist
+    rng = random.Random(1)
+    abuse = [
+        "you are so stupid", "shut up loser", "nobody likes you, you absolute clown",
+        "ur such a fkn waste of space", "go cry somewhere else you baby",
+        "this team is full of braindead morons", "i will find you",
+    ]
+    messages = discord_messages(args.messages * 2)
+    messages = [rng.choice(abuse) if rng.random() < 0.1 else m for m in messages]
+    train, test = messages[:args.messages], messages[args.messages:]
+
+    moderator = ContentModerator(model_type="toxic")
+    moderator.check_batch(test[:args.batch_size], batch_size=args.batch_size)
+
+    # Baseline: toxic-bert on every message
+    start = time.perf_counter()
+    reference = moderator.check_batch(test, batch_size=args.batch_size)
+    bert_seconds = time.perf_counter() - start
+
+    # Train tier 1 from toxic-bert's labels on the first half
+    cascade = CascadeModerator(moderator, linear_model=LexicalModel(), min_samples=0, audit_rate=0)
+    cascade.check_batch(train, batch_size=args.batch_size)
+    trained = cascade.stats()
+
+    cascade.counts = dict.fromkeys(cascade.counts, 0)
+    start = time.perf_counter()
+    results = cascade.check_batch(test, batch_size=args.batch_size)
+    cascade_seconds = time.perf_counter() - start
+    stats = cascade.stats()
+
+    flagged = [r['is_inappropriate'] for r in reference]
+    caught = sum(1 for r, f in zip(results, flagged) if f and r['is_inappropriate'])
+    false_alarms = sum(1 for r, f in zip(results, flagged) if not f and r['is_inappropriate'])
+
+    print(f"Trained on {trained['linear_samples']} labelled messages")
+    print(f"Test messages: {len(test)}, flagged by toxic-bert: {sum(flagged)}")
+    print(f"Cleared at tier 1: {stats['tier1_rate']:.1%} "
+          f"(wordlist hits: {stats['wordlist_hits']}, escalated: {stats['tier2']})")
+    print(f"toxic-bert only: {bert_seconds:.2f}s ({len(test) / bert_seconds:,.0f} msg/s)")
+    print(f"Cascade:         {cascade_seconds:.2f}s ({len(test) / cascade_seconds:,.0f} msg/s)")
+    print(f"Recall vs toxic-bert: {caught / sum(flagged) if sum(flagged) else 1.0:.1%}, "
+          f"extra flags: {false_alarms}\n")
+
+
+def _useful_tokens(tokenizer, ids, max_chars):
+    """How many of the generated ids it takes to fill max_chars of text"""
+    for count in range(1, len(ids) + 1):
+        if len(tokenizer.decode(ids[:count], skip_special_tokens=True)) >= max_chars:
+            return count
+    return len(ids)
+
+
+def bench_budget(args):
+    print("=" * 50)
+    print("BENCHMARK: DISCORD-SIZED GENERATION BUDGETS")
+    print("=" * 50)
+
+    import torch
+    from models.chatbot import Chatbot
+    from models.generation_control import EMBED_FIELD_LIMIT, MESSAGE_LIMIT, make_stopping_criteria
+    from models.text_generator import TextGenerator
+
+    generator = TextGenerator().generator
+    chatbot = Chatbot()
+
+    # (name, model, tokenizer, prompt ids, generate() length limit, characters Discord shows)
+    scenarios = []
+    for prompt in EVAL_PROMPTS:
+        ids = generator.tokenizer(prompt, add_special_tokens=False, return_tensors="pt").input_ids
+        scenarios.append((">>generate", generator.model, generator.tokenizer, ids,
+                          {'max_new_tokens': 100}, EMBED_FIELD_LIMIT - len(prompt)))
+    for message in ["Hi! How are you?", "Tell me a long story about dragons"]:
+        ids = chatbot.tokenizer.encode(message + chatbot.tokenizer.eos_token, return_tensors="pt")
+        scenarios.append((">>chat", chatbot.model, chatbot.tokenizer, ids,
+                          {'max_length': 1000}, MESSAGE_LIMIT))
+
+    for budgeted in (False, True):
+        totals = {}
+        for name, model, tokenizer, ids, limits, max_chars in scenarios:
+            criteria = make_stopping_criteria(
+                max_chars=max_chars, tokenizer=tokenizer, prompt_tokens=ids.shape[-1]
+            ) if budgeted else None
+            generated = useful = 0
+            start = time.perf_counter()
+            for seed in range(args.repeats):
+                torch.manual_seed(seed)
+                output = model.generate(
+                    ids, attention_mask=torch.ones_like(ids), do_sample=True, top_k=50, top_p=0.95,
+                    pad_token_id=tokenizer.eos_token_id, stopping_criteria=criteria, **limits
+                )
+                new_ids = output[0, ids.shape[-1]:].tolist()
+                generated += len(new_ids)
+                useful += _useful_tokens(tokenizer, new_ids, max_chars)
+            total = totals.setdefault(name, [0, 0, 0.0])
+            total[0] += generated
+            total[1] += useful
+            total[2] += time.perf_counter() - start
+
+        label = "Character budget" if budgeted else "Token limit only"
+        for name, (generated, useful, seconds) in totals.items():
+            wasted = (generated - useful) / generated if generated else 0.0
+            print(f"{label} {name}: {generated} tokens generated, {generated - useful} thrown away "
+                  f"({wasted:.1%}), {seconds:.2f}s")
+    print()
+
+
+# Runs in a fresh interpreter per pool size: ProcessPool must fork before
+# this process has run any inference (and started torch's thread pools).
+# workers=0 runs in-process on every core instead
+WORKERS_SCRIPT = """
+import json, os, time
+from models.content_moderator import ContentModerator
+from models.process_pool import ProcessPool
+
+workers, batch_size, messages = {workers!r}, {batch_size!r}, {messages!r}
+batches = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+moderator = ContentModerator(model_type="toxic")
+
+if workers:
+    pool = ProcessPool({{'moderator': moderator}}, num_workers=workers)
+    threads = pool.threads_per_worker
+    pool.call_each('moderator', 'check_batch', batches[0], batch_size=batch_size)
+    start = time.perf_counter()
+    futures = [pool.submit('moderator', 'check_batch', batch, batch_size=batch_size) for batch in batches]
+    for future in futures:
+        future.result()
+    seconds = time.perf_counter() - start
+    memory = [w for w in pool.stats() if w['private_mb'] is not None]
+    pool.shutdown()
+else:
+    import torch
+    threads = os.cpu_count() or 1
+    torch.set_num_threads(threads)
+    moderator.check_batch(batches[0], batch_size=batch_size)
+    start = time.perf_counter()
+    for batch in batches:
+        moderator.check_batch(batch, batch_size=batch_size)
+    seconds = time.perf_counter() - start
+    memory = []
+
+print("RESULT " + json.dumps({{
+    'rate': len(messages) / seconds,
+    'threads': threads,
+    'private_mb': sum(w['private_mb'] for w in memory) / len(memory) if memory else None,
+    'shared_mb': sum(w['shared_mb'] for w in memory) / len(memory) if memory else None,
+}}))
+"""
+
+
+def bench_workers(args):
+    print("=" * 50)
+    print("BENCHMARK: WORKER PROCESSES")
+    print("=" * 50)
+
+    messages = discord_messages(args.messages)
+    cores = os.cpu_count() or 1
+    print(f"{len(messages)} messages in batches of {args.batch_size}, {cores} cores\n")
+
+    baseline = None
+    # The last run is one process using every core, for comparison
+    for workers in list(range(1, args.workers + 1)) + [0]:
+        script = WORKERS_SCRIPT.format(workers=workers, batch_size=args.batch_size, messages=messages)
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        label = f"{workers} worker(s)" if workers else "In-process"
+        lines = [line for line in result.stdout.splitlines() if line.startswith("RESULT ")]
+        if not lines:
+            print(f"{label}: failed: {result.stderr.strip()[-200:]}")
+            continue
+
+        data = json.loads(lines[-1][len("RESULT "):])
+        baseline = baseline or data['rate']
+        if workers:
+            memory = (
+                f", per worker {data['private_mb']:.0f} MB own, {data['shared_mb']:.0f} MB shared"
+                if data['private_mb'] is not None else ""
+            )
+            print(f"{label} x {data['threads']} threads: {data['rate']:7,.0f} msg/s "
+                  f"({data['rate'] / baseline:.2f}x){memory}")
+        else:
+            print(f"{label}, {data['threads']} threads: {data['rate']:7,.0f} msg/s "
+                  f"({data['rate'] / baseline:.2f}x)")
+    print()
+
+
+BENCHMARKS = {
+    'padding': bench_padding,
+    'chat': bench_chat,
+    'startup': bench_startup,
+    'precision': bench_precision,
+    'onnx': bench_onnx,
+    'qa': bench_qa,
+    'kb': bench_kb,
+    'cascade': bench_cascade,
+    'budget': bench_budget,
+    'workers': bench_workers,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sive model benchmarks")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--messages', type=int, default=512,
+                        help="Number of synthetic messages")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--turns', type=int, default=50,
+                        help="Conversation length for the chat benchmark")
+    parser.add_argument('--model', default='moderator',
+                        choices=['sentiment', 'moderator', 'generator', 'qa', 'chatbot'],
+                        help="Model for the precision and onnx benchmarks")
+    parser.add_argument('--repeats', type=int, default=10,
+                        help="Timed runs per batch size for the onnx benchmark, "
+                             "samples per prompt for the budget benchmark")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Most worker processes for the workers benchmark")
+    args = parser.parse_args()
+
+    BENCHMARKS[args.benchmark](args)
@@ -3,101 +3,524 @@ Sive Discord ML Bot
 Discord bot with integrated Machine Learning models
 """
 
+import asyncio
+import random
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import os
+import functools
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-# Import ML models
-from models.sentiment_analyzer import SentimentAnalyzer
-from models.chatbot import Chatbot
-from models.content_moderator import ContentModerator
-from models.text_generator import TextGenerator
-from models.qa_system import QASystem
+# Import ML models (torch / transformers are only imported when a model loads)
+from models.conversation_store import ConversationStore
+from models.generation_control import (
+    CancellationToken, deadline_after, expired, MESSAGE_LIMIT, EMBED_FIELD_LIMIT
+)
+from models.cascade_moderator import CascadeModerator
+from models.micro_batcher import MicroBatcher
+from models.backend import use_torch_only
+from models.knowledge_base import KnowledgeBase
+from models.batch_worker import BatchWorker
+from models.guild_settings import GuildSettings
+from models.mood_tracker import MoodTracker
+from models.process_pool import ProcessPool
+from models.inference_client import InferenceClient
+from models.inference_executor import InferenceExecutor
+from models.setup import make_result_cache, make_registry, make_executor, preload_names, model_backend, data_path
 
 # Load environment variables
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
+# Keep transformers from importing TensorFlow (in requirements.txt) at load time
+if os.getenv('TORCH_ONLY', '1') != '0':
+    use_torch_only()
+
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='>>', intents=intents, help_command=None)
 
-# ML Models - Lazy Loading (loaded only when first used)
-sentiment_analyzer = None
-chatbot = None
-content_moderator = None
-text_generator = None
-qa_system = None
-
-# Store conversation contexts per user
-user_conversations = {}
-
-
-def get_sentiment_analyzer():
-    """Lazy load sentiment analyzer"""
-    global sentiment_analyzer
-    if sentiment_analyzer is None:
-        print("Loading Sentiment Analyzer...")
-        sentiment_analyzer = SentimentAnalyzer(model_type="basic")
-        print("✓ Sentiment Analyzer loaded")
-    return sentiment_analyzer
-
-
-def get_content_moderator():
-    """Lazy load content moderator"""
-    global content_moderator
-    if content_moderator is None:
-        print("Loading Content Moderator...")
-        content_moderator = ContentModerator(model_type="toxic")
-        print("✓ Content Moderator loaded")
-    return content_moderator
-
-
-def get_text_generator():
-    """Lazy load text generator"""
-    global text_generator
-    if text_generator is None:
-        print("Loading Text Generator...")
-        text_generator = TextGenerator()
-        print("✓ Text Generator loaded")
-    return text_generator
-
-
-def get_qa_system():
-    """Lazy load QA system"""
-    global qa_system
-    if qa_system is None:
-        print("Loading Q&A System...")
-        qa_system = QASystem()
-        print("✓ Q&A System loaded")
-    return qa_system
-
-
-def get_user_chatbot(user_id):
-    """Get or create chatbot for specific user (lazy load)"""
-    if user_id not in user_conversations:
-        print(f"Loading Chatbot for user {user_id}...")
-        user_conversations[user_id] = Chatbot()
-        print(f"✓ Chatbot loaded for user {user_id}")
-    return user_conversations[user_id]
+# Repeated messages ("gg", emotes, copypasta) reuse earlier sentiment and
+# moderation results. RESULT_CACHE_DB adds a sqlite tier that survives restarts
+result_cache = make_result_cache()
+
+# Cascade moderation: a wordlist and a small linear model clear obviously
+# clean messages before toxic-bert runs. The linear model learns from
+# toxic-bert's labels as the bot runs. MODERATION_CASCADE=0 disables it.
+moderation_cascade = None
+
+
+def track_cascade(moderator):
+    """Keep the loaded cascade around for >>stats"""
+    global moderation_cascade
+    moderation_cascade = moderator if isinstance(moderator, CascadeModerator) else None
+
+
+# ML Models - Lazy Loading (loaded on first use, unloaded when idle or
+# when another model needs the memory). MODEL_MEMORY_BUDGET_MB caps the
+# total weight memory, MODEL_IDLE_TIMEOUT unloads models unused that long.
+model_registry = make_registry(result_cache, on_moderator=track_cascade)
+
+# Models to load at startup instead of on first use ("all" or e.g.
+# "sentiment,moderator,chatbot"). PRELOAD_MODE=background loads them after
+# connecting without blocking the gateway, blocking loads them before connecting
+PRELOAD_MODELS = preload_names(model_registry)
+PRELOAD_MODE = os.getenv('PRELOAD_MODE', 'background')
+preload_task = None
+
+# Conversation contexts per user (history only, the model is shared). At most
+# CHAT_MAX_RESIDENT stay in memory; the rest live in CHAT_HISTORY_DB.
+# Opened by open_databases()
+CHAT_HISTORY_TOKENS = int(os.getenv('CHAT_HISTORY_TOKENS', '512'))
+
+
+def drop_chat_cache(state):
+    """Free the chatbot's cached keys/values of an evicted conversation"""
+    chatbot = model_registry.peek('chatbot')
+    if chatbot is not None:
+        chatbot.drop_cache(state)
+
+
+conversation_store = None
+
+
+# Client mode: with INFERENCE_SERVER set (unix:<socket path> or <host>:<port>),
+# every model call goes to a shared inference_server.py instead of loading
+# models in this process, so several shards on a host hold one copy of them.
+# INFERENCE_POOL_SIZE connections are kept open to it, and a call fails
+# after INFERENCE_CALL_TIMEOUT seconds without a response
+INFERENCE_SERVER = os.getenv('INFERENCE_SERVER') or None
+inference_client = InferenceClient(
+    INFERENCE_SERVER, pool_size=int(os.getenv('INFERENCE_POOL_SIZE', '4')),
+    request_timeout=float(os.getenv('INFERENCE_CALL_TIMEOUT', '120')) or None
+) if INFERENCE_SERVER else None
+if inference_client is not None and PRELOAD_MODELS:
+    print("⚠️ PRELOAD_MODELS is ignored with INFERENCE_SERVER (set it for the server instead)")
+    PRELOAD_MODELS = []
+
+# Multi-process serving: PROCESS_WORKERS > 0 loads the PROCESS_POOL_MODELS
+# once and forks that many worker processes, which share the weights
+# copy-on-write and run inference outside this process's GIL. Chat and
+# generation always run here (streaming, conversation state and cancellation
+# can't cross processes), and so do models on the ONNX backend, whose thread
+# pools don't survive fork()
+POOLABLE_MODELS = ('sentiment', 'moderator', 'qa')
+PROCESS_WORKERS = int(os.getenv('PROCESS_WORKERS', '0'))
+PROCESS_POOL_MODELS = []
+if PROCESS_WORKERS > 0 and inference_client is not None:
+    print("⚠️ PROCESS_WORKERS is ignored with INFERENCE_SERVER")
+elif PROCESS_WORKERS > 0:
+    for name in os.getenv('PROCESS_POOL_MODELS', ','.join(POOLABLE_MODELS)).split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in POOLABLE_MODELS:
+            print(f"⚠️ {name} can't run in worker processes, keeping it in the bot process")
+        elif model_backend(name) == 'onnx':
+            print(f"⚠️ {name} uses the ONNX backend, keeping it in the bot process")
+        else:
+            PROCESS_POOL_MODELS.append(name)
+process_pool = None
+
+
+def reopen_after_fork(index):
+    """
+    Set up a freshly forked worker process: its own sqlite connection for
+    the result cache, and only worker 0 trains and saves the cascade's
+    linear model (the others reload its saves)
+    """
+    if result_cache is not None:
+        result_cache.reopen()
+    moderator = model_registry.peek('moderator')
+    if index > 0 and isinstance(moderator, CascadeModerator):
+        moderator.linear_model.read_only = True
+
+
+def start_process_pool():
+    """Load the pooled models and fork the workers (before any inference or threads)"""
+    global process_pool
+    models = {name: model_registry.get(name, warmup=False) for name in PROCESS_POOL_MODELS}
+    process_pool = ProcessPool(
+        models,
+        num_workers=PROCESS_WORKERS,
+        threads_per_worker=int(os.getenv('PROCESS_WORKER_THREADS', '0')) or None,
+        after_fork=reopen_after_fork,
+        call_timeout=float(os.getenv('PROCESS_CALL_TIMEOUT', '120')) or None
+    )
+    print(f"✓ {PROCESS_WORKERS} model worker processes serving {', '.join(PROCESS_POOL_MODELS)} "
+          f"({process_pool.threads_per_worker} torch threads each)")
+
+
+# Inference runs on worker threads so the event loop keeps the gateway alive.
+# Queued jobs run by priority (moderation > classification > QA > generation)
+# and take turns across guilds and users.
+# MAX_IN_FLIGHT_<MODEL> limits concurrent jobs per model (e.g. MAX_IN_FLIGHT_SENTIMENT=2),
+# INFERENCE_QUOTA_<CLASS> the workers the jobs of a class may hold
+# With worker processes, pooled models default to one job per process.
+# In client mode the threads only wait on the inference server, which does
+# the real scheduling and batching (and reads INFERENCE_WORKERS from the
+# shared .env), so there are many of them and no per-model limit
+CLIENT_MODE_THREADS = 32
+if inference_client is not None:
+    inference = InferenceExecutor(
+        max_workers=CLIENT_MODE_THREADS,
+        default_max_in_flight=CLIENT_MODE_THREADS
+    )
+else:
+    inference = make_executor(
+        model_registry.names(),
+        default_workers=max(2, PROCESS_WORKERS + 1),
+        default_in_flight={key: PROCESS_WORKERS for key in PROCESS_POOL_MODELS}
+    )
+
+
+def call_model(model_key, method, *args, **kwargs):
+    """Load a model if needed and call one of its methods (blocking)"""
+    if inference_client is not None:
+        return inference_client.call(model_key, method, *args, **kwargs)
+    if process_pool is not None and model_key in process_pool.models:
+        return process_pool.call(model_key, method, *args, **kwargs)
+    with model_registry.use(model_key) as model:
+        return getattr(model, method)(*args, **kwargs)
+
+
+def tenant_of(ctx):
+    """Who a command's inference runs for, for fair scheduling"""
+    return (ctx.guild.id if ctx.guild else None, ctx.author.id)
+
+
+async def infer(model_key, method, *args, tenant=None, **kwargs):
+    """Run a model method on the inference executor"""
+    return await inference.run(
+        model_key, call_model, model_key, method, *args, tenant=tenant, **kwargs
+    )
+
+
+# Concurrent classifier requests are grouped into one padded forward pass.
+# BATCH_MAX_SIZE / BATCH_MAX_WAIT_MS trade a few ms of latency for throughput
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '16'))
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '5'))
+
+sentiment_batcher = MicroBatcher(
+    functools.partial(call_model, 'sentiment', 'analyze_batch'),
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    executor=inference,
+    model_key='sentiment'
+)
+
+moderation_batcher = MicroBatcher(
+    functools.partial(call_model, 'moderator', 'check_batch'),
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    executor=inference,
+    model_key='moderator'
+)
+
+# Per-server settings (>>automod, >>mood on), saved so they survive
+# restarts. Opened by open_databases()
+GUILD_SETTING_DEFAULTS = {
+    'automod_enabled': False,
+    'automod_threshold': 0.7,
+    'automod_action': 'react',
+    'automod_log_channel': None,
+    'mood_enabled': False,
+}
+guild_settings = None
+AUTOMOD_ACTIONS = ('react', 'warn', 'delete')
+automod_flagged = 0
+
+
+async def automod_batch(messages):
+    """Score a batch of messages and act on the inappropriate ones"""
+    global automod_flagged
+    
+    # Messages checked at the same threshold share a model call
+    by_threshold = {}
+    for message in messages:
+        threshold = guild_settings.get(message.guild.id)['automod_threshold']
+        by_threshold.setdefault(threshold, []).append(message)
+    
+    for threshold, group in by_threshold.items():
+        results = await infer(
+            'moderator', 'check_batch', [m.content for m in group], threshold=threshold
+        )
+        for message, result in zip(group, results):
+            if result['is_inappropriate']:
+                automod_flagged += 1
+                await automod_act(message, result)
+
+
+async def automod_act(message, result):
+    """Apply the guild's auto-moderation action to a flagged message"""
+    settings = guild_settings.get(message.guild.id)
+    action = settings['automod_action']
+    
+    try:
+        if action == 'delete':
+            await message.delete()
+        elif action == 'warn':
+            await message.reply(f"⚠️ {message.author.mention}, please keep it civil.")
+        else:
+            await message.add_reaction('⚠️')
+    except (discord.Forbidden, discord.NotFound):
+        # Missing permissions, or the message is already gone
+        pass
+    
+    log_channel = settings['automod_log_channel'] and message.guild.get_channel(settings['automod_log_channel'])
+    if log_channel:
+        embed = discord.Embed(title="🛡️ Auto-Moderation", color=discord.Color.red())
+        embed.add_field(name="Author", value=message.author.mention, inline=True)
+        embed.add_field(name="Channel", value=message.channel.mention, inline=True)
+        embed.add_field(name="Action", value=action, inline=True)
+        embed.add_field(name="Message", value=message.content[:1000], inline=False)
+        embed.add_field(name="Confidence", value=f"{result['label']} {result['confidence']:.2%}", inline=True)
+        try:
+            await log_channel.send(embed=embed)
+        except discord.Forbidden:
+            pass
+
+
+# Messages wait here for automod_batch. A full queue drops the oldest
+# messages by default, so a raid cannot grow memory without limit
+automod_worker = BatchWorker(
+    automod_batch,
+    max_queue=int(os.getenv('AUTOMOD_QUEUE_SIZE', '1000')),
+    max_batch_size=int(os.getenv('AUTOMOD_BATCH_SIZE', '32')),
+    max_wait_ms=float(os.getenv('AUTOMOD_MAX_WAIT_MS', '50')),
+    policy=os.getenv('AUTOMOD_QUEUE_POLICY', 'drop_oldest'),
+    name='automod'
+)
+
+
+# >>mood: in servers that opted in (>>mood on), a sample of messages is
+# scored for sentiment and added to per-channel and per-guild counters (no
+# message text is kept). MOOD_SAMPLE_RATE=0 turns it off everywhere
+MOOD_SAMPLE_RATE = float(os.getenv('MOOD_SAMPLE_RATE', '0.2'))
+MOOD_WINDOWS = (("5 min", 300), ("1 hour", 3600), ("24 hours", 86400))
+mood_tracker = MoodTracker()
+
+
+async def mood_batch(messages):
+    """Score a batch of sampled messages and add them to the mood counters"""
+    results = await infer('sentiment', 'analyze_batch', [m.content for m in messages])
+    for message, result in zip(messages, results):
+        timestamp = message.created_at.timestamp()
+        mood_tracker.record(('channel', message.channel.id), result, timestamp)
+        mood_tracker.record(('guild', message.guild.id), result, timestamp)
+
+
+# Mood is a trend, so under load sampled messages are simply dropped
+mood_worker = BatchWorker(
+    mood_batch,
+    max_queue=int(os.getenv('MOOD_QUEUE_SIZE', '500')),
+    max_batch_size=32,
+    max_wait_ms=500,
+    policy='drop_newest',
+    name='mood'
+)
+
+
+# Stream chat / generation output by editing the reply as tokens arrive.
+# Edits are coalesced to at most one per STREAM_EDIT_INTERVAL seconds to stay
+# well inside Discord's message-edit rate limit
+STREAM_REPLIES = os.getenv('STREAM_REPLIES', '1') != '0'
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))
+
+
+class StreamingReply:
+    def __init__(self, ctx, render, interval=STREAM_EDIT_INTERVAL):
+        """
+        A reply message that is edited as generated text arrives
+        
+        Args:
+            ctx: Command context to reply in
+            render: Callable (text, done) -> kwargs for send()/edit()
+            interval: Minimum seconds between edits
+        """
+        self.ctx = ctx
+        self.render = render
+        self.interval = interval
+        self.text = ""
+        self.message = None
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._task = None
+    
+    async def start(self):
+        """Post the initial message"""
+        self.message = await self.ctx.send(**self.render(self.text, False))
+        self._task = asyncio.create_task(self._edit_loop())
+    
+    def push(self, text):
+        """Add generated text (safe to call from inference threads)"""
+        self._loop.call_soon_threadsafe(self._append, text)
+    
+    def _append(self, text):
+        self.text += text
+        self._changed.set()
+    
+    async def _edit_loop(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            try:
+                await self.message.edit(**self.render(self.text, False))
+            except discord.HTTPException:
+                pass
+            await asyncio.sleep(self.interval)
+    
+    def stop(self):
+        """Stop editing the message"""
+        if self._task is not None:
+            self._task.cancel()
+    
+    async def finish(self, text):
+        """Stop streaming and show the final text"""
+        self.stop()
+        await self.message.edit(**self.render(text, True))
+
+
+# >>chat / >>generate stop after GENERATION_TIMEOUT seconds (time spent queued
+# included) and reply with what they have so far
+GENERATION_TIMEOUT = float(os.getenv('GENERATION_TIMEOUT', '60')) or None
+CUT_SHORT = " *(cut short)*"
+CANCELLED = " *(cancelled)*"
+
+# Decoding stops once a reply fills what Discord can show (a message for
+# >>chat, an embed field for >>generate), leaving room for the notes above
+CHAT_MAX_CHARS = MESSAGE_LIMIT - len(CUT_SHORT)
+GENERATE_MAX_CHARS = EMBED_FIELD_LIMIT - len(CUT_SHORT)
+
+# User ID -> CancellationToken of their reply in progress. A new >>chat or
+# >>resetchat cancels it, so no CPU goes to a reply nobody will read
+chat_generations = {}
+
+
+def render_chat(text, done):
+    """Message content for a (streaming) chat reply"""
+    if done:
+        return {'content': text[:MESSAGE_LIMIT] or "..."}
+    return {'content': (text + " ▌")[:MESSAGE_LIMIT] if text else "💬 ..."}
+
+
+def render_generation(prompt):
+    """Build the embed renderer for a (streaming) >>generate reply"""
+    def render(text, done):
+        if not done:
+            text = prompt + text + " ▌"
+        embed = discord.Embed(title="✨ Text Generation", color=discord.Color.purple())
+        embed.add_field(name="Prompt", value=prompt[:500], inline=False)
+        embed.add_field(name="Generated Text", value=text[:EMBED_FIELD_LIMIT], inline=False)
+        return {'embed': embed}
+    return render
+
+
+@tasks.loop(seconds=60)
+async def unload_idle_models():
+    """Periodically unload models that have been idle too long"""
+    await asyncio.get_running_loop().run_in_executor(None, model_registry.evict_idle)
+
+
+async def preload_models(names):
+    """Load models one by one in the background"""
+    loop = asyncio.get_running_loop()
+    for name in names:
+        # Commands that need this model meanwhile wait for this load
+        await loop.run_in_executor(None, model_registry.get, name)
+    print(f'✓ Preloaded models: {", ".join(names)}')
+
+
+@tasks.loop(seconds=60)
+async def evict_idle_conversations():
+    """Periodically move idle conversations out of memory"""
+    await asyncio.get_running_loop().run_in_executor(None, conversation_store.evict_idle)
+
+
+def open_databases():
+    """Open the sqlite files (by default under DATA_DIR)"""
+    global conversation_store, knowledge_base, guild_settings
+    chat_db = os.getenv('CHAT_HISTORY_DB')
+    conversation_store = ConversationStore(
+        max_history_tokens=CHAT_HISTORY_TOKENS,
+        max_resident=int(os.getenv('CHAT_MAX_RESIDENT', '1000')),
+        idle_ttl=float(os.getenv('CHAT_IDLE_TTL', '1800')) or None,
+        # Set but empty: keep histories in memory only
+        db_path=data_path('conversations.db') if chat_db is None else chat_db or None,
+        on_evict=drop_chat_cache
+    )
+    knowledge_base = KnowledgeBase(
+        db_path=os.getenv('QA_KB_DB') or data_path('knowledge_base.db'),
+        max_documents=int(os.getenv('QA_KB_MAX_DOCUMENTS', '200')) or None,
+        max_mb=float(os.getenv('QA_KB_MAX_MB', '20')) or None
+    )
+    guild_settings = GuildSettings(
+        GUILD_SETTING_DEFAULTS,
+        db_path=os.getenv('GUILD_SETTINGS_DB') or data_path('guild_settings.db')
+    )
+
+
+@bot.event
+async def setup_hook():
+    """Runs once after login, before any gateway events arrive"""
+    open_databases()
 
 
 @bot.event
 async def on_ready():
+    global preload_task
     print(f'✓ {bot.user} has connected to Discord!')
     print(f'✓ Bot is in {len(bot.guilds)} server(s)')
-    print(f'✓ Models will load on first use (lazy loading enabled)')
+    if PRELOAD_MODELS and PRELOAD_MODE == 'background':
+        # on_ready fires again after reconnects, only preload once
+        if preload_task is None:
+            print(f'✓ Preloading models in the background: {", ".join(PRELOAD_MODELS)}')
+            preload_task = asyncio.create_task(preload_models(PRELOAD_MODELS))
+    elif not PRELOAD_MODELS:
+        print(f'✓ Models will load on first use (lazy loading enabled)')
+    if model_registry.idle_timeout and not unload_idle_models.is_running():
+        unload_idle_models.start()
+    if conversation_store.idle_ttl and not evict_idle_conversations.is_running():
+        evict_idle_conversations.start()
     await bot.change_presence(activity=discord.Game(name=">>help for commands"))
 
 
+@bot.listen('on_message')
+async def automod_on_message(message):
+    """Queue guild messages for auto-moderation where it is enabled"""
+    if message.author.bot or message.guild is None or not message.content:
+        return
+    if not guild_settings.get(message.guild.id)['automod_enabled']:
+        return
+    # Command text is posted in the channel too, so only >>moderate (which
+    # exists to test text) is exempt; ">>x <abuse>" is still checked
+    ctx = await bot.get_context(message)
+    if ctx.valid and ctx.command.name == 'moderate':
+        return
+    await automod_worker.put(message)
+
+
+@bot.listen('on_message')
+async def mood_on_message(message):
+    """Sample guild messages for >>mood"""
+    if message.author.bot or message.guild is None or not message.content:
+        return
+    if not guild_settings.get(message.guild.id)['mood_enabled'] or random.random() >= MOOD_SAMPLE_RATE:
+        return
+    # Commands aren't conversation
+    ctx = await bot.get_context(message)
+    if ctx.valid:
+        return
+    await mood_worker.put(message)
+
+
 @bot.command(name='analyze', help='Analyze sentiment of text. Usage: >>analyze <text>')
 async def analyze_sentiment(ctx, *, text: str):
     """Analyze sentiment of the given text"""
     async with ctx.typing():
-        analyzer = get_sentiment_analyzer()
-        result = analyzer.analyze(text)
+        result = await sentiment_batcher.submit(text)
         
         # Create embed for better visualization
         embed = discord.Embed(title="📊 Sentiment Analysis", color=discord.Color.blue())
@@ -108,16 +531,117 @@ async def analyze_sentiment(ctx, *, text: str):
         await ctx.send(embed=embed)
 
 
+@bot.command(name='mood', help='Show the sentiment trend of this channel or server. Usage: >>mood [server|on|off]')
+async def show_mood(ctx, scope: str = 'channel'):
+    """Report rolling sentiment over the last 5 minutes, hour and day"""
+    if ctx.guild is None:
+        await ctx.send("⚠️ Mood tracking only works in servers.")
+        return
+    if scope in ('on', 'off'):
+        if not ctx.author.guild_permissions.manage_guild:
+            await ctx.send("⚠️ Turning mood tracking on or off requires Manage Server.")
+            return
+        guild_settings.update(ctx.guild.id, mood_enabled=(scope == 'on'))
+        await ctx.send(
+            "✓ Mood tracking is on: a sample of messages here is scored for sentiment (no text is kept)."
+            if scope == 'on' else "✓ Mood tracking is off."
+        )
+        return
+    if scope not in ('channel', 'server'):
+        await ctx.send("⚠️ Usage: `>>mood`, `>>mood server` or `>>mood on|off`")
+        return
+    if MOOD_SAMPLE_RATE <= 0:
+        await ctx.send("⚠️ Mood tracking is turned off.")
+        return
+    if not guild_settings.get(ctx.guild.id)['mood_enabled']:
+        await ctx.send("⚠️ Mood tracking is off in this server. Someone with Manage Server can turn it on with `>>mood on`.")
+        return
+    
+    if scope == 'server':
+        key, where = ('guild', ctx.guild.id), ctx.guild.name
+    else:
+        key, where = ('channel', ctx.channel.id), ctx.channel.mention
+    
+    embed = discord.Embed(
+        title="🌡️ Mood",
+        description=f"Sentiment of sampled messages in {where}",
+        color=discord.Color.blue()
+    )
+    moods = []
+    for name, seconds in MOOD_WINDOWS:
+        mood = mood_tracker.query(key, seconds)
+        moods.append(mood)
+        if mood['messages']:
+            value = (
+                f"mood: {mood['mood']:+.2f}\n"
+                f"😊 {mood['positive']:.0%} · 😠 {mood['negative']:.0%}\n"
+                f"{mood['messages']} messages sampled"
+            )
+        else:
+            value = "no messages yet"
+        embed.add_field(name=f"Last {name}", value=value, inline=True)
+    
+    # Compare the last 5 minutes with the last hour
+    recent, hour = moods[0], moods[1]
+    if recent['messages'] and hour['messages']:
+        change = recent['mood'] - hour['mood']
+        trend = "📈 improving" if change > 0.1 else "📉 souring" if change < -0.1 else "➡️ steady"
+        embed.set_footer(text=f"Trend: {trend}")
+    
+    await ctx.send(embed=embed)
+
+
+@asynccontextmanager
+async def held_conversation(user_id):
+    """Hold a user's conversation for one turn, loading and saving it off the event loop"""
+    conversation = await asyncio.to_thread(conversation_store.acquire, user_id)
+    try:
+        yield conversation
+    finally:
+        await asyncio.to_thread(conversation_store.release, user_id)
+
+
 @bot.command(name='chat', help='Chat with AI. Usage: >>chat <message>')
 async def chat_with_bot(ctx, *, message: str):
     """Have a conversation with the AI chatbot"""
     async with ctx.typing():
         user_id = str(ctx.author.id)
         
-        user_bot = get_user_chatbot(user_id)
-        response = user_bot.respond(message)
+        previous = chat_generations.get(user_id)
+        if previous is not None:
+            previous.cancel()
+        cancel_token = chat_generations[user_id] = CancellationToken()
+        deadline = deadline_after(GENERATION_TIMEOUT)
         
-        await ctx.send(response)
+        try:
+            # Held for the whole turn, so it is not evicted mid-reply
+            async with held_conversation(user_id) as conversation:
+                if STREAM_REPLIES:
+                    reply = StreamingReply(ctx, render_chat)
+                    await reply.start()
+                    try:
+                        response = await infer(
+                            'chatbot', 'respond', message, state=conversation, on_text=reply.push,
+                            deadline=deadline, cancel_token=cancel_token, max_chars=CHAT_MAX_CHARS,
+                            tenant=tenant_of(ctx)
+                        )
+                    finally:
+                        reply.stop()
+                    if cancel_token.cancelled:
+                        await reply.finish(reply.text + CANCELLED)
+                    else:
+                        await reply.finish(response + (CUT_SHORT if expired(deadline) else ""))
+                else:
+                    response = await infer(
+                        'chatbot', 'respond', message, state=conversation,
+                        deadline=deadline, cancel_token=cancel_token, max_chars=CHAT_MAX_CHARS,
+                        tenant=tenant_of(ctx)
+                    )
+                    if not cancel_token.cancelled:
+                        await ctx.send(response + (CUT_SHORT if expired(deadline) else ""))
+        finally:
+            if chat_generations.get(user_id) is cancel_token:
+                del chat_generations[user_id]
 
 
 @bot.command(name='resetchat', help='Reset your conversation history')
@@ -125,8 +649,11 @@ async def reset_chat(ctx):
     """Reset conversation history for the user"""
     user_id = str(ctx.author.id)
     
-    if user_id in user_conversations:
-        user_conversations[user_id].reset_conversation()
+    generation = chat_generations.get(user_id)
+    if generation is not None:
+        generation.cancel()
+    
+    if await asyncio.to_thread(conversation_store.reset, user_id) or generation is not None:
         await ctx.send("✅ Your conversation history has been reset!")
     else:
         await ctx.send("You don't have an active conversation.")
@@ -186,8 +713,7 @@ async def clear_own_messages(ctx, amount: int = 10):
 async def moderate_content(ctx, *, text: str):
     """Check if content is toxic or inappropriate"""
     async with ctx.typing():
-        moderator = get_content_moderator()
-        result = moderator.check(text, threshold=0.7)
+        result = await moderation_batcher.submit(text, threshold=0.7)
         
         if result['is_inappropriate']:
             embed = discord.Embed(title="⚠️ Content Moderation", color=discord.Color.red())
@@ -206,44 +732,200 @@ async def moderate_content(ctx, *, text: str):
 async def generate_text(ctx, *, prompt: str):
     """Generate creative text from a prompt"""
     async with ctx.typing():
-        generator = get_text_generator()
-        generated_text = generator.generate(
-            prompt,
-            max_length=100,
-            temperature=0.8
-        )
+        render = render_generation(prompt)
+        deadline = deadline_after(GENERATION_TIMEOUT)
         
-        embed = discord.Embed(title="✨ Text Generation", color=discord.Color.purple())
-        embed.add_field(name="Prompt", value=prompt[:500], inline=False)
-        embed.add_field(name="Generated Text", value=generated_text[:1000], inline=False)
-        
-        await ctx.send(embed=embed)
+        if STREAM_REPLIES:
+            reply = StreamingReply(ctx, render)
+            await reply.start()
+            try:
+                generated_text = await infer(
+                    'generator',
+                    'generate',
+                    prompt,
+                    max_length=100,
+                    temperature=0.8,
+                    on_text=reply.push,
+                    deadline=deadline,
+                    max_chars=GENERATE_MAX_CHARS,
+                    tenant=tenant_of(ctx)
+                )
+            finally:
+                reply.stop()
+            await reply.finish(generated_text + (CUT_SHORT if expired(deadline) else ""))
+        else:
+            generated_text = await infer(
+                'generator',
+                'generate',
+                prompt,
+                max_length=100,
+                temperature=0.8,
+                deadline=deadline,
+                max_chars=GENERATE_MAX_CHARS,
+                tenant=tenant_of(ctx)
+            )
+            await ctx.send(**render(generated_text + (CUT_SHORT if expired(deadline) else ""), True))
+
+
+# Longest context >>qa accepts (pasted or as a .txt attachment)
+QA_MAX_CONTEXT_CHARS = int(os.getenv('QA_MAX_CONTEXT_CHARS', '200000'))
 
+# Per-guild documents for >>qa add / >>qa ask, chunked and indexed once when
+# added, up to QA_KB_MAX_DOCUMENTS documents and QA_KB_MAX_MB of text per
+# guild. Opened by open_databases()
+knowledge_base = None
+QA_KB_TOP_K = int(os.getenv('QA_KB_TOP_K', '3'))
 
-@bot.command(name='qa', help='Ask a question with context. Usage: >>qa <context> | <question>')
+
+async def read_text_attachment(ctx):
+    """
+    Read the first .txt attachment of a command message
+    
+    Returns:
+        (filename, text), or None if there is no .txt attachment
+    
+    Raises:
+        ValueError: If the file is longer than QA_MAX_CONTEXT_CHARS
+    """
+    attachment = next(
+        (a for a in ctx.message.attachments if a.filename.lower().endswith('.txt')),
+        None
+    )
+    if attachment is None:
+        return None
+    
+    # UTF-8 uses at most 4 bytes per character
+    if attachment.size > QA_MAX_CONTEXT_CHARS * 4:
+        raise ValueError(f"That file is too large (max {QA_MAX_CONTEXT_CHARS:,} characters)")
+    text = (await attachment.read()).decode('utf-8', errors='replace').strip()
+    if len(text) > QA_MAX_CONTEXT_CHARS:
+        raise ValueError(f"That file is too long (max {QA_MAX_CONTEXT_CHARS:,} characters)")
+    return attachment.filename, text
+
+
+@bot.group(name='qa', invoke_without_command=True, help='Ask a question with context. Usage: >>qa <context> | <question> (or attach a .txt file and ask >>qa <question>)')
 async def question_answer(ctx, *, text: str):
     """Answer questions based on provided context"""
     async with ctx.typing():
-        # Split by | to separate context and question
-        if '|' not in text:
-            await ctx.send("⚠️ Please use format: `>>qa <context> | <question>`\nExample: `>>qa AI is artificial intelligence | What is AI?`")
+        try:
+            attached = await read_text_attachment(ctx)
+        except ValueError as e:
+            await ctx.send(f"⚠️ {e}")
+            return
+        
+        if attached is not None:
+            filename, context = attached
+            question = text.strip()
+            context_label = f"📎 {filename} ({len(context):,} characters)"
+        elif '|' in text:
+            # Split by | to separate context and question
+            parts = text.split('|', 1)
+            context = parts[0].strip()
+            question = parts[1].strip()
+            context_label = context[:500]
+        else:
+            await ctx.send("⚠️ Please use format: `>>qa <context> | <question>`\nExample: `>>qa AI is artificial intelligence | What is AI?`\nOr attach a .txt file and ask `>>qa <question>`")
             return
         
-        parts = text.split('|', 1)
-        context = parts[0].strip()
-        question = parts[1].strip()
+        if len(context) > QA_MAX_CONTEXT_CHARS:
+            await ctx.send(f"⚠️ Context is too long (max {QA_MAX_CONTEXT_CHARS:,} characters)")
+            return
         
-        qa = get_qa_system()
-        answer = qa.answer(question, context)
+        # Long documents are narrowed down to the most relevant passages first
+        answer = await infer('qa', 'answer_long', question, context, tenant=tenant_of(ctx))
         
         embed = discord.Embed(title="❓ Question Answering", color=discord.Color.gold())
-        embed.add_field(name="Context", value=context[:500], inline=False)
-        embed.add_field(name="Question", value=question, inline=False)
-        embed.add_field(name="Answer", value=answer, inline=False)
+        embed.add_field(name="Context", value=context_label, inline=False)
+        embed.add_field(name="Question", value=question[:1024], inline=False)
+        embed.add_field(name="Answer", value=answer['answer'] or "No answer found", inline=False)
+        embed.add_field(name="Confidence", value=f"{answer['confidence']:.2%}", inline=True)
         
         await ctx.send(embed=embed)
 
 
+@question_answer.command(name='add', help='Add a document to this server\'s knowledge base. Usage: >>qa add <title> | <text> (or attach a .txt file: >>qa add <title>)')
+@commands.guild_only()
+@commands.has_permissions(manage_messages=True)
+async def qa_add(ctx, *, text: str):
+    """Chunk and index a document for >>qa ask"""
+    try:
+        attached = await read_text_attachment(ctx)
+    except ValueError as e:
+        await ctx.send(f"⚠️ {e}")
+        return
+    
+    if attached is not None:
+        title, document = text.strip() or attached[0], attached[1]
+    elif '|' in text:
+        title, document = (part.strip() for part in text.split('|', 1))
+    else:
+        await ctx.send("⚠️ Please use format: `>>qa add <title> | <text>`, or attach a .txt file")
+        return
+    
+    if not document:
+        await ctx.send("⚠️ The document is empty")
+        return
+    
+    try:
+        result = await asyncio.to_thread(
+            knowledge_base.add_document, ctx.guild.id, title[:100], document, ctx.author.id
+        )
+    except ValueError as e:
+        await ctx.send(f"⚠️ {e}")
+        return
+    await ctx.send(f"📚 Added **{title[:100]}** (#{result['id']}, {result['num_chunks']} passages). Ask with `>>qa ask <question>`")
+
+
+@question_answer.command(name='ask', help='Ask this server\'s knowledge base. Usage: >>qa ask <question>')
+@commands.guild_only()
+async def qa_ask(ctx, *, question: str):
+    """Answer a question from the guild's documents"""
+    async with ctx.typing():
+        passages = await asyncio.to_thread(knowledge_base.search, ctx.guild.id, question, QA_KB_TOP_K)
+        if not passages:
+            await ctx.send("📭 Nothing in this server's knowledge base matches that. Add documents with `>>qa add <title> | <text>`")
+            return
+        
+        answer = await infer(
+            'qa', 'answer_passages', question, [p['text'] for p in passages], tenant=tenant_of(ctx)
+        )
+        source = passages[answer['passage']] if answer['passage'] is not None else passages[0]
+        
+        embed = discord.Embed(title="❓ Question Answering", color=discord.Color.gold())
+        embed.add_field(name="Question", value=question[:1024], inline=False)
+        embed.add_field(name="Answer", value=answer['answer'] or "No answer found", inline=False)
+        embed.add_field(name="Confidence", value=f"{answer['confidence']:.2%}", inline=True)
+        embed.add_field(name="Source", value=f"#{source['doc_id']} {source['title']}", inline=True)
+        
+        await ctx.send(embed=embed)
+
+
+@question_answer.command(name='list', help='List the documents in this server\'s knowledge base')
+@commands.guild_only()
+async def qa_list(ctx):
+    """Show the guild's documents"""
+    documents = await asyncio.to_thread(knowledge_base.list_documents, ctx.guild.id)
+    if not documents:
+        await ctx.send("📭 This server's knowledge base is empty. Add documents with `>>qa add <title> | <text>`")
+        return
+    
+    lines = [f"#{d['id']} **{d['title']}** ({d['num_chunks']} passages)" for d in documents[-25:]]
+    embed = discord.Embed(title="📚 Knowledge Base", description="\n".join(lines), color=discord.Color.gold())
+    await ctx.send(embed=embed)
+
+
+@question_answer.command(name='remove', help='Remove a document from this server\'s knowledge base. Usage: >>qa remove <id>')
+@commands.guild_only()
+@commands.has_permissions(manage_messages=True)
+async def qa_remove(ctx, doc_id: int):
+    """Delete a document and its index entries"""
+    removed = await asyncio.to_thread(knowledge_base.remove_document, ctx.guild.id, doc_id)
+    if removed:
+        await ctx.send(f"🗑️ Removed document #{doc_id}")
+    else:
+        await ctx.send(f"⚠️ No document #{doc_id} in this server's knowledge base")
+
+
 @bot.command(name='models', help='Show all available ML models')
 async def show_models(ctx):
     """Display information about available models"""
@@ -286,6 +968,206 @@ async def show_models(ctx):
     await ctx.send(embed=embed)
 
 
+@bot.command(name='automod', help='Configure auto-moderation. Usage: >>automod [on|off|threshold <0-1>|action <react|warn|delete>|log <#channel|off>]')
+@commands.guild_only()
+@commands.has_permissions(manage_messages=True)
+async def automod(ctx, setting: str = None, *, value: str = None):
+    """Show or change this server's auto-moderation settings"""
+    guild_id = ctx.guild.id
+    setting = setting.lower() if setting else None
+    
+    if setting in ('on', 'off'):
+        guild_settings.update(guild_id, automod_enabled=(setting == 'on'))
+    elif setting == 'threshold':
+        try:
+            threshold = float(value)
+        except (TypeError, ValueError):
+            threshold = -1
+        if not 0 < threshold < 1:
+            await ctx.send("⚠️ Threshold must be a number between 0 and 1, e.g. `>>automod threshold 0.8`")
+            return
+        guild_settings.update(guild_id, automod_threshold=threshold)
+    elif setting == 'action':
+        if value not in AUTOMOD_ACTIONS:
+            await ctx.send(f"⚠️ Action must be one of: {', '.join(AUTOMOD_ACTIONS)}")
+            return
+        guild_settings.update(guild_id, automod_action=value)
+    elif setting == 'log':
+        if value and value.lower() == 'off':
+            guild_settings.update(guild_id, automod_log_channel=None)
+        elif ctx.message.channel_mentions:
+            guild_settings.update(guild_id, automod_log_channel=ctx.message.channel_mentions[0].id)
+        else:
+            await ctx.send("⚠️ Usage: `>>automod log #channel` or `>>automod log off`")
+            return
+    elif setting is not None:
+        await ctx.send("⚠️ Usage: `>>automod [on|off|threshold <0-1>|action <react|warn|delete>|log <#channel|off>]`")
+        return
+    
+    settings = guild_settings.get(guild_id)
+    log_channel = settings['automod_log_channel']
+    embed = discord.Embed(
+        title="🛡️ Auto-Moderation",
+        description="Enabled" if settings['automod_enabled'] else "Disabled",
+        color=discord.Color.green() if settings['automod_enabled'] else discord.Color.dark_grey()
+    )
+    embed.add_field(name="Threshold", value=f"{settings['automod_threshold']:.2f}", inline=True)
+    embed.add_field(name="Action", value=settings['automod_action'], inline=True)
+    embed.add_field(name="Log channel", value=f"<#{log_channel}>" if log_channel else "none", inline=True)
+    await ctx.send(embed=embed)
+
+
+@bot.command(name='stats', help='Show model memory, cache and batching statistics')
+async def show_stats(ctx):
+    """Display runtime statistics for the ML models"""
+    stats = model_registry.stats()
+    total = stats.pop('total')
+    
+    budget = f"{total['budget_mb']:.0f} MB" if total['budget_mb'] else "unlimited"
+    embed = discord.Embed(
+        title="📈 Model Statistics",
+        description=(
+            f"Resident: {total['resident_mb']:.0f} MB / {budget}\n"
+            f"Hit rate: {total['hit_rate']:.1%} · Evictions: {total['evictions']}"
+        ),
+        color=discord.Color.blue()
+    )
+    
+    for name, model in stats.items():
+        status = f"loaded ({model['size_mb']:.0f} MB)" if model['loaded'] else "not loaded"
+        embed.add_field(
+            name=name,
+            value=(
+                f"{status}\n"
+                f"loads: {model['loads']} (avg {model['avg_load_seconds']:.1f}s)\n"
+                f"hit rate: {model['hit_rate']:.1%} · evictions: {model['evictions']}"
+            ),
+            inline=True
+        )
+    
+    if result_cache is not None:
+        cache = result_cache.stats()
+        embed.add_field(
+            name="result cache",
+            value=(
+                f"hit rate: {cache['hit_rate']:.1%} ({cache['entries']} entries)\n"
+                f"hits: {cache['hits']} + {cache['disk_hits']} disk · misses: {cache['misses']}"
+            ),
+            inline=True
+        )
+    
+    for name, batcher in [('sentiment', sentiment_batcher), ('moderator', moderation_batcher)]:
+        batching = batcher.stats()
+        embed.add_field(
+            name=f"{name} batching",
+            value=f"{batching['batches']} batches · avg size {batching['avg_batch_size']:.1f}",
+            inline=True
+        )
+    
+    queue = automod_worker.stats()
+    embed.add_field(
+        name="auto-moderation",
+        value=(
+            f"queue: {queue['depth']} (max {queue['max_depth']}) · dropped: {queue['dropped']}\n"
+            f"scanned: {queue['processed']} · flagged: {automod_flagged} · "
+            f"avg batch {queue['avg_batch_size']:.1f}"
+        ),
+        inline=True
+    )
+    
+    if moderation_cascade is not None:
+        if process_pool is not None and 'moderator' in process_pool.models:
+            # Every worker process runs its own copy of the cascade
+            per_worker = await asyncio.get_running_loop().run_in_executor(
+                None, process_pool.call_each, 'moderator', 'stats'
+            )
+            cascade = CascadeModerator.combine_stats(per_worker)
+        else:
+            cascade = moderation_cascade.stats()
+        embed.add_field(
+            name="moderation cascade",
+            value=(
+                f"cleared by tier 1: {cascade['tier1_rate']:.1%} of {cascade['checked']}\n"
+                f"toxic-bert: {cascade['tier2']} · hate model: {cascade['tier3']}\n"
+                f"audit misses: {cascade['audit_misses']}/{cascade['audits']} · "
+                f"trained on {cascade['linear_samples']}"
+            ),
+            inline=True
+        )
+    
+    scheduler = inference.stats()
+    embed.add_field(
+        name="inference queues",
+        value="\n".join(
+            f"{name}: {c['queued']} queued · {c['running']} running · "
+            f"wait avg {c['avg_wait_ms']:.0f} ms, p95 ≤ {c['p95_wait_ms']:g} ms"
+            for name, c in scheduler.items()
+        ),
+        inline=False
+    )
+    
+    if process_pool is not None:
+        embed.add_field(
+            name="worker processes",
+            value="\n".join(
+                f"#{i}: " + (
+                    f"{w['completed']} done · {w['pending']} pending"
+                    + (f" · {w['private_mb']:.0f} MB own, {w['shared_mb']:.0f} MB shared"
+                       if w['private_mb'] is not None else "")
+                    if w['alive'] else "stopped"
+                )
+                for i, w in enumerate(process_pool.stats())
+            ),
+            inline=False
+        )
+    
+    if inference_client is not None:
+        client = inference_client.stats()
+        try:
+            server = await asyncio.get_running_loop().run_in_executor(None, inference_client.server_stats)
+            batching = " · ".join(
+                f"{name} avg batch {b['avg_batch_size']:.1f}" for name, b in server['batching'].items()
+            )
+            server_line = (
+                f"server: {server['connections']} connections · {server['requests']} requests"
+                + (f"\n{batching}" if batching else "")
+            )
+        except (ConnectionError, OSError):
+            server_line = "server: unreachable"
+        embed.add_field(
+            name="inference server",
+            value=(
+                f"{INFERENCE_SERVER} · {client['connections']} connections · "
+                f"{client['in_flight']} in flight\n"
+                f"calls: {client['calls']} (avg {client['avg_call_ms']:.0f} ms) · errors: {client['errors']}\n"
+                f"{server_line}"
+            ),
+            inline=False
+        )
+    
+    chats = await asyncio.to_thread(conversation_store.stats)
+    embed.add_field(
+        name="conversations",
+        value=(
+            f"in memory: {chats['resident']} ({chats['resident_tokens']} tokens)\n"
+            f"on disk: {chats['stored']} · evictions: {chats['evictions']}"
+        ),
+        inline=True
+    )
+    
+    mood = mood_worker.stats()
+    embed.add_field(
+        name="mood tracking",
+        value=(
+            f"sampled: {mood['processed']} · dropped: {mood['dropped']}\n"
+            f"tracked channels/servers: {mood_tracker.num_keys()}"
+        ),
+        inline=True
+    )
+    
+    await ctx.send(embed=embed)
+
+
 @bot.command(name='help', help='Show all available commands')
 async def help_command(ctx, command_name: str = None):
     """Custom help command with embed"""
@@ -353,7 +1235,25 @@ async def help_command(ctx, command_name: str = None):
         
         embed.add_field(
             name="❓ >>qa <context> | <question>",
-            value="Answer questions based on provided context",
+            value="Answer questions based on provided context (or attach a .txt document)",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="📚 >>qa add <title> | <text> · >>qa ask <question>",
+            value="Build a knowledge base for this server and ask it questions (>>qa list, >>qa remove <id>; adding and removing require Manage Messages)",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="🛡️ >>automod [on|off|threshold|action|log]",
+            value="Scan every message for toxic content (requires Manage Messages)",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="🌡️ >>mood [server|on|off]",
+            value="Show the sentiment trend of this channel or server (last 5 min, hour, day); on/off requires Manage Server",
             inline=False
         )
         
@@ -363,6 +1263,12 @@ async def help_command(ctx, command_name: str = None):
             inline=False
         )
         
+        embed.add_field(
+            name="📈 >>stats",
+            value="Show model memory, cache and batching statistics",
+            inline=False
+        )
+        
         embed.add_field(
             name="ℹ️ >>help [command]",
             value="Show this help message or help for a specific command",
@@ -396,4 +1302,9 @@ if __name__ == "__main__":
         print("ERROR: DISCORD_TOKEN not found in .env file!")
         print("Please create a .env file with your Discord bot token.")
     else:
+        # Fork before anything else runs inference or starts threads
+        if PROCESS_POOL_MODELS:
+            start_process_pool()
+        if PRELOAD_MODELS and PRELOAD_MODE == 'blocking':
+            model_registry.preload(PRELOAD_MODELS)
         bot.run(TOKEN)
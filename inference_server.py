@@ -0,0 +1,60 @@
+"""
+Inference server for several bot processes on one host
+Loads the models once and serves them to every bot started with
+INFERENCE_SERVER set to the same address. Run with:
+python inference_server.py [--listen unix:/tmp/sive-inference.sock | 127.0.0.1:8787]
+"""
+
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from models.backend import use_torch_only
+from models.inference_server import InferenceServer
+from models.setup import make_result_cache, make_registry, make_executor, preload_names
+
+# Same settings as bot.py, so shards and the server can share one .env
+load_dotenv()
+if os.getenv('TORCH_ONLY', '1') != '0':
+    use_torch_only()
+
+model_registry = make_registry(make_result_cache())
+
+
+async def main(args):
+    executor = make_executor(model_registry.names())
+    server = InferenceServer(
+        model_registry,
+        executor=executor,
+        batch_max_size=int(os.getenv('BATCH_MAX_SIZE', '16')),
+        batch_max_wait_ms=float(os.getenv('BATCH_MAX_WAIT_MS', '5'))
+    )
+
+    preload = preload_names(model_registry)
+    if preload:
+        await asyncio.get_running_loop().run_in_executor(None, model_registry.preload, preload)
+
+    if model_registry.idle_timeout:
+        async def unload_idle_models():
+            while True:
+                await asyncio.sleep(60)
+                await asyncio.get_running_loop().run_in_executor(None, model_registry.evict_idle)
+        # Held so the task is not garbage collected
+        idle_task = asyncio.create_task(unload_idle_models())
+
+    print(f"✓ Serving {', '.join(model_registry.names())} on {args.listen}")
+    await server.serve_forever(args.listen, allow_remote=args.allow_remote)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sive inference server")
+    parser.add_argument('--listen', default=os.getenv('INFERENCE_SERVER', 'unix:/tmp/sive-inference.sock'),
+                        help="unix:<socket path>, <host>:<port> or <port> (loopback)")
+    parser.add_argument('--allow-remote', action='store_true',
+                        help="Allow listening on a non-loopback address (there is no authentication)")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -1 +1,26 @@
 # Models package
+"""
+Model classes are imported on first access, and the model modules only
+import torch / transformers when a model is constructed, so importing
+this package (and the bot) stays fast.
+"""
+
+import importlib
+
+_LAZY_EXPORTS = {
+    'SentimentAnalyzer': 'models.sentiment_analyzer',
+    'Chatbot': 'models.chatbot',
+    'ConversationState': 'models.chatbot',
+    'ContentModerator': 'models.content_moderator',
+    'TextGenerator': 'models.text_generator',
+    'QASystem': 'models.qa_system',
+    'use_torch_only': 'models.backend',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module 'models' has no attribute '{name}'")
+    return getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
@@ -0,0 +1,32 @@
+"""
+ML Backend Loading
+Defers importing torch / transformers until a model is actually constructed
+"""
+
+import os
+
+
+def use_torch_only(enabled=True):
+    """
+    Make transformers use the PyTorch backend only
+    
+    Stops transformers from importing / probing TensorFlow and Flax, which
+    saves seconds of startup when they are installed. Must be called before
+    the first model is constructed.
+    
+    Args:
+        enabled: False restores automatic backend detection
+    """
+    if enabled:
+        os.environ['USE_TORCH'] = '1'
+        os.environ['USE_TF'] = '0'
+        os.environ['USE_FLAX'] = '0'
+    else:
+        for name in ('USE_TORCH', 'USE_TF', 'USE_FLAX'):
+            os.environ.pop(name, None)
+
+
+def pipeline(*args, **kwargs):
+    """transformers.pipeline, imported on first call"""
+    from transformers import pipeline as hf_pipeline
+    return hf_pipeline(*args, **kwargs)
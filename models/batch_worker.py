@@ -0,0 +1,162 @@
+"""
+Batch Worker
+Bounded background queue that processes items in batches, with overflow policies
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class BatchWorker:
+    def __init__(self, process_batch, max_queue=1000, max_batch_size=32,
+                 max_wait_ms=50, policy="drop_oldest", name="worker"):
+        """
+        Initialize batch worker
+
+        Args:
+            process_batch: Async callable taking a list of items
+            max_queue: Most items waiting at once
+            max_batch_size: Most items handed to process_batch at once
+            max_wait_ms: How long a lone item waits for others to batch with
+            policy: What put() does when the queue is full:
+                "drop_oldest" discards the oldest waiting item,
+                "drop_newest" discards the new item,
+                "block" waits for room (backpressure on the producer)
+            name: Name used in log messages
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+
+        self.process_batch = process_batch
+        self.max_queue = max_queue
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.policy = policy
+        self.name = name
+
+        self._queue = deque()
+        self._has_items = None
+        self._has_room = None
+        self._task = None
+
+        self.accepted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        """Start the worker task (call from the event loop; safe to call twice)"""
+        if self._task is None or self._task.done():
+            self._has_items = asyncio.Event()
+            self._has_room = asyncio.Event()
+            self._has_room.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker (items still queued are discarded)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def put(self, item):
+        """
+        Queue an item
+
+        Returns:
+            True if the item was queued, False if it was dropped
+        """
+        if self._task is None:
+            self.start()
+
+        while len(self._queue) >= self.max_queue:
+            if self.policy == "drop_newest":
+                self.dropped += 1
+                return False
+            if self.policy == "drop_oldest":
+                self._queue.popleft()
+                self.dropped += 1
+                break
+            self._has_room.clear()
+            await self._has_room.wait()
+
+        self._queue.append(item)
+        self.accepted += 1
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._has_items.set()
+        return True
+
+    async def _run(self):
+        """Drain the queue in batches until stopped"""
+        while True:
+            await self._has_items.wait()
+
+            # Give a lone item a moment to gather company
+            if len(self._queue) < self.max_batch_size and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+            if not self._queue:
+                self._has_items.clear()
+            self._has_room.set()
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                await self.process_batch(batch)
+                self.processed += len(batch)
+            except Exception as e:
+                # One bad batch must not stop the worker
+                self.errors += 1
+                print(f"⚠️ {self.name} batch failed: {e}")
+            self.batches += 1
+            self.busy_seconds += time.perf_counter() - start
+
+    def stats(self):
+        """
+        Queue statistics
+
+        Returns:
+            dict with depth, max_depth, accepted, dropped, processed,
+            batches, errors, avg_batch_size, and busy_seconds
+        """
+        return {
+            'depth': len(self._queue),
+            'max_depth': self.max_depth,
+            'accepted': self.accepted,
+            'dropped': self.dropped,
+            'processed': self.processed,
+            'batches': self.batches,
+            'errors': self.errors,
+            'avg_batch_size': self.processed / self.batches if self.batches else 0.0,
+            'busy_seconds': self.busy_seconds,
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    async def score(batch):
+        await asyncio.sleep(0.01)
+        print(f"Processed batch of {len(batch)}: {batch[0]}..{batch[-1]}")
+
+    async def main():
+        worker = BatchWorker(score, max_queue=50, max_batch_size=16, policy="drop_oldest")
+        # A burst larger than the queue: the oldest messages are dropped
+        for i in range(200):
+            await worker.put(f"message {i}")
+        await asyncio.sleep(0.3)
+        await worker.stop()
+        print(worker.stats())
+
+    asyncio.run(main())
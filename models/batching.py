@@ -0,0 +1,99 @@
+"""
+Length-Bucketed Batching
+Groups texts of similar token length so each batch is padded only to its own max
+"""
+
+
+def token_lengths(tokenizer, texts):
+    """
+    Count tokens per text (including special tokens)
+
+    Args:
+        tokenizer: HuggingFace tokenizer
+        texts: List of strings
+
+    Returns:
+        List of token counts
+    """
+    encoded = tokenizer(list(texts), truncation=True)['input_ids']
+    return [len(ids) for ids in encoded]
+
+
+def length_buckets(lengths, max_batch_size=32, max_batch_tokens=8192):
+    """
+    Split item indices into buckets of similar length
+
+    Items are sorted by length and cut into consecutive buckets, closing a
+    bucket when it reaches max_batch_size items or when padding it to its
+    longest item would exceed max_batch_tokens.
+
+    Args:
+        lengths: Token count per item
+        max_batch_size: Most items in one bucket
+        max_batch_tokens: Most padded tokens (items x longest) in one bucket
+
+    Returns:
+        List of buckets, each a list of indices into lengths
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+
+    buckets = []
+    current = []
+    for i in order:
+        # Sorted order means lengths[i] is the longest in the bucket so far
+        if current and (
+            len(current) >= max_batch_size or
+            lengths[i] * (len(current) + 1) > max_batch_tokens
+        ):
+            buckets.append(current)
+            current = []
+        current.append(i)
+
+    if current:
+        buckets.append(current)
+
+    return buckets
+
+
+def run_bucketed(pipe, texts, max_batch_size=32, max_batch_tokens=8192, **kwargs):
+    """
+    Run a pipeline over texts in length buckets
+
+    Args:
+        pipe: HuggingFace pipeline (must expose .tokenizer)
+        texts: List of strings
+        max_batch_size: Most texts per forward pass
+        max_batch_tokens: Most padded tokens per forward pass
+        **kwargs: Passed to the pipeline
+
+    Texts longer than the model's maximum length are truncated, matching
+    the lengths used for bucketing.
+
+    Returns:
+        List of pipeline outputs in the original order of texts
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    lengths = token_lengths(pipe.tokenizer, texts)
+    results = [None] * len(texts)
+
+    for bucket in length_buckets(lengths, max_batch_size, max_batch_tokens):
+        outputs = pipe(
+            [texts[i] for i in bucket],
+            batch_size=len(bucket),
+            truncation=True,
+            **kwargs
+        )
+        for i, output in zip(bucket, outputs):
+            results[i] = output
+
+    return results
+
+
+# Example usage
+if __name__ == "__main__":
+    lengths = [3, 120, 4, 5, 480, 2, 60, 7]
+    for bucket in length_buckets(lengths, max_batch_size=3, max_batch_tokens=1000):
+        print([lengths[i] for i in bucket])
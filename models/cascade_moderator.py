@@ -0,0 +1,348 @@
+"""
+Cascade Moderation
+Clears obviously clean messages with cheap lexical checks before running toxic-bert
+"""
+
+import os
+import random
+import re
+import threading
+
+from models.content_moderator import ContentModerator
+
+
+# Mild insults and threats. Serious slurs belong in a wordlist file
+# (MODERATION_WORDLIST) that the server owner maintains.
+DEFAULT_WORDLIST = [
+    "idiot", "stupid", "dumb", "moron", "loser", "trash", "garbage", "pathetic",
+    "shut up", "stfu", "kys", "kill yourself", "kill you", "hate you", "die",
+    "ugly", "worthless", "useless", "disgusting", "scum", "freak", "clown",
+]
+
+# Common character swaps used to dodge filters
+_LEET = str.maketrans({'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's'})
+
+
+def load_wordlist(path):
+    """Read a wordlist file (one term per line, # for comments)"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def compile_wordlist(terms):
+    """
+    Compile terms into one regex alternation
+
+    One search() scans the text once, but Python's regex engine tries the
+    alternatives one by one at each position, so the cost grows with the
+    size of the wordlist. That is fine for a few hundred terms; much
+    larger lists want a real multi-pattern matcher. Longer terms come
+    first so "kill yourself" wins over "kill".
+    """
+    escaped = sorted((re.escape(t.lower()) for t in terms), key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(escaped) + r")\b")
+
+
+class LexicalModel:
+    def __init__(self, path=None, n_features=2 ** 18):
+        """
+        Tiny linear toxicity model over hashed character n-grams
+
+        It learns online from the labels toxic-bert gives escalated
+        messages (distillation), so no training set is needed.
+
+        Only one process should train and save a given path; others set
+        read_only and pick up its saves with sync().
+
+        Args:
+            path: File to load from / save to (None = not persisted)
+            n_features: Hashing space size
+        """
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+
+        self.path = path
+        self.vectorizer = HashingVectorizer(
+            analyzer='char_wb', ngram_range=(2, 4), n_features=n_features,
+            alternate_sign=False, lowercase=True
+        )
+        self.samples = 0
+        self.positives = 0
+        self.classifier = SGDClassifier(loss='log_loss', alpha=1e-5, class_weight={0: 1, 1: 5})
+        self.read_only = False
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._load()
+
+    def _load(self):
+        """Load the saved model if its file changed since the last load"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns if self.path else None
+        except FileNotFoundError:
+            return
+        if mtime is None or mtime == self._loaded_mtime:
+            return
+        import joblib
+        classifier, samples, positives = joblib.load(self.path)
+        with self._lock:
+            self.classifier, self.samples, self.positives = classifier, samples, positives
+            self._loaded_mtime = mtime
+
+    def predict(self, texts):
+        """
+        Probability that each text is toxic
+
+        Returns:
+            List of floats, or None while the model has not been trained
+        """
+        if not self.samples:
+            return None
+        features = self.vectorizer.transform(texts)
+        with self._lock:
+            return self.classifier.predict_proba(features)[:, 1].tolist()
+
+    def learn(self, texts, labels):
+        """Update the model with labelled texts (labels: 1 = toxic; ignored when read_only)"""
+        if not texts or self.read_only:
+            return
+        features = self.vectorizer.transform(texts)
+        with self._lock:
+            self.classifier.partial_fit(features, labels, classes=[0, 1])
+            self.samples += len(labels)
+            self.positives += sum(labels)
+
+    def save(self):
+        """Write the model to its path (atomically, so readers never see a partial file)"""
+        if not self.path or self.read_only:
+            return
+        import joblib
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            joblib.dump((self.classifier, self.samples, self.positives), tmp_path)
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+
+    def sync(self):
+        """Save the model, or reload the trainer's latest save when read_only"""
+        if self.read_only:
+            self._load()
+        else:
+            self.save()
+
+
+class CascadeModerator:
+    def __init__(self, moderator, hate_moderator=None, wordlist=None, linear_model=None,
+                 clear_below=0.05, min_samples=1000, audit_rate=0.02, hate_above=0.3,
+                 save_every=500):
+        """
+        Initialize cascade moderator
+
+        Tier 1 (microseconds): messages without letters, or without
+        wordlist hits that the linear model rates below clear_below, are
+        cleared. Tier 2: everything else runs through toxic-bert.
+        Tier 3 (optional): messages toxic-bert scores at least hate_above
+        but does not flag also run through the hate speech model.
+
+        Args:
+            moderator: ContentModerator for tier 2 (toxic-bert)
+            hate_moderator: Optional ContentModerator for tier 3 (hate model)
+            wordlist: Terms that always escalate (default: DEFAULT_WORDLIST)
+            linear_model: LexicalModel for tier 1 (default: a new, untrained one)
+            clear_below: Highest linear model toxicity that tier 1 clears
+            min_samples: Labelled messages the linear model needs before
+                tier 1 clears anything with it
+            audit_rate: Share of tier 1 clears still sent to toxic-bert,
+                which measures the recall lost and keeps the model learning
+            hate_above: Lowest toxic-bert score that is checked by tier 3
+            save_every: Save the linear model (or reload it, if it is
+                read_only) after this many new labels
+        """
+        self.moderator = moderator
+        self.hate_moderator = hate_moderator
+        self.wordlist = compile_wordlist(wordlist or DEFAULT_WORDLIST)
+        self.linear_model = linear_model or LexicalModel()
+        self.clear_below = clear_below
+        self.min_samples = min_samples
+        self.audit_rate = audit_rate
+        self.hate_above = hate_above
+        self.save_every = save_every
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        self.counts = {
+            'checked': 0, 'cleared_empty': 0, 'cleared_tier1': 0, 'wordlist_hits': 0,
+            'tier2': 0, 'flagged_tier2': 0, 'tier3': 0, 'flagged_tier3': 0,
+            'audits': 0, 'audit_misses': 0,
+        }
+
+    @property
+    def model_name(self):
+        return self.moderator.model_name
+
+    def _count(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.counts[key] += amount
+
+    def check(self, text, threshold=0.7):
+        """
+        Check if content is inappropriate
+
+        Returns:
+            dict with is_inappropriate, label, confidence, and tier
+        """
+        return self.check_batch([text], threshold=threshold)[0]
+
+    def warmup(self):
+        """Warm up the transformer tiers"""
+        self.moderator.warmup()
+        if self.hate_moderator is not None:
+            self.hate_moderator.warmup()
+
+    def check_batch(self, texts, threshold=0.7, batch_size=32):
+        """
+        Check multiple texts, escalating only uncertain ones
+
+        Args:
+            texts: List of strings
+            threshold: Confidence threshold for the transformer tiers
+            batch_size: Maximum texts per forward pass
+
+        Returns:
+            List of results (same order as texts)
+        """
+        results = [None] * len(texts)
+        escalate = []
+        audits = set()
+
+        # Tier 1: lexical checks
+        candidates = []
+        for i, text in enumerate(texts):
+            if not any(c.isalpha() for c in text):
+                # Emotes, numbers, links to nothing: no words to be toxic with
+                results[i] = {'is_inappropriate': False, 'label': 'clean', 'confidence': 1.0, 'tier': 1}
+                self._count(cleared_empty=1)
+            elif self.wordlist.search(text.lower().translate(_LEET)):
+                self._count(wordlist_hits=1)
+                escalate.append(i)
+            else:
+                candidates.append(i)
+
+        toxicity = None
+        if candidates and self.linear_model.samples >= self.min_samples:
+            toxicity = self.linear_model.predict([texts[i] for i in candidates])
+        for n, i in enumerate(candidates):
+            if toxicity is not None and toxicity[n] < self.clear_below:
+                results[i] = {
+                    'is_inappropriate': False, 'label': 'clean',
+                    'confidence': 1.0 - toxicity[n], 'tier': 1
+                }
+                self._count(cleared_tier1=1)
+                if random.random() < self.audit_rate:
+                    audits.add(i)
+                    escalate.append(i)
+            else:
+                escalate.append(i)
+
+        self._count(checked=len(texts))
+        if not escalate:
+            return results
+
+        # Tier 2: toxic-bert
+        escalate.sort()
+        checked = self.moderator.check_batch(
+            [texts[i] for i in escalate], threshold=threshold, batch_size=batch_size
+        )
+        self._count(tier2=len(escalate) - len(audits))
+        self._learn([texts[i] for i in escalate], checked)
+
+        hate_candidates = []
+        for i, result in zip(escalate, checked):
+            result = dict(result, tier=2)
+            if i in audits:
+                # Audited messages keep their tier 1 result; a miss is
+                # a message tier 1 cleared that toxic-bert flags
+                self._count(audits=1, audit_misses=int(result['is_inappropriate']))
+                continue
+            results[i] = result
+            if result['is_inappropriate']:
+                self._count(flagged_tier2=1)
+            elif self.hate_moderator is not None and result['confidence'] >= self.hate_above:
+                hate_candidates.append(i)
+
+        # Tier 3: hate speech model for what toxic-bert found borderline
+        if hate_candidates:
+            self._count(tier3=len(hate_candidates))
+            hate_results = self.hate_moderator.check_batch(
+                [texts[i] for i in hate_candidates], threshold=threshold, batch_size=batch_size
+            )
+            for i, result in zip(hate_candidates, hate_results):
+                if result['is_inappropriate']:
+                    results[i] = dict(result, tier=3)
+                    self._count(flagged_tier3=1)
+
+        return results
+
+    def _learn(self, texts, results):
+        """Teach the linear model the labels toxic-bert gave"""
+        labels = [
+            int(r['label'].lower() in ContentModerator.FLAG_LABELS and r['confidence'] > 0.5)
+            for r in results
+        ]
+        self.linear_model.learn(texts, labels)
+
+        self._unsaved += len(labels)
+        if self._unsaved >= self.save_every:
+            self._unsaved = 0
+            self.linear_model.sync()
+
+    def stats(self):
+        """
+        Per-tier counters
+
+        Returns:
+            dict with the raw counts plus tier1_rate (share of messages
+            cleared without a transformer), audit_miss_rate (estimated
+            share of tier 1 clears toxic-bert would flag), and
+            linear_samples
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        counts['linear_samples'] = self.linear_model.samples
+        return self._with_rates(counts)
+
+    @staticmethod
+    def _with_rates(counts):
+        cleared = counts['cleared_empty'] + counts['cleared_tier1']
+        counts['tier1_rate'] = cleared / counts['checked'] if counts['checked'] else 0.0
+        counts['audit_miss_rate'] = (
+            counts['audit_misses'] / counts['audits'] if counts['audits'] else 0.0
+        )
+        return counts
+
+    @classmethod
+    def combine_stats(cls, stats_list):
+        """
+        Add up stats() of several cascades, e.g. one per worker process
+
+        linear_samples is the largest of them: one process trains the
+        linear model and the others load its saves.
+        """
+        counts = {
+            key: sum(stats[key] for stats in stats_list)
+            for key in stats_list[0] if key not in ('tier1_rate', 'audit_miss_rate', 'linear_samples')
+        }
+        counts['linear_samples'] = max(stats['linear_samples'] for stats in stats_list)
+        return cls._with_rates(counts)
+
+
+# Example usage
+if __name__ == "__main__":
+    cascade = CascadeModerator(ContentModerator(model_type="toxic"), min_samples=4)
+
+    messages = ["gg", "😂😂😂", "You're stupid and useless!", "see you tomorrow", "nice play"]
+    for _ in range(2):
+        for msg, result in zip(messages, cascade.check_batch(messages)):
+            print(f"tier {result['tier']}: {msg} -> {result['is_inappropriate']}")
+        print()
+    print(cascade.stats())
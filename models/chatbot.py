@@ -3,12 +3,74 @@ Conversational AI Chatbot
 Uses DialoGPT or BlenderBot for natural conversations
 """
 
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
+import threading
+from collections import OrderedDict
+
+from models.generation_control import make_stopping_criteria
+from models.precision import apply_precision
+from models.streaming import make_streamer
+
+
+class ConversationState:
+    def __init__(self, max_history_tokens=512):
+        """
+        Per-user conversation history
+
+        Holds only the token IDs of one conversation, so many users can
+        share a single Chatbot (and a single copy of the model weights).
+        
+        Args:
+            max_history_tokens: Token budget for the history. The oldest
+                turns are dropped (whole turns only) to stay within it.
+        """
+        self.max_history_tokens = max_history_tokens
+        
+        # One list of token IDs per turn (user message + bot reply)
+        self.turns = []
+        
+        # Bumped whenever earlier tokens change, so cached keys/values
+        # computed for the old history are never reused
+        self.version = 0
+    
+    def history_ids(self):
+        """All history token IDs, oldest first"""
+        return [token for turn in self.turns for token in turn]
+    
+    def num_tokens(self):
+        """Number of tokens in the history"""
+        return sum(len(turn) for turn in self.turns)
+    
+    def make_room(self, new_tokens):
+        """
+        Drop the oldest turns so new_tokens more fit in the budget
+        
+        Trims down to three quarters of the budget, so the (expensive)
+        re-encode after a trim happens every few turns, not every turn.
+        
+        Args:
+            new_tokens: Number of tokens about to be added
+        """
+        if self.num_tokens() + new_tokens <= self.max_history_tokens:
+            return
+        
+        target = self.max_history_tokens * 3 // 4 - new_tokens
+        while self.turns and self.num_tokens() > target:
+            self.turns.pop(0)
+        self.version += 1
+    
+    def add_turn(self, token_ids):
+        """Append a finished turn to the history"""
+        self.turns.append(list(token_ids))
+    
+    def reset(self):
+        """Forget the conversation history"""
+        self.turns = []
+        self.version += 1
 
 
 class Chatbot:
-    def __init__(self, model_name="microsoft/DialoGPT-medium"):
+    def __init__(self, model_name="microsoft/DialoGPT-medium", max_cached_conversations=8,
+                 precision="fp32"):
         """
         Initialize chatbot model
         
@@ -17,65 +79,151 @@ class Chatbot:
                 - "microsoft/DialoGPT-medium" (recommended, fast)
                 - "microsoft/DialoGPT-large" (better quality, slower)
                 - "facebook/blenderbot-400M-distill" (friendly chatbot)
+            max_cached_conversations: Conversations whose attention
+                keys/values are kept between turns (0 disables reuse)
+            precision: "fp32", "bf16", or "int8" (dynamic quantization)
         """
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+        
         self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(model_name)
+        self.model = apply_precision(AutoModelForCausalLM.from_pretrained(model_name), precision)
+        self.precision = precision
+        
+        # Default conversation, used when no state is passed in
+        self.state = ConversationState()
         
-        # Store conversation history for context
-        self.chat_history_ids = None
+        # Most recently used conversations -> (version, past_key_values).
+        # Caches are large (every layer's keys/values per token), so only
+        # a few are kept, and they live here rather than in the states.
+        self.max_cached_conversations = max_cached_conversations
+        self._kv_cache = OrderedDict()
+        self._kv_cache_lock = threading.Lock()
         
         # Set pad token if not exists
         if self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
     
-    def respond(self, user_input, max_length=1000):
+    def new_conversation(self):
+        """
+        Create an empty conversation that shares this model
+        
+        Returns:
+            ConversationState to pass to respond() / reset_conversation()
+        """
+        return ConversationState()
+    
+    def _take_cache(self, state):
+        """Remove and return a conversation's cached keys/values, if still valid"""
+        with self._kv_cache_lock:
+            entry = self._kv_cache.pop(state, None)
+        if entry is None or entry[0] != state.version:
+            return None
+        return entry[1]
+    
+    def _put_cache(self, state, past_key_values):
+        """Keep a conversation's keys/values, evicting the least recently used"""
+        if self.max_cached_conversations <= 0 or past_key_values is None:
+            return
+        with self._kv_cache_lock:
+            self._kv_cache[state] = (state.version, past_key_values)
+            while len(self._kv_cache) > self.max_cached_conversations:
+                self._kv_cache.popitem(last=False)
+    
+    def drop_cache(self, state):
+        """Free the cached keys/values of a conversation"""
+        with self._kv_cache_lock:
+            self._kv_cache.pop(state, None)
+    
+    def respond(self, user_input, max_length=1000, state=None, on_text=None,
+                deadline=None, cancel_token=None, max_chars=None):
         """
         Generate a response to user input
         
+        The history is kept within the state's token budget, and the
+        keys/values computed in the previous turn are reused, so each
+        turn only encodes the new message instead of the whole history.
+        
         Args:
             user_input: String from user
             max_length: Maximum conversation length to track
+            state: ConversationState to use (default: this bot's own)
+            on_text: Optional callback receiving the response text as it
+                is produced
+            deadline: time.monotonic() value at which to stop and return
+                the reply so far (see generation_control.deadline_after)
+            cancel_token: CancellationToken that stops generation early.
+                A cancelled reply is not added to the history.
+            max_chars: Longest reply wanted (e.g. 2000 for a Discord
+                message); decoding stops once it is filled
             
         Returns:
             String response
         """
-        # Encode user input and add to chat history
-        new_input_ids = self.tokenizer.encode(
-            user_input + self.tokenizer.eos_token,
-            return_tensors='pt'
-        )
+        import torch
+        
+        if state is None:
+            state = self.state
+        if cancel_token is not None and cancel_token.cancelled:
+            # Cancelled while it waited for a worker
+            return ""
+        
+        # Encode user input and make room for it in the history
+        new_input_ids = self.tokenizer.encode(user_input + self.tokenizer.eos_token)
+        state.make_room(len(new_input_ids))
         
         # Append to chat history
-        if self.chat_history_ids is not None:
-            bot_input_ids = torch.cat([self.chat_history_ids, new_input_ids], dim=-1)
-        else:
-            bot_input_ids = new_input_ids
+        bot_input_ids = torch.tensor([state.history_ids() + new_input_ids])
+        past_key_values = self._take_cache(state)
         
-        # Generate response
-        self.chat_history_ids = self.model.generate(
+        # Generate response (only tokens not covered by the cache are encoded)
+        output = self.model.generate(
             bot_input_ids,
+            attention_mask=torch.ones_like(bot_input_ids),
+            past_key_values=past_key_values,
+            use_cache=True,
+            return_dict_in_generate=True,
             max_length=max_length,
             pad_token_id=self.tokenizer.eos_token_id,
             do_sample=True,
             top_k=50,
             top_p=0.95,
-            temperature=0.7
+            temperature=0.7,
+            streamer=make_streamer(self.tokenizer, on_text) if on_text else None,
+            stopping_criteria=make_stopping_criteria(
+                deadline, cancel_token, max_chars=max_chars,
+                tokenizer=self.tokenizer, prompt_tokens=bot_input_ids.shape[-1]
+            )
         )
         
+        reply_ids = output.sequences[0, bot_input_ids.shape[-1]:].tolist()
+        if cancel_token is None or not cancel_token.cancelled:
+            state.add_turn(new_input_ids + reply_ids)
+            self._put_cache(state, output.past_key_values)
+        
         # Decode response
-        response = self.tokenizer.decode(
-            self.chat_history_ids[:, bot_input_ids.shape[-1]:][0],
-            skip_special_tokens=True
-        )
+        response = self.tokenizer.decode(reply_ids, skip_special_tokens=True)
         
-        return response
+        return response[:max_chars]
+    
+    def reset_conversation(self, state=None):
+        """
+        Reset conversation history
+        
+        Args:
+            state: ConversationState to reset (default: this bot's own)
+        """
+        if state is None:
+            state = self.state
+        state.reset()
+        self.drop_cache(state)
     
-    def reset_conversation(self):
-        """Reset conversation history"""
-        self.chat_history_ids = None
+    def warmup(self):
+        """Run one small forward pass so the first real request is fast"""
+        self.respond_no_history("Hello", max_new_tokens=2)
     
-    def respond_no_history(self, user_input, max_new_tokens=100):
+    def respond_no_history(self, user_input, max_new_tokens=100, deadline=None, cancel_token=None,
+                           max_chars=None):
         """
         Generate one-time response without conversation history
         Useful for independent queries
@@ -83,6 +231,9 @@ class Chatbot:
         Args:
             user_input: String from user
             max_new_tokens: Maximum tokens to generate
+            deadline: time.monotonic() value at which to stop early
+            cancel_token: CancellationToken that stops generation early
+            max_chars: Longest reply wanted
             
         Returns:
             String response
@@ -99,7 +250,11 @@ class Chatbot:
             do_sample=True,
             top_k=50,
             top_p=0.95,
-            temperature=0.7
+            temperature=0.7,
+            stopping_criteria=make_stopping_criteria(
+                deadline, cancel_token, max_chars=max_chars,
+                tokenizer=self.tokenizer, prompt_tokens=input_ids.shape[-1]
+            )
         )
         
         response = self.tokenizer.decode(
@@ -107,7 +262,7 @@ class Chatbot:
             skip_special_tokens=True
         )
         
-        return response
+        return response[:max_chars]
 
 
 # Example usage
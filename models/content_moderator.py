@@ -3,31 +3,73 @@ Content Moderation
 Detects toxic content, hate speech, and inappropriate messages
 """
 
-from transformers import pipeline
+from models.backend import pipeline
+from models.batching import run_bucketed
+from models.onnx_backend import to_onnx
+from models.precision import apply_precision
+from models.result_cache import ResultCache, cached_batch, make_normalizer
 
 
 class ContentModerator:
-    def __init__(self, model_type="toxic"):
+    # Labels that mean inappropriate (toxic-bert / hate model / binary models)
+    FLAG_LABELS = ('toxic', 'hate', 'label_1')
+    
+    def __init__(self, model_type="toxic", cache=None, precision="fp32", backend="torch"):
         """
         Initialize content moderator
         
         Args:
             model_type: "toxic" for toxicity or "hate" for hate speech
+            cache: Optional ResultCache for repeated messages
+            precision: "fp32", "bf16", or "int8" (dynamic quantization)
+            backend: "torch" (eager PyTorch) or "onnx" (onnxruntime, exported
+                once and cached on disk; fp32 or int8 only)
         """
         if model_type == "toxic":
-            self.model = pipeline(
-                "text-classification",
-                model="unitary/toxic-bert"
-            )
+            self.model_name = "unitary/toxic-bert"
         elif model_type == "hate":
-            self.model = pipeline(
-                "text-classification",
-                model="facebook/roberta-hate-speech-dynabench-r4-target"
-            )
+            self.model_name = "facebook/roberta-hate-speech-dynabench-r4-target"
         else:
             raise ValueError("model_type must be 'toxic' or 'hate'")
         
+        self.model = pipeline(
+            "text-classification",
+            model=self.model_name
+        )
+        if backend == "onnx":
+            self.model.model = to_onnx(self.model.model, self.model.tokenizer, self.model_name, precision)
+        elif backend == "torch":
+            self.model.model = apply_precision(self.model.model, precision)
+        else:
+            raise ValueError("backend must be 'torch' or 'onnx'")
+        
         self.model_type = model_type
+        self.precision = precision
+        self.backend = backend
+        self.cache = cache
+        self._normalize = make_normalizer(self.model.tokenizer)
+    
+    def _cache_key(self, text, threshold):
+        """Cache key for a text checked at a threshold"""
+        return ResultCache.make_key(
+            self.model_name, self._normalize(text),
+            precision=self.precision, backend=self.backend, threshold=threshold
+        )
+    
+    @staticmethod
+    def _to_result(result, threshold):
+        """Turn a pipeline output into a moderation result"""
+        # Check if toxic/hate speech
+        is_inappropriate = (
+            result['score'] > threshold and 
+            result['label'].lower() in ContentModerator.FLAG_LABELS
+        )
+        
+        return {
+            'is_inappropriate': is_inappropriate,
+            'label': result['label'],
+            'confidence': result['score']
+        }
     
     def check(self, text, threshold=0.7):
         """
@@ -40,44 +82,46 @@ class ContentModerator:
         Returns:
             dict with is_inappropriate (bool), label, and score
         """
-        result = self.model(text)[0]
+        if self.cache is not None:
+            key = self._cache_key(text, threshold)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
-        # Check if toxic/hate speech
-        is_inappropriate = (
-            result['score'] > threshold and 
-            result['label'].lower() in ['toxic', 'hate', 'label_1']
-        )
+        result = self._to_result(self.model(text)[0], threshold)
         
-        return {
-            'is_inappropriate': is_inappropriate,
-            'label': result['label'],
-            'confidence': result['score']
-        }
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
     
-    def check_batch(self, texts, threshold=0.7):
+    def warmup(self):
+        """Run one small forward pass so the first real request is fast"""
+        self.check("Warming up the moderation model")
+    
+    def check_batch(self, texts, threshold=0.7, batch_size=32):
         """
         Check multiple texts at once
         
+        Texts are grouped by token length so short messages are not
+        padded to the length of the longest one.
+        
         Args:
             texts: List of strings
             threshold: Confidence threshold
+            batch_size: Maximum texts per forward pass
             
         Returns:
-            List of results
+            List of results (same order as texts)
         """
-        results = self.model(texts)
+        def compute(batch):
+            results = run_bucketed(self.model, batch, max_batch_size=batch_size)
+            return [self._to_result(r, threshold) for r in results]
+        
+        if self.cache is None:
+            return compute(texts)
         
-        return [
-            {
-                'is_inappropriate': (
-                    r['score'] > threshold and 
-                    r['label'].lower() in ['toxic', 'hate', 'label_1']
-                ),
-                'label': r['label'],
-                'confidence': r['score']
-            }
-            for r in results
-        ]
+        keys = [self._cache_key(text, threshold) for text in texts]
+        return cached_batch(self.cache, keys, texts, compute)
 
 
 # Example usage
@@ -0,0 +1,252 @@
+"""
+Conversation Store
+Per-user chat histories with a bounded in-memory LRU, idle expiry, and sqlite spill
+"""
+
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from models.chatbot import ConversationState
+
+
+def pack_turns(turns):
+    """Encode turns of token IDs as two uint32 blobs (turn lengths, tokens)"""
+    lengths = array('I', (len(turn) for turn in turns))
+    tokens = array('I', (token for turn in turns for token in turn))
+    return lengths.tobytes(), tokens.tobytes()
+
+
+def unpack_turns(lengths_blob, tokens_blob):
+    """Decode blobs written by pack_turns back into lists of token IDs"""
+    lengths = array('I')
+    lengths.frombytes(lengths_blob)
+    tokens = array('I')
+    tokens.frombytes(tokens_blob)
+
+    turns, start = [], 0
+    for length in lengths:
+        turns.append(tokens[start:start + length].tolist())
+        start += length
+    return turns
+
+
+class ConversationStore:
+    def __init__(self, max_history_tokens=512, max_resident=1000, idle_ttl=1800,
+                 db_path=None, on_evict=None):
+        """
+        Initialize conversation store
+
+        At most max_resident conversations are kept in memory, so resident
+        history is bounded by max_resident x max_history_tokens token IDs.
+        The least recently used conversation (or one idle for longer than
+        idle_ttl) is written to sqlite and dropped from memory; it is read
+        back when its user chats again.
+
+        Args:
+            max_history_tokens: Token budget of each conversation
+            max_resident: Most conversations held in memory
+            idle_ttl: Seconds of inactivity before evict_idle() spills a
+                conversation (None = only the LRU limit applies)
+            db_path: sqlite file for spilled conversations (None = evicted
+                conversations are forgotten)
+            on_evict: Optional callback taking an evicted ConversationState,
+                e.g. to free the chatbot's cached keys/values for it
+        """
+        self.max_history_tokens = max_history_tokens
+        self.max_resident = max_resident
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+
+        # user ID -> [state, last used, in use count], least recently used first
+        self._resident = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "user_id TEXT PRIMARY KEY, lengths BLOB NOT NULL, tokens BLOB NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _load(self, user_id):
+        """Read a spilled conversation, or start a new one (lock held)"""
+        state = ConversationState(max_history_tokens=self.max_history_tokens)
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT lengths, tokens FROM conversations WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row:
+                state.turns = unpack_turns(*row)
+                # The budget may have shrunk since it was saved
+                state.make_room(0)
+                self.loads += 1
+        return state
+
+    def _save(self, user_id, state):
+        """Write a conversation to sqlite (lock held)"""
+        if self._db is None:
+            return
+        if state.turns:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations (user_id, lengths, tokens, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, *pack_turns(state.turns), time.time())
+            )
+        else:
+            self._db.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+        self._db.commit()
+
+    def _evict(self, user_id):
+        """Spill a resident conversation and drop it from memory (lock held)"""
+        state, _, _ = self._resident.pop(user_id)
+        self._save(user_id, state)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(state)
+
+    def _shrink(self):
+        """Evict least recently used idle conversations over max_resident (lock held)"""
+        excess = len(self._resident) - self.max_resident
+        for user_id, (_, _, in_use) in list(self._resident.items()):
+            if excess <= 0:
+                break
+            # A conversation mid-reply stays until it is released
+            if not in_use:
+                self._evict(user_id)
+                excess -= 1
+
+    def acquire(self, user_id):
+        """
+        Hold a user's conversation until release(user_id)
+
+        May read sqlite (and spill other conversations), so async callers
+        should run it in a thread.
+
+        Returns:
+            The user's ConversationState
+        """
+        with self._lock:
+            entry = self._resident.get(user_id)
+            if entry is None:
+                entry = self._resident[user_id] = [self._load(user_id), 0.0, 0]
+            else:
+                self.hits += 1
+                self._resident.move_to_end(user_id)
+            entry[1] = time.monotonic()
+            entry[2] += 1
+            self._shrink()
+            return entry[0]
+
+    def release(self, user_id):
+        """Save a held conversation and let it be evicted again (writes sqlite)"""
+        with self._lock:
+            entry = self._resident[user_id]
+            entry[1] = time.monotonic()
+            entry[2] -= 1
+            self._save(user_id, entry[0])
+            self._shrink()
+
+    @contextmanager
+    def use(self, user_id):
+        """
+        Hold a user's conversation for one turn
+
+        The conversation cannot be evicted while held, and is saved when
+        released, so a restart loses at most the turns in progress.
+
+        Yields:
+            The user's ConversationState
+        """
+        state = self.acquire(user_id)
+        try:
+            yield state
+        finally:
+            self.release(user_id)
+
+    def reset(self, user_id):
+        """
+        Forget a user's conversation
+
+        Returns:
+            True if the user had a conversation (in memory or on disk)
+        """
+        with self._lock:
+            existed = False
+            entry = self._resident.get(user_id)
+            if entry is not None:
+                existed = bool(entry[0].turns)
+                entry[0].reset()
+                if self.on_evict is not None:
+                    self.on_evict(entry[0])
+            if self._db is not None:
+                deleted = self._db.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+                existed = existed or deleted.rowcount > 0
+                self._db.commit()
+            return existed
+
+    def evict_idle(self):
+        """
+        Spill conversations unused for longer than idle_ttl
+
+        Returns:
+            Number of conversations evicted
+        """
+        if self.idle_ttl is None:
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                user_id for user_id, (_, last_used, in_use) in self._resident.items()
+                if not in_use and now - last_used > self.idle_ttl
+            ]
+            for user_id in idle:
+                self._evict(user_id)
+        return len(idle)
+
+    def stats(self):
+        """
+        Store statistics
+
+        Returns:
+            dict with resident, resident_tokens, stored (conversations
+            on disk), hits, loads (read back from disk), and evictions
+        """
+        with self._lock:
+            stored = 0
+            if self._db is not None:
+                stored = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            return {
+                'resident': len(self._resident),
+                'resident_tokens': sum(state.num_tokens() for state, _, _ in self._resident.values()),
+                'stored': stored,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
+
+
+# Example usage
+if __name__ == "__main__":
+    store = ConversationStore(max_resident=2, db_path=":memory:")
+
+    for user_id in ["alice", "bob", "carol"]:
+        with store.use(user_id) as state:
+            state.add_turn([101, 102, 103, 50256])
+
+    # alice was evicted to make room for carol, and comes back from disk
+    with store.use("alice") as state:
+        print(f"alice's history: {state.history_ids()}")
+    print(store.stats())
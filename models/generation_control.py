@@ -0,0 +1,129 @@
+"""
+Generation Control
+Deadlines, cancellation and output size budgets for generate(), checked after
+every decoding step
+"""
+
+import threading
+import time
+
+
+# Discord limits, in characters
+MESSAGE_LIMIT = 2000
+EMBED_FIELD_LIMIT = 1024
+
+
+class CancellationToken:
+    def __init__(self):
+        """
+        Flag that asks a running generation to stop
+
+        Safe to cancel from any thread (e.g. the event loop) while the
+        generation runs on an inference worker.
+        """
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Ask the generation to stop after its current decoding step"""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+def deadline_after(seconds):
+    """
+    Deadline for generate(deadline=...)
+
+    Args:
+        seconds: Time allowed from now (None = no deadline)
+
+    Returns:
+        time.monotonic() value, or None
+    """
+    return None if seconds is None else time.monotonic() + seconds
+
+
+def expired(deadline):
+    """Whether a deadline from deadline_after() has passed"""
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def make_stopping_criteria(deadline=None, cancel_token=None, max_chars=None,
+                           tokenizer=None, prompt_tokens=0):
+    """
+    Build stopping criteria that end generation at a deadline, on cancel,
+    or once the output fills a character budget
+
+    generate() checks them after each new token, so the text produced
+    up to that point is returned as usual.
+
+    Args:
+        deadline: time.monotonic() value to stop at (None = no deadline)
+        cancel_token: CancellationToken to watch (None = not cancellable)
+        max_chars: Characters of new text after which a sequence stops
+            (None = no budget). Text beyond what can be sent is never
+            generated; the caller still trims the last token's overshoot.
+        tokenizer: Tokenizer used to decode new tokens (needed with max_chars)
+        prompt_tokens: Number of prompt tokens at the start of each sequence
+
+    Returns:
+        StoppingCriteriaList to pass as generate(stopping_criteria=...),
+        or None when there is nothing to enforce
+    """
+    if deadline is None and cancel_token is None and max_chars is None:
+        return None
+
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class ControlCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            stop = expired(deadline) or (cancel_token is not None and cancel_token.cancelled)
+            # One flag per sequence in the batch
+            done = torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+            if max_chars is not None and not stop:
+                texts = tokenizer.batch_decode(input_ids[:, prompt_tokens:], skip_special_tokens=True)
+                done = torch.tensor(
+                    [len(text) >= max_chars for text in texts], dtype=torch.bool, device=input_ids.device
+                )
+            return done
+
+    return StoppingCriteriaList([ControlCriteria()])
+
+
+# Example usage
+if __name__ == "__main__":
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained("gpt2")
+    model = AutoModelForCausalLM.from_pretrained("gpt2")
+    input_ids = tokenizer("Once upon a time", return_tensors="pt").input_ids
+
+    deadline = deadline_after(0.5)
+    start = time.perf_counter()
+    output = model.generate(
+        input_ids, max_new_tokens=500, do_sample=True, pad_token_id=tokenizer.eos_token_id,
+        stopping_criteria=make_stopping_criteria(deadline=deadline)
+    )
+    print(f"{output.shape[-1] - input_ids.shape[-1]} tokens in {time.perf_counter() - start:.2f}s "
+          f"(deadline hit: {expired(deadline)})")
+    print(tokenizer.decode(output[0], skip_special_tokens=True))
+
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+    output = model.generate(
+        input_ids, max_new_tokens=500, do_sample=True, pad_token_id=tokenizer.eos_token_id,
+        stopping_criteria=make_stopping_criteria(cancel_token=token)
+    )
+    print(f"Cancelled after {output.shape[-1] - input_ids.shape[-1]} tokens")
+
+    output = model.generate(
+        input_ids, max_new_tokens=500, do_sample=True, pad_token_id=tokenizer.eos_token_id,
+        stopping_criteria=make_stopping_criteria(
+            max_chars=100, tokenizer=tokenizer, prompt_tokens=input_ids.shape[-1]
+        )
+    )
+    text = tokenizer.decode(output[0, input_ids.shape[-1]:], skip_special_tokens=True)
+    print(f"Budget of 100 characters: {output.shape[-1] - input_ids.shape[-1]} tokens, {len(text)} characters")
@@ -0,0 +1,72 @@
+"""
+Guild Settings
+Per-server settings with defaults, cached in memory and saved to sqlite
+"""
+
+import json
+import sqlite3
+import threading
+
+
+class GuildSettings:
+    def __init__(self, defaults, db_path=None):
+        """
+        Initialize guild settings
+
+        Args:
+            defaults: dict of setting name -> default value
+            db_path: sqlite file to persist changes (None = memory only)
+        """
+        self.defaults = dict(defaults)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS guild_settings ("
+                "guild_id INTEGER PRIMARY KEY, settings TEXT NOT NULL)"
+            )
+            self._db.commit()
+            for guild_id, settings in self._db.execute("SELECT guild_id, settings FROM guild_settings"):
+                self._cache[guild_id] = json.loads(settings)
+
+    def get(self, guild_id):
+        """
+        Settings of a guild
+
+        Returns:
+            dict with every setting (defaults for those never changed)
+        """
+        return {**self.defaults, **self._cache.get(guild_id, {})}
+
+    def update(self, guild_id, **values):
+        """
+        Change settings of a guild
+
+        Returns:
+            The guild's settings after the change
+        """
+        unknown = set(values) - set(self.defaults)
+        if unknown:
+            raise KeyError(f"unknown settings: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            changed = {**self._cache.get(guild_id, {}), **values}
+            self._cache[guild_id] = changed
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO guild_settings (guild_id, settings) VALUES (?, ?)",
+                    (guild_id, json.dumps(changed))
+                )
+                self._db.commit()
+        return self.get(guild_id)
+
+
+# Example usage
+if __name__ == "__main__":
+    settings = GuildSettings({'automod_enabled': False, 'automod_threshold': 0.8})
+    settings.update(1234, automod_enabled=True)
+    print(settings.get(1234))
+    print(settings.get(5678))
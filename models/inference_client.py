@@ -0,0 +1,278 @@
+"""
+Inference Client
+Calls models hosted by an inference server over a small pool of pipelined
+connections, with the same call shape as calling the model in-process
+"""
+
+import itertools
+import json
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from models.inference_server import encode, parse_address, MAX_LINE_BYTES
+
+
+class InferenceError(RuntimeError):
+    """A model call that failed on the inference server"""
+
+
+class _Connection:
+    def __init__(self, address, connect_timeout):
+        """One socket to the server, with a thread that reads its responses"""
+        kind, where = parse_address(address)
+        if kind == 'unix':
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(connect_timeout)
+        self.sock.connect(where)
+        self.sock.settimeout(None)
+
+        self.closed = False
+        # request ID -> (Future, on_text callback)
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="inference-client", daemon=True)
+        self._reader.start()
+
+    def send(self, message, future=None, on_text=None):
+        line = encode(message)
+        if len(line) > MAX_LINE_BYTES:
+            raise ValueError(f"request is larger than the server accepts ({len(line)} > {MAX_LINE_BYTES} bytes)")
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("connection to the inference server is closed")
+            if future is not None:
+                self.pending[message['id']] = (future, on_text)
+            self.sock.sendall(line)
+
+    def _read(self):
+        try:
+            for line in self.sock.makefile('rb'):
+                message = json.loads(line)
+                if 'text' in message:
+                    entry = self.pending.get(message['id'])
+                    if entry is not None and entry[1] is not None:
+                        entry[1](message['text'])
+                    continue
+                with self._lock:
+                    entry = self.pending.pop(message['id'], None)
+                if entry is not None:
+                    entry[0].set_result(message)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self):
+        with self._lock:
+            self.closed = True
+            pending, self.pending = self.pending, {}
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("lost connection to the inference server"))
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self._fail_pending()
+
+
+class InferenceClient:
+    def __init__(self, address, pool_size=4, connect_timeout=5.0, request_timeout=120.0):
+        """
+        Initialize inference client
+
+        Connections are opened on demand, up to pool_size; each call goes
+        to the one with the fewest requests in flight, and a connection
+        that drops is replaced by the next call. Safe to use from many
+        threads at once.
+
+        Args:
+            address: "unix:/path/to/socket" or "host:port" of the server
+            pool_size: Most connections kept open
+            connect_timeout: Seconds to wait when opening a connection
+            request_timeout: Seconds to wait for a response before raising
+                TimeoutError, e.g. when a server worker hangs (None =
+                forever). Calls with a deadline get this much on top of it.
+        """
+        parse_address(address)
+        self.address = address
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+
+        # Names this client's conversations on the server
+        self.client_id = uuid.uuid4().hex
+        self._connections = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def _connection(self):
+        """A live connection, opening one if all are busy and the pool has room"""
+        with self._lock:
+            self._connections = [c for c in self._connections if not c.closed]
+            idle = [c for c in self._connections if not c.pending]
+            if idle:
+                return idle[0]
+            if len(self._connections) < self.pool_size:
+                connection = _Connection(self.address, self.connect_timeout)
+                self._connections.append(connection)
+                return connection
+            return min(self._connections, key=lambda c: len(c.pending))
+
+    def request(self, message, on_text=None, cancel_token=None, timeout=None):
+        """
+        Send one protocol message and wait for its response
+
+        Args:
+            message: Request dict (an "id" is added)
+            on_text: Callback for streamed {"text"} lines
+            cancel_token: CancellationToken; once cancelled, the server is
+                asked to stop the request
+            timeout: Seconds to wait for the response (default:
+                request_timeout)
+
+        Returns:
+            The response dict
+
+        Raises:
+            TimeoutError: No response within the timeout
+        """
+        timeout = self.request_timeout if timeout is None else timeout
+        expires = time.monotonic() + timeout if timeout is not None else None
+        message = dict(message, id=next(self._ids))
+        future = Future()
+        connection = self._connection()
+        connection.send(message, future, on_text)
+
+        cancel_sent = False
+        while True:
+            wait = 0.05 if cancel_token is not None else None
+            if expires is not None:
+                remaining = max(expires - time.monotonic(), 0.0)
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                return future.result(timeout=wait)
+            except FutureTimeoutError:
+                timed_out = expires is not None and time.monotonic() >= expires
+                if timed_out:
+                    # Forget the request, so a late response is dropped and
+                    # the connection no longer counts it as in flight
+                    with connection._lock:
+                        connection.pending.pop(message['id'], None)
+                cancelled = cancel_token is not None and cancel_token.cancelled
+                if (cancelled or timed_out and message.get('cancellable')) and not cancel_sent:
+                    cancel_sent = True
+                    try:
+                        connection.send({'op': 'cancel', 'id': message['id']})
+                    except (ConnectionError, OSError):
+                        pass
+                if timed_out:
+                    raise TimeoutError(f"no response from the inference server within {timeout:g}s")
+
+    def call(self, model_key, method, *args, on_text=None, deadline=None, cancel_token=None,
+             state=None, **kwargs):
+        """
+        Call a model method on the server (blocking)
+
+        Takes the same arguments as the method itself: on_text is called
+        here as text streams in, the deadline and cancel_token are
+        enforced on the server, and a ConversationState's history is sent
+        along and updated with the new turn.
+
+        Returns:
+            Whatever the method returns (JSON types: tuples come back as lists)
+
+        Raises:
+            InferenceError: The call failed on the server
+            TimeoutError: No response within request_timeout (plus the
+                time until the deadline)
+            ConnectionError / OSError: The server could not be reached
+        """
+        message = {'model': model_key, 'method': method, 'args': args, 'kwargs': kwargs}
+        if on_text is not None:
+            message['stream'] = True
+        if deadline is not None:
+            message['timeout'] = max(deadline - time.monotonic(), 0.0)
+        if cancel_token is not None:
+            message['cancellable'] = True
+        if state is not None:
+            message['conversation'] = {
+                'key': f"{self.client_id}:{id(state)}",
+                'turns': state.turns,
+                'max_history_tokens': state.max_history_tokens,
+            }
+
+        timeout = self.request_timeout
+        if deadline is not None and timeout is not None:
+            # The server stops at the deadline; the timeout covers the reply after it
+            timeout += message['timeout']
+
+        start = time.perf_counter()
+        try:
+            response = self.request(message, on_text=on_text, cancel_token=cancel_token, timeout=timeout)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.calls += 1
+            self.total_seconds += time.perf_counter() - start
+
+        if 'error' in response:
+            self.errors += 1
+            raise InferenceError(f"{response['type']}: {response['error']}")
+        if state is not None:
+            state.turns = response['turns']
+        return response['result']
+
+    def server_stats(self):
+        """The server's stats() (blocking)"""
+        return self.request({'op': 'stats'})['result']
+
+    def stats(self):
+        """
+        Client statistics
+
+        Returns:
+            dict with connections, in_flight, calls, errors, and
+            avg_call_ms (round trip, including time queued on the server)
+        """
+        with self._lock:
+            live = [c for c in self._connections if not c.closed]
+        return {
+            'connections': len(live),
+            'in_flight': sum(len(c.pending) for c in live),
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_call_ms': self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+        }
+
+    def close(self):
+        """Close every connection"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+
+# Example usage
+if __name__ == "__main__":
+    # Start a server first: python inference_server.py --listen 127.0.0.1:8787
+    client = InferenceClient("127.0.0.1:8787")
+    print(client.call('sentiment', 'analyze', "I love this!"))
+    print(client.call('moderator', 'check_batch', ["Hello friend!", "You are stupid!"]))
+    print(client.call('generator', 'generate', "Once upon a time", max_length=40, on_text=print))
+    print(client.stats())
+    client.close()
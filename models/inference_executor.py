@@ -0,0 +1,295 @@
+"""
+Inference Executor
+Runs blocking model calls on a bounded thread pool so the asyncio event loop
+only has to deal with Discord I/O. Queued calls are scheduled by priority
+class, with fair turns across guilds and users within a class.
+"""
+
+import asyncio
+import functools
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Highest priority first
+PRIORITY_CLASSES = ("moderation", "classification", "qa", "generation")
+
+DEFAULT_MODEL_CLASSES = {
+    'moderator': "moderation",
+    'sentiment': "classification",
+    'qa': "qa",
+    'generator': "generation",
+    'chatbot': "generation",
+}
+
+# Upper bounds (ms) of the wait time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, 30000, float('inf'))
+
+
+class _Job:
+    __slots__ = ('model_key', 'call', 'future', 'queued_at')
+
+    def __init__(self, model_key, call, future):
+        self.model_key = model_key
+        self.call = call
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class _ClassQueue:
+    def __init__(self):
+        """Jobs of one priority class: guild -> user -> jobs, each level taking turns"""
+        self.guilds = OrderedDict()
+        self.depth = 0
+        self.max_depth = 0
+        self.running = 0
+        self.completed = 0
+        self.wait_counts = [0] * len(WAIT_BUCKETS_MS)
+        self.wait_seconds = 0.0
+
+    def push(self, tenant, job):
+        guild, user = tenant
+        self.guilds.setdefault(guild, OrderedDict()).setdefault(user, deque()).append(job)
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def pop(self, runnable):
+        """
+        Take the next job whose model may run, round-robin over guilds,
+        then over users within the guild
+
+        Args:
+            runnable: Callable telling whether a model key may start a job
+
+        Returns:
+            A _Job, or None if nothing queued can run now
+        """
+        for guild, users in list(self.guilds.items()):
+            for user, jobs in list(users.items()):
+                # Callers that gave up while queued
+                while jobs and jobs[0].future.done():
+                    jobs.popleft()
+                    self.depth -= 1
+                if jobs and runnable(jobs[0].model_key):
+                    job = jobs.popleft()
+                    self.depth -= 1
+                    # This user and guild go to the back of their queues
+                    users.move_to_end(user)
+                    self.guilds.move_to_end(guild)
+                    self._prune(guild, user)
+                    return job
+                self._prune(guild, user)
+        return None
+
+    def _prune(self, guild, user):
+        users = self.guilds[guild]
+        if not users[user]:
+            del users[user]
+        if not users:
+            del self.guilds[guild]
+
+    def record_wait(self, seconds):
+        self.wait_seconds += seconds
+        ms = seconds * 1000
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if ms <= bound:
+                self.wait_counts[i] += 1
+                break
+
+
+class InferenceExecutor:
+    def __init__(self, max_workers=2, max_in_flight=None, default_max_in_flight=1,
+                 model_classes=None, class_workers=None):
+        """
+        Initialize inference executor
+
+        Whenever a worker is free, the highest priority class with a job
+        that may start gets it. Each class also has its own worker quota:
+        the most workers its jobs may hold at once. By default QA and
+        generation may each use all but one worker, so a burst of
+        >>generate never makes moderation wait for a whole generation,
+        and a QA job never waits behind generation while a worker is
+        free.
+
+        Args:
+            max_workers: Number of threads that run model calls
+            max_in_flight: dict of model key -> max concurrent jobs for that model
+            default_max_in_flight: Limit for model keys not in max_in_flight
+            model_classes: dict of model key -> priority class
+                (default: DEFAULT_MODEL_CLASSES; unknown keys are "classification")
+            class_workers: dict of priority class -> worker quota
+                (default: all workers for moderation and classification,
+                all but one each for QA and generation)
+        """
+        self.max_workers = max_workers
+        self.max_in_flight = dict(max_in_flight or {})
+        self.default_max_in_flight = default_max_in_flight
+        self.model_classes = dict(model_classes or DEFAULT_MODEL_CLASSES)
+        self.class_workers = {
+            "moderation": max_workers,
+            "classification": max_workers,
+            "qa": max(max_workers - 1, 1),
+            "generation": max(max_workers - 1, 1),
+            **(class_workers or {}),
+        }
+        unknown = set(self.class_workers) - set(PRIORITY_CLASSES)
+        if unknown:
+            raise ValueError(f"unknown priority classes: {', '.join(sorted(unknown))}")
+
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="inference"
+        )
+
+        self._queues = {name: _ClassQueue() for name in PRIORITY_CLASSES}
+        self._active = {}
+
+    def priority_class(self, model_key):
+        """Priority class of a model's jobs"""
+        return self.model_classes.get(model_key, "classification")
+
+    def _can_start(self, class_name, model_key):
+        """Whether a job may take a free worker now"""
+        if self._queues[class_name].running >= self.class_workers[class_name]:
+            return False
+        limit = self.max_in_flight.get(model_key, self.default_max_in_flight)
+        return self._active.get(model_key, 0) < limit
+
+    def _dispatch(self):
+        """Start queued jobs on free workers, highest priority first"""
+        loop = asyncio.get_running_loop()
+        while self.in_flight() < self.max_workers:
+            for class_name in PRIORITY_CLASSES:
+                queue = self._queues[class_name]
+                if not queue.depth:
+                    continue
+                job = queue.pop(functools.partial(self._can_start, class_name))
+                if job is not None:
+                    break
+            else:
+                return
+
+            queue.running += 1
+            self._active[job.model_key] = self._active.get(job.model_key, 0) + 1
+            queue.record_wait(time.perf_counter() - job.queued_at)
+
+            running = loop.run_in_executor(self.pool, job.call)
+            running.add_done_callback(functools.partial(self._finished, class_name, job))
+
+    def _finished(self, class_name, job, running):
+        """Hand a job's outcome to its caller and start the next one"""
+        self._queues[class_name].running -= 1
+        self._queues[class_name].completed += 1
+        self._active[job.model_key] -= 1
+
+        if not job.future.done():
+            if running.cancelled():
+                job.future.cancel()
+            elif running.exception() is not None:
+                job.future.set_exception(running.exception())
+            else:
+                job.future.set_result(running.result())
+        self._dispatch()
+
+    async def run(self, model_key, func, *args, tenant=None, **kwargs):
+        """
+        Run a blocking model call without blocking the event loop
+
+        Args:
+            model_key: Name of the model the call uses (for priority and
+                in-flight limits)
+            func: Blocking callable
+            tenant: (guild ID, user ID) the call is made for; queued calls
+                take turns across guilds, then across users of a guild
+                (None = shared by everything without a tenant)
+            *args, **kwargs: Passed to func
+
+        Returns:
+            Whatever func returns
+        """
+        loop = asyncio.get_running_loop()
+        job = _Job(model_key, functools.partial(func, *args, **kwargs), loop.create_future())
+        self._queues[self.priority_class(model_key)].push(tenant or (None, None), job)
+        self._dispatch()
+        return await job.future
+
+    def in_flight(self, model_key=None):
+        """
+        Number of jobs currently running
+
+        Args:
+            model_key: Only count jobs for this model (default: all models)
+        """
+        if model_key is not None:
+            return self._active.get(model_key, 0)
+        return sum(self._active.values())
+
+    def stats(self):
+        """
+        Scheduler statistics per priority class
+
+        Returns:
+            dict of class -> dict with queued, max_queued, running,
+            completed, avg_wait_ms, p95_wait_ms (upper bound of the
+            histogram bucket), and wait_histogram (list of (upper bound
+            ms, count))
+        """
+        stats = {}
+        for name in PRIORITY_CLASSES:
+            queue = self._queues[name]
+            started = sum(queue.wait_counts)
+
+            p95 = 0.0
+            seen = 0
+            for bound, count in zip(WAIT_BUCKETS_MS, queue.wait_counts):
+                seen += count
+                if started and seen >= started * 0.95:
+                    p95 = bound
+                    break
+
+            stats[name] = {
+                'queued': queue.depth,
+                'max_queued': queue.max_depth,
+                'running': queue.running,
+                'completed': queue.completed,
+                'avg_wait_ms': queue.wait_seconds / started * 1000 if started else 0.0,
+                'p95_wait_ms': p95,
+                'wait_histogram': list(zip(WAIT_BUCKETS_MS, queue.wait_counts)),
+            }
+        return stats
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads"""
+        self.pool.shutdown(wait=wait)
+
+
+# Example usage
+if __name__ == "__main__":
+    executor = InferenceExecutor(max_workers=2)
+
+    def generate(text):
+        time.sleep(0.5)
+        return text.upper()
+
+    def moderate(text):
+        time.sleep(0.01)
+        return text.lower()
+
+    async def main():
+        start = time.perf_counter()
+        # A burst of generations from one guild, then a moderation check
+        jobs = [
+            asyncio.create_task(executor.run("generator", generate, f"story {i}", tenant=(1, 1)))
+            for i in range(4)
+        ]
+        await asyncio.sleep(0.1)
+        jobs.append(asyncio.create_task(executor.run("moderator", moderate, "CHECK ME", tenant=(2, 2))))
+        for job in asyncio.as_completed(jobs):
+            result = await job
+            print(f"{time.perf_counter() - start:.2f}s: {result}")
+        for name, stats in executor.stats().items():
+            print(f"{name}: completed {stats['completed']}, avg wait {stats['avg_wait_ms']:.0f} ms")
+
+    asyncio.run(main())
+    executor.shutdown()
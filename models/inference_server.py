@@ -0,0 +1,332 @@
+"""
+Inference Server
+Hosts the models for several bot processes (shards) on one host, over a
+Unix socket or TCP, speaking one JSON object per line
+"""
+
+import asyncio
+import itertools
+import json
+import os
+from collections import OrderedDict
+
+from models.chatbot import ConversationState
+from models.generation_control import CancellationToken, deadline_after
+from models.inference_executor import InferenceExecutor
+from models.micro_batcher import MicroBatcher
+
+
+# What clients may call, per model key. Anything else (the wrapped
+# pipelines, attributes, helpers) is refused.
+DEFAULT_METHODS = {
+    'sentiment': ('analyze', 'analyze_batch'),
+    'moderator': ('check', 'check_batch'),
+    'generator': ('generate', 'complete_sentence'),
+    'qa': ('answer', 'answer_multiple', 'answer_long', 'answer_passages'),
+    'chatbot': ('respond', 'respond_no_history'),
+}
+
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+
+# Methods taking a list of items as their only argument. Concurrent calls
+# (from any shard) are merged into larger batches.
+BATCHED_METHODS = ('analyze_batch', 'check_batch')
+
+# Longest protocol line. A QA context at the bot's 200,000 character limit
+# is at most 800 KB of UTF-8
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def parse_address(address):
+    """
+    Parse a server address
+
+    Args:
+        address: "unix:/path/to/socket", "host:port", or "port" (loopback)
+
+    Returns:
+        ("unix", path) or ("tcp", (host, port))
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    host = host or '127.0.0.1'
+    if not port.isdigit():
+        raise ValueError(f"inference server address must be unix:<path>, <host>:<port> or <port>, got {address!r}")
+    return 'tcp', (host, int(port))
+
+
+def encode(message):
+    """One protocol line: UTF-8 JSON (numpy and torch scalars as plain numbers) plus newline"""
+    def default(value):
+        if hasattr(value, 'tolist'):
+            return value.tolist()
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+    return (json.dumps(message, default=default, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+class InferenceServer:
+    def __init__(self, registry, executor=None, methods=None, batch_max_size=32, batch_max_wait_ms=5,
+                 max_conversations=256):
+        """
+        Initialize inference server
+
+        Requests are {"id", "model", "method", "args", "kwargs"} plus
+        optional "stream" (send {"id", "text"} lines as text is generated),
+        "timeout" (seconds until the deadline), "cancellable" (accept
+        {"op": "cancel", "id"}), and "conversation" ({"key", "turns",
+        "max_history_tokens"}, passed as state=). Responses are
+        {"id", "result"} (plus "turns" for conversations) or
+        {"id", "error", "type"}. {"op": "stats"} returns server statistics.
+
+        Each connection may have many requests in flight; responses come
+        back as they finish, so clients pool a few connections and
+        pipeline over them.
+
+        There is no authentication: anyone who can connect can use the
+        models. Prefer a Unix socket; TCP listens on loopback unless
+        start(allow_remote=True).
+
+        Args:
+            registry: ModelRegistry with the models to serve
+            executor: InferenceExecutor to run calls on (default: 2 workers)
+            methods: dict of model key -> method names clients may call
+                (default: DEFAULT_METHODS)
+            batch_max_size: Most items merged into one batched call
+            batch_max_wait_ms: How long a batched call waits for company
+            max_conversations: Chat conversations mirrored here between
+                turns, so the chatbot can keep reusing their cached
+                keys/values
+        """
+        self.registry = registry
+        self.executor = executor or InferenceExecutor(max_workers=2)
+        self.methods = {key: frozenset(names) for key, names in (methods or DEFAULT_METHODS).items()}
+        self.batch_max_size = batch_max_size
+        self.batch_max_wait_ms = batch_max_wait_ms
+        self.max_conversations = max_conversations
+
+        self._batchers = {}
+        self._conversations = OrderedDict()
+        self._peer_ids = itertools.count(1)
+        self._server = None
+        self._handlers = set()
+
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+
+    def _call_model(self, model_key, method, *args, **kwargs):
+        with self.registry.use(model_key) as model:
+            return getattr(model, method)(*args, **kwargs)
+
+    def _batcher(self, model_key, method):
+        batcher = self._batchers.get((model_key, method))
+        if batcher is None:
+            batcher = self._batchers[(model_key, method)] = MicroBatcher(
+                lambda items, **kwargs: self._call_model(model_key, method, items, **kwargs),
+                max_batch_size=self.batch_max_size,
+                max_wait_ms=self.batch_max_wait_ms,
+                executor=self.executor,
+                model_key=model_key
+            )
+        return batcher
+
+    def _conversation(self, conversation):
+        """The mirrored state of a client's conversation, rebuilt if it differs"""
+        key = conversation['key']
+        turns = [list(turn) for turn in conversation['turns']]
+        max_tokens = conversation['max_history_tokens']
+
+        state = self._conversations.pop(key, None)
+        if state is None or state.turns != turns or state.max_history_tokens != max_tokens:
+            state = ConversationState(max_history_tokens=max_tokens)
+            state.turns = turns
+        self._conversations[key] = state
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+        return state
+
+    async def _call(self, request, send, tokens, peer):
+        """Run one request and send its response"""
+        loop = asyncio.get_running_loop()
+        job_id = request.get('id')
+        state = None
+        try:
+            model_key, method = request['model'], request['method']
+            if method not in self.methods.get(model_key, ()):
+                raise ValueError(f"{model_key}.{method} is not served")
+            args = request.get('args', [])
+            kwargs = request.get('kwargs', {})
+
+            if request.get('stream'):
+                kwargs['on_text'] = lambda text: loop.call_soon_threadsafe(send, {'id': job_id, 'text': text})
+            if request.get('timeout') is not None:
+                kwargs['deadline'] = deadline_after(request['timeout'])
+            if request.get('cancellable'):
+                kwargs['cancel_token'] = tokens[job_id] = CancellationToken()
+            if request.get('conversation') is not None:
+                state = kwargs['state'] = self._conversation(request['conversation'])
+
+            batchable = (
+                method in BATCHED_METHODS and len(args) == 1
+                and all(isinstance(v, (str, int, float, bool, type(None))) for v in kwargs.values())
+            )
+            if batchable:
+                batcher = self._batcher(model_key, method)
+                result = await asyncio.gather(*(batcher.submit(item, **kwargs) for item in args[0]))
+            else:
+                # Shards take turns within each priority class
+                result = await self.executor.run(
+                    model_key, self._call_model, model_key, method, *args, tenant=(peer, None), **kwargs
+                )
+            response = {'id': job_id, 'result': result}
+            if state is not None:
+                response['turns'] = state.turns
+        except Exception as e:
+            self.errors += 1
+            response = {'id': job_id, 'error': str(e), 'type': type(e).__name__}
+        finally:
+            tokens.pop(job_id, None)
+        send(response)
+
+    async def _serve(self, reader, writer):
+        """Read requests from one connection until it closes"""
+        peer = next(self._peer_ids)
+        self.connections += 1
+        handler = (asyncio.current_task(), writer)
+        self._handlers.add(handler)
+        tokens = {}
+        tasks = set()
+
+        def send(message):
+            if not writer.is_closing():
+                writer.write(encode(message))
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than MAX_LINE_BYTES: the rest of the line can't be resynced
+                    send({'id': None, 'error': f"request is larger than {MAX_LINE_BYTES} bytes", 'type': 'ValueError'})
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    send({'id': None, 'error': "request is not valid JSON", 'type': 'ValueError'})
+                    continue
+
+                op = request.get('op', 'call')
+                if op == 'cancel':
+                    token = tokens.get(request.get('id'))
+                    if token is not None:
+                        token.cancel()
+                elif op == 'stats':
+                    send({'id': request.get('id'), 'result': self.stats()})
+                else:
+                    self.requests += 1
+                    task = asyncio.create_task(self._call(request, send, tokens, peer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        finally:
+            # Nobody is waiting for these any more
+            for token in tokens.values():
+                token.cancel()
+            self.connections -= 1
+            self._handlers.discard(handler)
+            writer.close()
+
+    async def start(self, address, allow_remote=False):
+        """
+        Start listening
+
+        Args:
+            address: "unix:/path/to/socket", "host:port" or "port" (port 0
+                picks a free port)
+            allow_remote: Allow a TCP address other than loopback
+
+        Returns:
+            The address clients can connect to
+        """
+        kind, where = parse_address(address)
+        if kind == 'tcp' and where[0] not in LOOPBACK_HOSTS and not allow_remote:
+            raise ValueError(
+                f"refusing to listen on {where[0]}: the server has no authentication "
+                "(use a Unix socket or loopback, or allow_remote=True)"
+            )
+        if kind == 'unix':
+            if os.path.exists(where):
+                os.unlink(where)
+            self._server = await asyncio.start_unix_server(self._serve, path=where, limit=MAX_LINE_BYTES)
+            return address
+        self._server = await asyncio.start_server(self._serve, *where, limit=MAX_LINE_BYTES)
+        return f"{where[0]}:{self._server.sockets[0].getsockname()[1]}"
+
+    async def serve_forever(self, address, allow_remote=False):
+        """Listen on address until cancelled"""
+        await self.start(address, allow_remote=allow_remote)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop listening and drop open connections"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Closing the transport ends each connection's read loop
+        handlers = list(self._handlers)
+        for _, writer in handlers:
+            writer.close()
+        await asyncio.gather(*(task for task, _ in handlers), return_exceptions=True)
+
+    def stats(self):
+        """
+        Server statistics
+
+        Returns:
+            dict with connections, requests, errors, conversations,
+            batching (per "model.method": batches, items, avg_batch_size)
+            and scheduler (InferenceExecutor.stats())
+        """
+        return {
+            'connections': self.connections,
+            'requests': self.requests,
+            'errors': self.errors,
+            'conversations': len(self._conversations),
+            'batching': {
+                f"{model_key}.{method}": batcher.stats()
+                for (model_key, method), batcher in self._batchers.items()
+            },
+            'scheduler': self.executor.stats(),
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    from models.inference_client import InferenceClient
+    from models.model_registry import ModelRegistry
+    from models.sentiment_analyzer import SentimentAnalyzer
+
+    registry = ModelRegistry()
+    registry.register('sentiment', lambda: SentimentAnalyzer(model_type="basic"))
+    server = InferenceServer(registry)
+
+    async def main():
+        await server.start("127.0.0.1:8787")
+        client = InferenceClient("127.0.0.1:8787", pool_size=2)
+        loop = asyncio.get_running_loop()
+        # Two "shards" asking at once end up in one batch
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, client.call, 'sentiment', 'analyze_batch', [text])
+            for text in ["I love this!", "This is terrible."]
+        ))
+        print(results)
+        print(server.stats()['batching'])
+        client.close()
+        await server.close()
+
+    asyncio.run(main())
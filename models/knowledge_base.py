@@ -0,0 +1,301 @@
+"""
+Knowledge Base
+Per-guild document store with an on-disk BM25 inverted index for QA retrieval
+"""
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from models.retrieval import bm25_weight, chunk_text, terms
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    added_by INTEGER,
+    added_at REAL NOT NULL,
+    num_chunks INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_guild ON documents (guild_id);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_doc ON chunks (doc_id);
+CREATE INDEX IF NOT EXISTS chunks_guild ON chunks (guild_id);
+
+CREATE TABLE IF NOT EXISTS postings (
+    guild_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, term, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+
+CREATE TABLE IF NOT EXISTS term_stats (
+    guild_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    doc_freq INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, term)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS guild_stats (
+    guild_id INTEGER PRIMARY KEY,
+    num_chunks INTEGER NOT NULL,
+    total_length INTEGER NOT NULL
+);
+"""
+
+
+class KnowledgeBase:
+    def __init__(self, db_path="knowledge_base.db", chunk_size=1000, overlap=200,
+                 mmap_mb=256, k1=1.5, b=0.75, max_documents=None, max_mb=None):
+        """
+        Initialize knowledge base
+
+        Documents are chunked and indexed once when added; questions only
+        read the postings of their own terms, so retrieval stays fast as
+        the store grows.
+
+        Args:
+            db_path: sqlite file holding documents and the index
+            chunk_size: Characters per chunk
+            overlap: Characters shared by neighbouring chunks
+            mmap_mb: How much of the database sqlite memory-maps for reads
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            max_documents: Most documents per guild (None = no limit)
+            max_mb: Most stored text per guild, counted over its chunks
+                (None = no limit)
+        """
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.k1 = k1
+        self.b = b
+        self.max_documents = max_documents
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(f"PRAGMA mmap_size = {int(mmap_mb * 1024 * 1024)}")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def add_document(self, guild_id, title, text, added_by=None):
+        """
+        Chunk and index a document
+
+        Args:
+            guild_id: Guild the document belongs to
+            title: Short name shown in listings and answers
+            text: Document text
+            added_by: User ID of whoever added it
+
+        Returns:
+            dict with id and num_chunks
+
+        Raises:
+            ValueError: The guild's document or size quota would be exceeded
+        """
+        chunks = [text[start:end] for start, end in chunk_text(text, self.chunk_size, self.overlap)]
+        chunks = [chunk for chunk in chunks if chunk.strip()]
+
+        with self._lock, self._db:
+            self._check_quota(guild_id, sum(len(chunk.encode('utf-8')) for chunk in chunks))
+            doc_id = self._db.execute(
+                "INSERT INTO documents (guild_id, title, added_by, added_at, num_chunks) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (guild_id, title, added_by, time.time(), len(chunks))
+            ).lastrowid
+
+            total_length = 0
+            doc_freq = Counter()
+            for chunk in chunks:
+                counts = Counter(terms(chunk))
+                length = sum(counts.values())
+                total_length += length
+                doc_freq.update(counts.keys())
+
+                chunk_id = self._db.execute(
+                    "INSERT INTO chunks (doc_id, guild_id, length, text) VALUES (?, ?, ?, ?)",
+                    (doc_id, guild_id, length, chunk)
+                ).lastrowid
+                self._db.executemany(
+                    "INSERT INTO postings (guild_id, term, chunk_id, count) VALUES (?, ?, ?, ?)",
+                    [(guild_id, term, chunk_id, count) for term, count in counts.items()]
+                )
+
+            self._db.executemany(
+                "INSERT INTO term_stats (guild_id, term, doc_freq) VALUES (?, ?, ?) "
+                "ON CONFLICT (guild_id, term) DO UPDATE SET doc_freq = doc_freq + excluded.doc_freq",
+                [(guild_id, term, count) for term, count in doc_freq.items()]
+            )
+            self._db.execute(
+                "INSERT INTO guild_stats (guild_id, num_chunks, total_length) VALUES (?, ?, ?) "
+                "ON CONFLICT (guild_id) DO UPDATE SET "
+                "num_chunks = num_chunks + excluded.num_chunks, "
+                "total_length = total_length + excluded.total_length",
+                (guild_id, len(chunks), total_length)
+            )
+
+        return {'id': doc_id, 'num_chunks': len(chunks)}
+
+    def _check_quota(self, guild_id, new_bytes):
+        """Raise ValueError if a document of new_bytes would not fit the guild's quota (lock held)"""
+        if self.max_documents is not None:
+            documents = self._db.execute(
+                "SELECT COUNT(*) FROM documents WHERE guild_id = ?", (guild_id,)
+            ).fetchone()[0]
+            if documents >= self.max_documents:
+                raise ValueError(f"This server's knowledge base is full ({self.max_documents} documents)")
+
+        if self.max_bytes is not None:
+            used = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM chunks WHERE guild_id = ?",
+                (guild_id,)
+            ).fetchone()[0]
+            if used + new_bytes > self.max_bytes:
+                raise ValueError(
+                    f"That document does not fit in this server's knowledge base "
+                    f"({used / 1024 / 1024:.1f} of {self.max_bytes / 1024 / 1024:g} MB used)"
+                )
+
+    def remove_document(self, guild_id, doc_id):
+        """
+        Remove a document and its index entries
+
+        Returns:
+            True if the document existed in this guild
+        """
+        with self._lock, self._db:
+            found = self._db.execute(
+                "SELECT 1 FROM documents WHERE id = ? AND guild_id = ?", (doc_id, guild_id)
+            ).fetchone()
+            if not found:
+                return False
+
+            chunks = self._db.execute(
+                "SELECT id, length FROM chunks WHERE doc_id = ?", (doc_id,)
+            ).fetchall()
+            doc_freq = Counter()
+            for chunk_id, _ in chunks:
+                doc_freq.update(
+                    term for (term,) in
+                    self._db.execute("SELECT term FROM postings WHERE chunk_id = ?", (chunk_id,))
+                )
+
+            self._db.executemany(
+                "UPDATE term_stats SET doc_freq = doc_freq - ? WHERE guild_id = ? AND term = ?",
+                [(count, guild_id, term) for term, count in doc_freq.items()]
+            )
+            self._db.execute("DELETE FROM term_stats WHERE guild_id = ? AND doc_freq <= 0", (guild_id,))
+            self._db.execute(
+                "DELETE FROM postings WHERE chunk_id IN (SELECT id FROM chunks WHERE doc_id = ?)",
+                (doc_id,)
+            )
+            self._db.execute(
+                "UPDATE guild_stats SET num_chunks = num_chunks - ?, total_length = total_length - ? "
+                "WHERE guild_id = ?",
+                (len(chunks), sum(length for _, length in chunks), guild_id)
+            )
+            self._db.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+        return True
+
+    def search(self, guild_id, query, top_k=3):
+        """
+        Find the chunks that best match a query
+
+        Args:
+            guild_id: Guild whose documents are searched
+            query: Question text
+            top_k: Number of chunks to return
+
+        Returns:
+            List of dicts with text, title, doc_id, and score (best first)
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT num_chunks, total_length FROM guild_stats WHERE guild_id = ?", (guild_id,)
+            ).fetchone()
+            if not row or not row[0]:
+                return []
+            num_chunks, avg_length = row[0], row[1] / row[0]
+
+            scores = Counter()
+            for term in set(terms(query)):
+                stat = self._db.execute(
+                    "SELECT doc_freq FROM term_stats WHERE guild_id = ? AND term = ?", (guild_id, term)
+                ).fetchone()
+                if not stat:
+                    continue
+                for chunk_id, count, length in self._db.execute(
+                    "SELECT p.chunk_id, p.count, c.length FROM postings p "
+                    "JOIN chunks c ON c.id = p.chunk_id WHERE p.guild_id = ? AND p.term = ?",
+                    (guild_id, term)
+                ):
+                    scores[chunk_id] += bm25_weight(
+                        count, length, avg_length, stat[0], num_chunks, self.k1, self.b
+                    )
+
+            results = []
+            for chunk_id, score in scores.most_common(top_k):
+                text, doc_id, title = self._db.execute(
+                    "SELECT c.text, c.doc_id, d.title FROM chunks c "
+                    "JOIN documents d ON d.id = c.doc_id WHERE c.id = ?", (chunk_id,)
+                ).fetchone()
+                results.append({'text': text, 'title': title, 'doc_id': doc_id, 'score': score})
+            return results
+
+    def list_documents(self, guild_id):
+        """
+        Documents of a guild
+
+        Returns:
+            List of dicts with id, title, added_by, added_at, and num_chunks
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, title, added_by, added_at, num_chunks FROM documents "
+                "WHERE guild_id = ? ORDER BY id", (guild_id,)
+            ).fetchall()
+        return [
+            {'id': r[0], 'title': r[1], 'added_by': r[2], 'added_at': r[3], 'num_chunks': r[4]}
+            for r in rows
+        ]
+
+    def stats(self):
+        """
+        Store size
+
+        Returns:
+            dict with documents, chunks, and terms
+        """
+        with self._lock:
+            return {
+                'documents': self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+                'chunks': self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0],
+                'terms': self._db.execute("SELECT COUNT(*) FROM term_stats").fetchone()[0],
+            }
+
+
+# Example usage
+if __name__ == "__main__":
+    kb = KnowledgeBase(db_path=":memory:", chunk_size=200, overlap=40)
+
+    kb.add_document(1, "Python", "Python was created by Guido van Rossum and first released in 1991.")
+    kb.add_document(1, "Discord", "Discord is a VoIP and instant messaging platform launched in 2015.")
+
+    for result in kb.search(1, "Who created Python?"):
+        print(f"{result['score']:.2f} [{result['title']}] {result['text']}")
+    print(kb.list_documents(1))
@@ -0,0 +1,135 @@
+"""
+Micro-Batching Scheduler
+Collects concurrent single-item requests and runs them as one batch
+"""
+
+import asyncio
+import functools
+
+
+class MicroBatcher:
+    def __init__(self, batch_func, max_batch_size=16, max_wait_ms=5,
+                 executor=None, model_key=None):
+        """
+        Initialize micro-batcher
+
+        Args:
+            batch_func: Blocking callable taking a list of items (plus keyword
+                arguments) and returning a list of results in the same order
+            max_batch_size: Run a batch as soon as this many items are waiting
+            max_wait_ms: Longest time the first item of a batch waits for company
+            executor: InferenceExecutor to run batches on (default: the event
+                loop's default thread pool)
+            model_key: Model key passed to the executor for in-flight limits
+        """
+        self.batch_func = batch_func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.model_key = model_key
+
+        # Pending items are grouped by their keyword arguments, since only
+        # requests with identical options can share a batch
+        self._pending = {}
+        self._timers = {}
+        self._tasks = set()
+
+        self.batches_run = 0
+        self.items_run = 0
+
+    async def submit(self, item, **kwargs):
+        """
+        Queue one item and wait for its result
+
+        Args:
+            item: Single input (e.g. a text)
+            **kwargs: Options passed to batch_func (e.g. threshold)
+
+        Returns:
+            The result batch_func produced for this item
+        """
+        loop = asyncio.get_running_loop()
+        group = tuple(sorted(kwargs.items()))
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(group, [])
+        pending.append((item, future))
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif len(pending) == 1:
+            self._timers[group] = loop.call_later(self.max_wait, self._flush, group)
+
+        return await future
+
+    def _flush(self, group):
+        """Start running everything pending for a group"""
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(group, None)
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch, dict(group)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch, kwargs):
+        """Run one batch and hand each caller its own result"""
+        items = [item for item, _ in batch]
+
+        try:
+            if self.executor is not None:
+                results = await self.executor.run(
+                    self.model_key, self.batch_func, items, **kwargs
+                )
+            else:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(
+                    None, functools.partial(self.batch_func, items, **kwargs)
+                )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.items_run += len(items)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """
+        Batching statistics
+
+        Returns:
+            dict with batches, items, and average batch size
+        """
+        return {
+            'batches': self.batches_run,
+            'items': self.items_run,
+            'avg_batch_size': self.items_run / self.batches_run if self.batches_run else 0.0
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    def shout_batch(texts, suffix="!"):
+        print(f"Running batch of {len(texts)}")
+        return [text.upper() + suffix for text in texts]
+
+    batcher = MicroBatcher(shout_batch, max_batch_size=4, max_wait_ms=10)
+
+    async def main():
+        results = await asyncio.gather(*[
+            batcher.submit(f"message {i}") for i in range(10)
+        ])
+        print(results)
+        print(batcher.stats())
+
+    asyncio.run(main())
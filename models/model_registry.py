@@ -0,0 +1,330 @@
+"""
+Model Registry
+Loads models on demand, tracks their memory, and unloads idle ones
+"""
+
+import gc
+import threading
+import time
+from contextlib import contextmanager
+
+
+def estimate_model_bytes(obj, depth=3):
+    """
+    Estimate the memory held by the weights inside a model wrapper
+
+    Looks for objects with parameters() / buffers() (torch modules) in the
+    wrapper's attributes, e.g. SentimentAnalyzer.model.model. Weights of
+    int8 dynamically quantized layers and ONNX sessions are counted too.
+
+    Args:
+        obj: Model wrapper, pipeline, or torch module
+        depth: How many attribute levels to search
+
+    Returns:
+        Size in bytes
+    """
+    seen = set()
+    total = 0
+
+    def visit(value, level):
+        nonlocal total
+        if id(value) in seen or level > depth:
+            return
+        seen.add(id(value))
+
+        if hasattr(value, 'parameters') and hasattr(value, 'buffers'):
+            for tensor in list(value.parameters()) + list(value.buffers()):
+                key = (tensor.data_ptr(), tensor.numel())
+                if key not in seen:
+                    seen.add(key)
+                    total += tensor.numel() * tensor.element_size()
+
+            # Dynamically quantized layers keep their int8 weights in packed
+            # params, which parameters() does not list. The quantized Linear
+            # wrapping them has _weight_bias() too, so only the packed params
+            # module is counted.
+            from torch.ao.nn.quantized.modules.linear import LinearPackedParams
+
+            for module in value.modules():
+                if isinstance(module, LinearPackedParams):
+                    for tensor in module._weight_bias():
+                        if tensor is not None:
+                            total += tensor.numel() * tensor.element_size()
+                # Weights held outside torch (e.g. an onnxruntime session)
+                total += getattr(module, 'weight_bytes', 0)
+            return
+
+        if hasattr(value, '__dict__'):
+            for attr in vars(value).values():
+                visit(attr, level + 1)
+
+    visit(obj, 0)
+    return total
+
+
+class _Entry:
+    def __init__(self, name, loader, size_hint):
+        self.name = name
+        self.loader = loader
+        self.model = None
+        self.size_bytes = size_hint
+        self.last_used = 0.0
+        self.in_use = 0
+        self.load_lock = threading.Lock()
+
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.last_load_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=None, idle_timeout=None, warmup=True):
+        """
+        Initialize model registry
+
+        Args:
+            memory_budget_mb: Total weight memory allowed for loaded models
+                (None = unlimited). Least recently used idle models are
+                unloaded to make room for a model that has to load.
+            idle_timeout: Unload models unused for this many seconds when
+                evict_idle() runs (None = only unload under memory pressure)
+            warmup: Call the model's warmup() right after loading it, so
+                the first real request does not pay for lazy initialization
+        """
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        self.idle_timeout = idle_timeout
+        self.warmup = warmup
+        self._entries = {}
+        self._lock = threading.Lock()
+        # One load at a time: from_pretrained() is not safe to run in
+        # parallel threads (it swaps torch defaults while building a model)
+        self._load_lock = threading.Lock()
+
+    def register(self, name, loader, size_hint_mb=0):
+        """
+        Register a model
+
+        Args:
+            name: Key used to look the model up
+            loader: Callable that builds the model
+            size_hint_mb: Expected size before the first load (afterwards
+                the measured size is used)
+        """
+        self._entries[name] = _Entry(name, loader, int(size_hint_mb * 1024 * 1024))
+
+    def names(self):
+        """Registered model names"""
+        return list(self._entries)
+
+    def is_loaded(self, name):
+        """Whether a model is currently in memory"""
+        return self._entries[name].model is not None
+
+    def peek(self, name):
+        """The model if it is loaded, else None (never loads, not counted as a use)"""
+        return self._entries[name].model
+
+    def get(self, name, warmup=None):
+        """
+        Get a model, loading it first if needed
+
+        Concurrent callers asking for a model that is still loading wait
+        for that load instead of starting another one.
+
+        Args:
+            name: Registered model name
+            warmup: Whether to warm up a freshly loaded model (default:
+                the registry's warmup setting)
+
+        Returns:
+            The loaded model
+        """
+        warmup = self.warmup if warmup is None else warmup
+        entry = self._entries[name]
+
+        with self._lock:
+            entry.last_used = time.monotonic()
+            if entry.model is not None:
+                entry.hits += 1
+                return entry.model
+
+        with entry.load_lock:
+            with self._lock:
+                if entry.model is not None:
+                    entry.hits += 1
+                    return entry.model
+                entry.misses += 1
+                self._make_room(entry.size_bytes, exclude=name)
+
+            with self._load_lock:
+                print(f"Loading {name}...")
+                start = time.perf_counter()
+                model = entry.loader()
+                if warmup and hasattr(model, 'warmup'):
+                    model.warmup()
+                elapsed = time.perf_counter() - start
+            print(f"✓ {name} loaded in {elapsed:.1f}s")
+
+            with self._lock:
+                entry.model = model
+                entry.size_bytes = estimate_model_bytes(model)
+                entry.loads += 1
+                entry.load_seconds += elapsed
+                entry.last_load_seconds = elapsed
+                entry.last_used = time.monotonic()
+
+                # The real size may be larger than expected
+                self._make_room(0, exclude=name)
+
+            return model
+
+    def preload(self, names=None):
+        """
+        Load (and warm up) models ahead of their first use
+
+        Args:
+            names: Model names to load (default: all registered models)
+        """
+        for name in names or self.names():
+            self.get(name)
+
+    @contextmanager
+    def use(self, name):
+        """
+        Get a model and keep it from being evicted while in use
+
+        Example:
+            with registry.use('sentiment') as analyzer:
+                analyzer.analyze(text)
+        """
+        entry = self._entries[name]
+        with self._lock:
+            entry.in_use += 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+                # Loads while this model was pinned may have left the
+                # registry over budget
+                self._make_room(0, exclude=name)
+
+    def resident_bytes(self):
+        """Memory held by loaded models"""
+        return sum(e.size_bytes for e in self._entries.values() if e.model is not None)
+
+    def _make_room(self, needed_bytes, exclude=None):
+        """Unload least recently used idle models until needed_bytes fit (lock held)"""
+        if self.memory_budget is None:
+            return
+
+        candidates = sorted(
+            (e for e in self._entries.values()
+             if e.model is not None and e.in_use == 0 and e.name != exclude),
+            key=lambda e: e.last_used
+        )
+        for entry in candidates:
+            if self.resident_bytes() + needed_bytes <= self.memory_budget:
+                break
+            self._unload(entry)
+
+    def _unload(self, entry):
+        """Drop a model (lock held)"""
+        print(f"Unloading {entry.name} ({entry.size_bytes / 1024 / 1024:.0f} MB)")
+        entry.model = None
+        entry.evictions += 1
+        gc.collect()
+
+    def evict(self, name):
+        """
+        Unload a model if it is not in use
+
+        Returns:
+            True if the model was unloaded
+        """
+        entry = self._entries[name]
+        with self._lock:
+            if entry.model is None or entry.in_use:
+                return False
+            self._unload(entry)
+            return True
+
+    def evict_idle(self):
+        """
+        Unload models unused for longer than idle_timeout
+
+        Returns:
+            List of unloaded model names
+        """
+        if self.idle_timeout is None:
+            return []
+
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            for entry in self._entries.values():
+                if (entry.model is not None and entry.in_use == 0 and
+                        now - entry.last_used > self.idle_timeout):
+                    self._unload(entry)
+                    evicted.append(entry.name)
+        return evicted
+
+    def stats(self):
+        """
+        Load, hit and eviction metrics
+
+        Returns:
+            dict of model name -> metrics, plus 'total' with overall numbers
+        """
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                e.name: {
+                    'loaded': e.model is not None,
+                    'in_use': e.in_use,
+                    'size_mb': e.size_bytes / 1024 / 1024,
+                    'idle_seconds': now - e.last_used if e.last_used else None,
+                    'loads': e.loads,
+                    'avg_load_seconds': e.load_seconds / e.loads if e.loads else 0.0,
+                    'last_load_seconds': e.last_load_seconds,
+                    'hits': e.hits,
+                    'misses': e.misses,
+                    'hit_rate': e.hits / (e.hits + e.misses) if e.hits + e.misses else 0.0,
+                    'evictions': e.evictions,
+                }
+                for e in self._entries.values()
+            }
+
+        hits = sum(m['hits'] for m in models.values())
+        misses = sum(m['misses'] for m in models.values())
+        models['total'] = {
+            'resident_mb': self.resident_bytes() / 1024 / 1024,
+            'budget_mb': self.memory_budget / 1024 / 1024 if self.memory_budget else None,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'evictions': sum(m['evictions'] for m in models.values()),
+        }
+        return models
+
+
+# Example usage
+if __name__ == "__main__":
+    import torch
+
+    # Each layer holds about 1 MB of weights, so only one fits the budget
+    registry = ModelRegistry(memory_budget_mb=1.5)
+    registry.register("small", lambda: torch.nn.Linear(512, 512), size_hint_mb=1)
+    registry.register("other", lambda: torch.nn.Linear(512, 512), size_hint_mb=1)
+
+    with registry.use("small") as model:
+        print(model(torch.zeros(1, 512)).shape)
+
+    with registry.use("other") as model:
+        print(model(torch.zeros(1, 512)).shape)
+
+    print(f"small loaded: {registry.is_loaded('small')}")
+    print(registry.stats()['total'])
@@ -0,0 +1,163 @@
+"""
+Mood Tracker
+Rolling sentiment per channel or guild, kept in fixed-size time-bucketed counters
+"""
+
+import threading
+import time
+from array import array
+
+
+# Labels of the sentiment models, mapped to a polarity
+POSITIVE_LABELS = ('positive', 'label_2')
+NEGATIVE_LABELS = ('negative', 'label_0')
+
+# (seconds per bucket, buckets): one-minute buckets cover the last hour,
+# five-minute buckets the last day
+DEFAULT_RESOLUTIONS = ((60, 60), (300, 288))
+
+
+class _Ring:
+    def __init__(self, bucket_seconds, num_buckets):
+        """
+        Fixed ring of time buckets
+
+        A slot is reused when time comes round to it again; its stamp
+        (the absolute bucket number) tells whether it holds current data.
+        """
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.stamps = array('q', [-1]) * num_buckets
+        self.counts = array('l', [0]) * num_buckets
+        self.positive = array('l', [0]) * num_buckets
+        self.negative = array('l', [0]) * num_buckets
+        self.polarity = array('d', [0.0]) * num_buckets
+
+    def add(self, timestamp, polarity):
+        bucket = int(timestamp // self.bucket_seconds)
+        slot = bucket % self.num_buckets
+        if self.stamps[slot] > bucket:
+            # Older than this ring's horizon
+            return
+        if self.stamps[slot] != bucket:
+            # Stale slot from a previous lap: start it over
+            self.stamps[slot] = bucket
+            self.counts[slot] = self.positive[slot] = self.negative[slot] = 0
+            self.polarity[slot] = 0.0
+        self.counts[slot] += 1
+        self.polarity[slot] += polarity
+        if polarity > 0:
+            self.positive[slot] += 1
+        elif polarity < 0:
+            self.negative[slot] += 1
+
+    def window(self, now, seconds):
+        """Sum the buckets that fall in the last `seconds` (includes the current one)"""
+        current = int(now // self.bucket_seconds)
+        spanned = min(max(int(-(-seconds // self.bucket_seconds)), 1), self.num_buckets)
+        count = positive = negative = 0
+        polarity = 0.0
+        for bucket in range(current - spanned + 1, current + 1):
+            slot = bucket % self.num_buckets
+            if self.stamps[slot] == bucket:
+                count += self.counts[slot]
+                positive += self.positive[slot]
+                negative += self.negative[slot]
+                polarity += self.polarity[slot]
+        return count, positive, negative, polarity
+
+
+class MoodTracker:
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS):
+        """
+        Initialize mood tracker
+
+        Each tracked key (e.g. a channel or guild) gets one ring of
+        counters per resolution, allocated once, so memory per key is
+        constant and a query reads at most one ring's buckets no matter
+        how many messages were recorded.
+
+        Args:
+            resolutions: (seconds per bucket, buckets) pairs; a query uses
+                the finest one that covers its window
+        """
+        self.resolutions = sorted(resolutions)
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def polarity(result):
+        """Signed score of a sentiment result: +score positive, -score negative, 0 neutral"""
+        label = result['label'].lower()
+        if label in POSITIVE_LABELS:
+            return result['score']
+        if label in NEGATIVE_LABELS:
+            return -result['score']
+        return 0.0
+
+    def record(self, key, result, timestamp=None):
+        """
+        Add one sentiment result
+
+        Args:
+            key: What the message counts towards (e.g. ('channel', id))
+            result: Sentiment result with label and score
+            timestamp: When the message was sent (default: now)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        polarity = self.polarity(result)
+        with self._lock:
+            rings = self._rings.get(key)
+            if rings is None:
+                rings = self._rings[key] = [_Ring(*resolution) for resolution in self.resolutions]
+            for ring in rings:
+                ring.add(timestamp, polarity)
+
+    def query(self, key, seconds, now=None):
+        """
+        Mood over the last `seconds`
+
+        Returns:
+            dict with messages, positive and negative (shares of messages),
+            and mood (average polarity, -1 to 1)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rings = self._rings.get(key)
+            if rings is None:
+                count, positive, negative, polarity = 0, 0, 0, 0.0
+            else:
+                ring = next(
+                    (r for r in rings if r.bucket_seconds * r.num_buckets >= seconds), rings[-1]
+                )
+                count, positive, negative, polarity = ring.window(now, seconds)
+
+        return {
+            'messages': count,
+            'positive': positive / count if count else 0.0,
+            'negative': negative / count if count else 0.0,
+            'mood': polarity / count if count else 0.0,
+        }
+
+    def num_keys(self):
+        """Number of tracked keys"""
+        return len(self._rings)
+
+
+# Example usage
+if __name__ == "__main__":
+    import random
+
+    tracker = MoodTracker()
+    now = time.time()
+    rng = random.Random(0)
+    # A day of messages, getting happier towards the end
+    for i in range(20000):
+        age = rng.uniform(0, 86400)
+        label = 'POSITIVE' if rng.random() < 0.8 - age / 86400 * 0.6 else 'NEGATIVE'
+        tracker.record(('channel', 1), {'label': label, 'score': rng.uniform(0.6, 1.0)}, now - age)
+
+    for name, seconds in [("5m", 300), ("1h", 3600), ("24h", 86400)]:
+        mood = tracker.query(('channel', 1), seconds, now)
+        print(f"{name}: {mood['messages']} messages, mood {mood['mood']:+.2f}, "
+              f"{mood['positive']:.0%} positive")
@@ -0,0 +1,142 @@
+"""
+ONNX Runtime Backend
+Exports encoder models to ONNX once and serves them with onnxruntime on CPU
+"""
+
+import inspect
+import os
+
+BACKENDS = ("torch", "onnx")
+
+# Exported graphs are reused across restarts
+CACHE_DIR = os.getenv(
+    'ONNX_CACHE_DIR',
+    os.path.join(os.path.expanduser("~"), ".cache", "sive", "onnx")
+)
+
+
+def _export(model, tokenizer, path):
+    """
+    Export a torch model to ONNX with dynamic batch and sequence axes
+    """
+    import torch
+
+    sample = tokenizer(["Exporting the model", "Hi"], return_tensors="pt", padding=True)
+    # Positional export arguments must follow the forward() signature order
+    input_names = [name for name in inspect.signature(model.forward).parameters if name in sample]
+
+    model.eval()
+    with torch.no_grad():
+        outputs = model(**sample)
+        # Token-level outputs (e.g. QA start/end logits) follow the input
+        # length; per-sequence ones (classifier logits) do not
+        longer = model(**tokenizer(["Exporting the model with a longer sample text"], return_tensors="pt"))
+    output_names = list(outputs.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    for name in output_names:
+        if outputs[name].dim() > 1 and outputs[name].shape[1] != longer[name].shape[1]:
+            dynamic_axes[name] = {0: "batch", 1: "sequence"}
+        else:
+            dynamic_axes[name] = {0: "batch"}
+
+    tmp_path = path + ".tmp"
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in input_names),
+        tmp_path,
+        input_names=input_names,
+        output_names=output_names,
+        dynamic_axes=dynamic_axes,
+        opset_version=17,
+        dynamo=False
+    )
+    os.replace(tmp_path, path)
+
+
+def _quantize(path, quantized_path):
+    """Dynamic int8 quantization of an exported graph"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = quantized_path + ".tmp"
+    quantize_dynamic(path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, quantized_path)
+
+
+def to_onnx(model, tokenizer, model_name, precision="fp32", cache_dir=None):
+    """
+    Replace a pipeline's torch model with an onnxruntime-backed one
+
+    The first call exports the model to cache_dir; later calls (and
+    restarts) load the cached graph. The returned module takes the same
+    inputs and returns the same output class as the torch model, so the
+    pipeline's pre- and post-processing are unchanged.
+
+    Args:
+        model: Torch model of the pipeline (pipeline.model)
+        tokenizer: Tokenizer of the pipeline
+        model_name: HuggingFace model name (names the cache entry)
+        precision: "fp32" or "int8" (onnxruntime dynamic quantization)
+        cache_dir: Where exported graphs are kept (default: ONNX_CACHE_DIR)
+
+    Returns:
+        torch.nn.Module to assign to pipeline.model
+    """
+    if precision not in ("fp32", "int8"):
+        raise ValueError("the onnx backend supports precision 'fp32' or 'int8'")
+
+    import onnxruntime as ort
+    import torch
+
+    model_dir = os.path.join(cache_dir or CACHE_DIR, model_name.replace("/", "--"))
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, "model.onnx")
+
+    if not os.path.exists(path):
+        print(f"Exporting {model_name} to ONNX...")
+        _export(model, tokenizer, path)
+
+    if precision == "int8":
+        quantized_path = os.path.join(model_dir, "model.int8.onnx")
+        if not os.path.exists(quantized_path):
+            _quantize(path, quantized_path)
+        path = quantized_path
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    input_names = [i.name for i in session.get_inputs()]
+    output_names = [o.name for o in session.get_outputs()]
+    # Same output type as the torch model (e.g. SequenceClassifierOutput)
+    with torch.no_grad():
+        output_class = type(model(**tokenizer("Hi", return_tensors="pt")))
+    config = model.config
+    # Nothing below may refer to the torch model, or its weights would
+    # stay alive next to the session
+    del model
+
+    class OnnxModel(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.config = config
+            self.session = session
+            # Lets the model registry count the weights outside torch
+            self.weight_bytes = os.path.getsize(path)
+
+        def forward(self, **inputs):
+            feed = {name: inputs[name].cpu().numpy() for name in input_names if name in inputs}
+            outputs = self.session.run(output_names, feed)
+            return output_class(**{
+                name: torch.from_numpy(value) for name, value in zip(output_names, outputs)
+            })
+
+    return OnnxModel()
+
+
+# Example usage
+if __name__ == "__main__":
+    from transformers import pipeline
+
+    classifier = pipeline("text-classification", model="unitary/toxic-bert")
+    classifier.model = to_onnx(classifier.model, classifier.tokenizer, "unitary/toxic-bert")
+    print(classifier(["Hello! How are you today?", "You're stupid and useless!"]))
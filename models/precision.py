@@ -0,0 +1,61 @@
+"""
+Model Precision
+Converts loaded models to bf16 or dynamic int8 for cheaper CPU inference
+"""
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def _conv1d_to_linear(module):
+    """
+    Replace GPT-2 style Conv1D layers with equivalent nn.Linear layers
+
+    GPT-2 / DialoGPT use transformers' Conv1D (a transposed Linear), which
+    dynamic quantization does not recognise, so without this only the
+    output head of those models would be quantized.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+
+
+def apply_precision(model, precision="fp32"):
+    """
+    Convert a torch model for CPU inference
+
+    Args:
+        model: torch.nn.Module (e.g. pipeline.model)
+        precision: "fp32" (unchanged), "bf16" (bfloat16 weights and
+            activations), or "int8" (dynamic int8 quantization of Linear
+            layers; activations stay fp32)
+
+    Returns:
+        The converted model (converted in place where possible)
+    """
+    if precision == "fp32":
+        return model
+
+    import torch
+
+    if precision == "bf16":
+        return model.to(torch.bfloat16)
+
+    if precision == "int8":
+        _conv1d_to_linear(model)
+        return torch.ao.quantization.quantize_dynamic(
+            model,
+            {torch.nn.Linear},
+            dtype=torch.qint8,
+            inplace=True
+        )
+
+    raise ValueError(f"precision must be one of {', '.join(PRECISIONS)}")
@@ -0,0 +1,293 @@
+"""
+Process Pool
+Serves loaded models from forked worker processes that share the parent's
+weight pages copy-on-write, so CPU inference is not limited by one GIL
+"""
+
+import gc
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+def _memory_mb(pid):
+    """
+    Private and shared resident memory of a process, from /proc (Linux only)
+
+    Returns:
+        dict with private_mb and shared_mb, or None if unavailable
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            # "Private_Dirty:      1234 kB" lines, after a header line
+            kb = {
+                parts[0].rstrip(':'): int(parts[1])
+                for parts in (line.split() for line in f)
+                if len(parts) == 3 and parts[2] == 'kB'
+            }
+    except OSError:
+        return None
+    return {
+        'private_mb': (kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)) / 1024,
+        'shared_mb': (kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0)) / 1024,
+    }
+
+
+def _worker_main(index, models, threads, requests, results, after_fork):
+    """Worker process loop: run requests from its queue until it gets None"""
+    import torch
+
+    # Each worker gets its share of the cores instead of one per core each
+    torch.set_num_threads(threads)
+    if after_fork is not None:
+        after_fork(index)
+    for model in models.values():
+        if hasattr(model, 'warmup'):
+            model.warmup()
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        job_id, model_key, method, args, kwargs = request
+        try:
+            result = getattr(models[model_key], method)(*args, **kwargs)
+            results.put((index, job_id, True, result))
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            results.put((index, job_id, False, e))
+
+
+class _Worker:
+    def __init__(self, process, requests):
+        self.process = process
+        self.requests = requests
+        self.pending = {}
+        self.completed = 0
+
+
+class ProcessPool:
+    def __init__(self, models, num_workers=2, threads_per_worker=None, after_fork=None, call_timeout=60.0):
+        """
+        Fork worker processes that serve already loaded models
+
+        The weights are loaded once, in this process; fork() gives every
+        worker the same physical pages, which are only copied if written
+        to. Inference never writes to weights, so N workers cost little
+        more memory than one. Requests and results cross processes as
+        pickles over multiprocessing queues, so only use models with
+        plain-data inputs and outputs (not streaming callbacks or
+        per-user state).
+
+        Create the pool before running any inference in this process and
+        before starting threads: forked children get none of the parent's
+        threads, and thread pools (OpenMP, onnxruntime, tokenizers) that
+        were already running can hang in the child.
+
+        Args:
+            models: dict of model key -> loaded model
+            num_workers: Number of worker processes
+            threads_per_worker: torch threads per worker (default: the
+                cores divided evenly among the workers)
+            after_fork: Optional callable run in each worker with its
+                index (0 to num_workers - 1) before it serves requests,
+                e.g. to reopen sqlite connections
+            call_timeout: Seconds call() and call_each() wait for a result
+                before raising TimeoutError (None = forever)
+        """
+        self.models = dict(models)
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.call_timeout = call_timeout
+
+        context = multiprocessing.get_context('fork')
+        self._results = context.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._closed = False
+
+        # Objects that exist now live in the permanent generation, so the
+        # cyclic GC in the workers does not touch (and copy) their pages
+        gc.collect()
+        gc.freeze()
+        self._workers = []
+        try:
+            for index in range(num_workers):
+                requests = context.Queue()
+                process = context.Process(
+                    target=_worker_main,
+                    args=(index, self.models, self.threads_per_worker, requests, self._results, after_fork),
+                    name=f"model-worker-{index}",
+                    daemon=True
+                )
+                process.start()
+                self._workers.append(_Worker(process, requests))
+        finally:
+            gc.unfreeze()
+
+        self._reader = threading.Thread(target=self._read_results, name="model-pool-results", daemon=True)
+        self._reader.start()
+
+    def _read_results(self):
+        """Hand results to their callers, and fail the jobs of dead workers"""
+        while not self._closed:
+            # Checked every time, not only when results stop coming: under
+            # steady traffic from the other workers a dead worker's callers
+            # would otherwise wait forever
+            self._reap()
+            try:
+                index, job_id, ok, value = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                worker = self._workers[index]
+                future = worker.pending.pop(job_id, None)
+                worker.completed += 1
+            if future is not None and not future.done():
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _reap(self):
+        """Fail pending jobs of workers that died (e.g. killed for memory)"""
+        with self._lock:
+            lost = []
+            for worker in self._workers:
+                if worker.pending and not worker.process.is_alive():
+                    lost.extend(worker.pending.values())
+                    worker.pending.clear()
+        for future in lost:
+            if not future.done():
+                future.set_exception(RuntimeError("model worker process died"))
+
+    def submit(self, model_key, method, *args, **kwargs):
+        """
+        Send a model call to the least busy live worker
+
+        Args:
+            model_key: Key of a model given to the pool
+            method: Name of the model method to call
+            *args, **kwargs: Passed to the method (must be picklable)
+
+        Returns:
+            concurrent.futures.Future with the method's return value
+        """
+        if model_key not in self.models:
+            raise KeyError(f"{model_key} is not served by the process pool")
+
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("process pool is shut down")
+            alive = [w for w in self._workers if w.process.is_alive()]
+            if not alive:
+                raise RuntimeError("no model worker processes left")
+            worker = min(alive, key=lambda w: len(w.pending))
+            job_id = self._next_id
+            self._next_id += 1
+            worker.pending[job_id] = future
+        worker.requests.put((job_id, model_key, method, args, kwargs))
+        return future
+
+    def call(self, model_key, method, *args, **kwargs):
+        """
+        Call a model method in a worker and wait for the result (blocking)
+
+        Raises:
+            TimeoutError: No result within call_timeout
+        """
+        return self.submit(model_key, method, *args, **kwargs).result(timeout=self.call_timeout)
+
+    def call_each(self, model_key, method, *args, **kwargs):
+        """
+        Call a model method once in every live worker, e.g. to collect
+        per-worker statistics
+
+        Returns:
+            List of results, one per worker
+        """
+        futures = []
+        with self._lock:
+            for worker in self._workers:
+                if worker.process.is_alive():
+                    future = Future()
+                    job_id = self._next_id
+                    self._next_id += 1
+                    worker.pending[job_id] = future
+                    futures.append(future)
+                    worker.requests.put((job_id, model_key, method, args, kwargs))
+        return [future.result(timeout=self.call_timeout) for future in futures]
+
+    def stats(self):
+        """
+        Per-worker statistics
+
+        Returns:
+            List of dicts with pid, alive, pending, completed, and
+            private_mb / shared_mb (None where /proc is unavailable)
+        """
+        with self._lock:
+            workers = [
+                (w.process.pid, w.process.is_alive(), len(w.pending), w.completed)
+                for w in self._workers
+            ]
+        stats = []
+        for pid, alive, pending, completed in workers:
+            memory = _memory_mb(pid) if alive else None
+            stats.append({
+                'pid': pid,
+                'alive': alive,
+                'pending': pending,
+                'completed': completed,
+                'private_mb': memory['private_mb'] if memory else None,
+                'shared_mb': memory['shared_mb'] if memory else None,
+            })
+        return stats
+
+    def shutdown(self, timeout=5.0):
+        """Stop the workers, failing any jobs still pending"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for worker in self._workers:
+            if worker.process.is_alive():
+                worker.requests.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.process.join(max(deadline - time.monotonic(), 0))
+            if worker.process.is_alive():
+                worker.process.terminate()
+            for future in worker.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("process pool is shut down"))
+            worker.pending.clear()
+        self._reader.join(timeout=2.0)
+
+
+# Example usage
+if __name__ == "__main__":
+    from models.sentiment_analyzer import SentimentAnalyzer
+
+    analyzer = SentimentAnalyzer(model_type="basic")
+    pool = ProcessPool({'sentiment': analyzer}, num_workers=2)
+
+    texts = ["I love this!", "This is terrible.", "It's okay I guess."] * 100
+    start = time.perf_counter()
+    futures = [pool.submit('sentiment', 'analyze_batch', texts[i:i + 16]) for i in range(0, len(texts), 16)]
+    results = [result for future in futures for result in future.result()]
+    print(f"{len(results)} messages in {time.perf_counter() - start:.2f}s: {results[0]}")
+    for worker in pool.stats():
+        print(worker)
+    pool.shutdown()
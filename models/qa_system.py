@@ -3,21 +3,38 @@ Question Answering System
 Answer questions based on provided context
 """
 
-from transformers import pipeline
+import bisect
+
+from models.backend import pipeline
+from models.onnx_backend import to_onnx
+from models.precision import apply_precision
+from models.retrieval import BM25Index, chunk_text
 
 
 class QASystem:
-    def __init__(self, model_name="deepset/roberta-base-squad2"):
+    def __init__(self, model_name="deepset/roberta-base-squad2", precision="fp32", backend="torch"):
         """
         Initialize Q&A system
         
         Args:
             model_name: HuggingFace model name for question answering
+            precision: "fp32", "bf16", or "int8" (dynamic quantization)
+            backend: "torch" (eager PyTorch) or "onnx" (onnxruntime, exported
+                once and cached on disk; fp32 or int8 only)
         """
         self.qa_pipeline = pipeline(
             "question-answering",
             model=model_name
         )
+        if backend == "onnx":
+            self.qa_pipeline.model = to_onnx(self.qa_pipeline.model, self.qa_pipeline.tokenizer, model_name, precision)
+        elif backend == "torch":
+            self.qa_pipeline.model = apply_precision(self.qa_pipeline.model, precision)
+        else:
+            raise ValueError("backend must be 'torch' or 'onnx'")
+        self.model_name = model_name
+        self.precision = precision
+        self.backend = backend
     
     def answer(self, question, context):
         """
@@ -42,18 +59,287 @@ class QASystem:
             'end': result['end']
         }
     
-    def answer_multiple(self, questions, context):
+    def warmup(self):
+        """Run one small forward pass so the first real request is fast"""
+        self.answer("What is this?", "This is a warmup question.")
+    
+    def answer_multiple(self, questions, context, batch_size=32, max_seq_len=384,
+                        doc_stride=128, max_answer_len=15):
         """
         Answer multiple questions from same context
         
+        The context is tokenized once and every question/context window is
+        run in shared padded batches, instead of one pipeline call per
+        question.
+        
         Args:
             questions: List of question strings
             context: Context text
+            batch_size: Most question/context windows per forward pass
+            max_seq_len: Tokens per window (question + context + special tokens)
+            doc_stride: Context tokens shared by neighbouring windows
+            max_answer_len: Longest answer in tokens
             
         Returns:
-            List of answers
+            List of answers (same format as answer())
+        """
+        encoding = self._encode_context(context)
+        return self._answer_windows(
+            questions, context, encoding,
+            batch_size=batch_size, max_seq_len=max_seq_len,
+            doc_stride=doc_stride, max_answer_len=max_answer_len
+        )
+    
+    def answer_long(self, question, context, top_k=3, chunk_size=1000, overlap=200,
+                    max_seq_len=384, doc_stride=128):
         """
-        return [self.answer(q, context) for q in questions]
+        Answer a question over a long document
+        
+        The document is split into overlapping chunks, ranked against the
+        question with BM25, and only the top_k chunks are run through the
+        model, so the cost stays bounded for documents of any length.
+        Contexts no longer than top_k chunks are searched whole.
+        
+        Args:
+            question: Question string
+            context: Document text
+            top_k: Chunks passed to the model
+            chunk_size: Characters per chunk
+            overlap: Characters shared by neighbouring chunks
+            max_seq_len: Tokens per window (question + context + special tokens)
+            doc_stride: Context tokens shared by neighbouring windows
+            
+        Returns:
+            dict with answer, confidence, start, and end (same format as answer())
+        """
+        encoding = self._encode_context(context)
+        token_ranges = None
+        
+        if len(context) > top_k * chunk_size:
+            chunks = chunk_text(context, chunk_size, overlap)
+            index = BM25Index([context[start:end] for start, end in chunks])
+            best = sorted(chunks[i] for i, _ in index.search(question, top_k))
+            
+            # Token range per chunk; overlapping chunks are merged so their
+            # shared windows are not scored twice
+            token_ranges = []
+            for start, end in best:
+                token_start, token_end = self._char_to_token_range(encoding, start, end)
+                if token_ranges and token_start <= token_ranges[-1][1]:
+                    token_ranges[-1] = (token_ranges[-1][0], max(token_end, token_ranges[-1][1]))
+                else:
+                    token_ranges.append((token_start, token_end))
+        
+        return self._answer_windows(
+            [question], context, encoding, token_ranges,
+            max_seq_len=max_seq_len, doc_stride=doc_stride
+        )[0]
+    
+    def answer_passages(self, question, passages, max_seq_len=384, doc_stride=128):
+        """
+        Answer a question from separate passages (e.g. retrieved chunks)
+        
+        Passages are tokenized together but searched separately, so no
+        window mixes text from two passages.
+        
+        Args:
+            question: Question string
+            passages: List of passage strings
+            max_seq_len: Tokens per window (question + context + special tokens)
+            doc_stride: Context tokens shared by neighbouring windows
+            
+        Returns:
+            dict with answer, confidence, start, end (into the passage), and
+            passage (index of the passage the answer came from)
+        """
+        separator = "\n\n"
+        context = separator.join(passages)
+        encoding = self._encode_context(context)
+        
+        bounds = []
+        position = 0
+        for passage in passages:
+            bounds.append((position, position + len(passage)))
+            position += len(passage) + len(separator)
+        token_ranges = [
+            self._char_to_token_range(encoding, start, end)
+            for start, end in bounds if end > start
+        ]
+        if not token_ranges:
+            return {'answer': '', 'confidence': 0.0, 'start': 0, 'end': 0, 'passage': None}
+        
+        answer = self._answer_windows(
+            [question], context, encoding, token_ranges,
+            max_seq_len=max_seq_len, doc_stride=doc_stride
+        )[0]
+        
+        # Report positions relative to the passage holding the answer
+        index = max(i for i, (start, _) in enumerate(bounds) if start <= answer['start'])
+        answer['passage'] = index
+        answer['start'] -= bounds[index][0]
+        answer['end'] -= bounds[index][0]
+        return answer
+    
+    @staticmethod
+    def _char_to_token_range(encoding, start, end):
+        """Context tokens overlapping the characters [start, end)"""
+        offsets = encoding.encodings[0].offsets
+        token_start = bisect.bisect_right([o[1] for o in offsets], start)
+        token_end = bisect.bisect_left([o[0] for o in offsets], end)
+        return token_start, max(token_end, token_start + 1)
+    
+    def _encode_context(self, context):
+        """Tokenize a context once (without special tokens)"""
+        return self.qa_pipeline.tokenizer(context, add_special_tokens=False, verbose=False)
+    
+    def _answer_windows(self, questions, context, encoding, token_ranges=None,
+                        batch_size=32, max_seq_len=384, doc_stride=128, max_answer_len=15):
+        """
+        Find the best answer per question over windows of a tokenized context
+        
+        Scoring follows the question-answering pipeline: span probabilities
+        are normalized per window, spans are widened to whole words, and
+        the scores of identical answers are added up across windows.
+        
+        Args:
+            questions: List of question strings
+            context: Context text
+            encoding: Tokenized context (from _encode_context)
+            token_ranges: Optional list of (start, end) context token ranges
+                to search (default: the whole context)
+            
+        Returns:
+            List of answers (same format as answer())
+        """
+        import torch
+        
+        tokenizer = self.qa_pipeline.tokenizer
+        model = self.qa_pipeline.model
+        context_ids = encoding['input_ids']
+        use_token_types = 'token_type_ids' in tokenizer.model_input_names
+        template = self._pair_template()
+        num_special = sum(1 for part, _, _ in template if part is None)
+        if token_ranges is None:
+            token_ranges = [(0, len(context_ids))]
+        if not context_ids:
+            return [{'answer': '', 'confidence': 0.0, 'start': 0, 'end': 0} for _ in questions]
+        
+        # One entry per window: question index, encoded ids, token types,
+        # where the context starts in them, and the context token range covered
+        windows = []
+        for index, question in enumerate(questions):
+            question_ids = tokenizer(question.strip(), add_special_tokens=False)['input_ids']
+            max_context = max_seq_len - len(question_ids) - num_special
+            if max_context <= 0:
+                raise ValueError("question is too long for max_seq_len")
+            step = max(max_context - min(doc_stride, max_context // 2), 1)
+            
+            for range_start, range_end in token_ranges:
+                for start in range(range_start, max(range_end - max_context, range_start) + step, step):
+                    end = min(start + max_context, range_end)
+                    ids, token_types, position = [], [], 0
+                    for part, token_id, token_type in template:
+                        if part is None:
+                            piece = [token_id]
+                        elif part == 0:
+                            piece = question_ids
+                        else:
+                            position = len(ids)
+                            piece = context_ids[start:end]
+                        ids += piece
+                        token_types += [token_type] * len(piece)
+                    windows.append((index, ids, token_types, position, start, end))
+                    if end >= range_end:
+                        break
+        
+        # Per question: answer text -> [score, char start, char end]
+        candidates = [{} for _ in questions]
+        for batch_start in range(0, len(windows), batch_size):
+            batch = windows[batch_start:batch_start + batch_size]
+            length = max(len(ids) for _, ids, _, _, _, _ in batch)
+            
+            input_ids = torch.full((len(batch), length), tokenizer.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), length), dtype=torch.long)
+            token_type_ids = torch.zeros((len(batch), length), dtype=torch.long)
+            # Answers may only start and end on context tokens
+            is_context = torch.zeros((len(batch), length), dtype=torch.bool)
+            for row, (_, ids, token_types, position, start, end) in enumerate(batch):
+                input_ids[row, :len(ids)] = torch.tensor(ids)
+                attention_mask[row, :len(ids)] = 1
+                token_type_ids[row, :len(ids)] = torch.tensor(token_types)
+                is_context[row, position:position + end - start] = True
+            
+            inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if use_token_types:
+                inputs['token_type_ids'] = token_type_ids
+            with torch.no_grad():
+                output = model(**inputs)
+            
+            # Probabilities over the context plus the first (CLS) token
+            allowed = is_context.clone()
+            allowed[:, 0] = True
+            start_probs = output.start_logits.float().masked_fill(~allowed, -1e4).softmax(-1)
+            end_probs = output.end_logits.float().masked_fill(~allowed, -1e4).softmax(-1)
+            
+            scores = start_probs[:, :, None] * end_probs[:, None, :]
+            valid = (
+                is_context[:, :, None] & is_context[:, None, :] &
+                torch.ones(length, length, dtype=torch.bool).triu().tril(max_answer_len - 1)
+            )
+            scores = scores.masked_fill(~valid, 0.0).flatten(1)
+            # Extra candidates, since several can widen to the same words
+            top_scores, top_index = scores.topk(min(12, scores.shape[1]), dim=-1)
+            
+            for row, (index, _, _, position, start, _) in enumerate(batch):
+                for score, flat in zip(top_scores[row].tolist(), top_index[row].tolist()):
+                    if score <= 0.0:
+                        break
+                    char_start, char_end = self._span_chars(
+                        encoding, flat // length - position + start, flat % length - position + start
+                    )
+                    text = context[char_start:char_end]
+                    if text in candidates[index]:
+                        candidates[index][text][0] += score
+                    else:
+                        candidates[index][text] = [score, char_start, char_end]
+        
+        answers = []
+        for found in candidates:
+            text, (score, char_start, char_end) = max(found.items(), key=lambda item: item[1][0])
+            answers.append({
+                'answer': text,
+                'confidence': score,
+                'start': char_start,
+                'end': char_end
+            })
+        return answers
+    
+    @staticmethod
+    def _span_chars(encoding, start, end):
+        """Character range of a token span, widened to whole words"""
+        start_word, end_word = encoding.token_to_word(start), encoding.token_to_word(end)
+        if start_word is None or end_word is None:
+            return encoding.token_to_chars(start)[0], encoding.token_to_chars(end)[1]
+        return encoding.word_to_chars(start_word)[0], encoding.word_to_chars(end_word)[1]
+    
+    def _pair_template(self):
+        """
+        Layout of an encoded question/context pair
+        
+        Returns:
+            List of (part, token_id, token_type) where part is None for a
+            special token, 0 for the question, and 1 for the context
+        """
+        sample = self.qa_pipeline.tokenizer("question", "context")
+        token_types = sample.get('token_type_ids') or [0] * len(sample['input_ids'])
+        
+        template = []
+        for part, token_id, token_type in zip(sample.sequence_ids(), sample['input_ids'], token_types):
+            if part is None:
+                template.append((None, token_id, token_type))
+            elif not template or template[-1][0] != part:
+                template.append((part, None, token_type))
+        return template
 
 
 # Example usage
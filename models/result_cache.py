@@ -0,0 +1,284 @@
+"""
+Result Cache
+Remembers classifier results for repeated messages (emotes, "gg", copypasta)
+with LRU + TTL eviction and an optional sqlite tier that survives restarts
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]+')
+
+
+def make_normalizer(tokenizer):
+    """
+    Build a text normalizer that never changes what the model sees
+
+    Uncased BERT-style tokenizers lowercase the text and split on
+    whitespace, so case and runs of whitespace can be folded without
+    changing the token IDs. Other tokenizers (e.g. RoBERTa's byte-level
+    BPE) are sensitive to both, so their text is used as-is.
+
+    Args:
+        tokenizer: HuggingFace tokenizer of the cached model
+
+    Returns:
+        Callable mapping text -> cache text
+    """
+    if getattr(tokenizer, 'do_lower_case', False):
+        return lambda text: _WHITESPACE.sub(' ', text).strip().lower()
+    return lambda text: text
+
+
+def cached_batch(cache, keys, texts, compute):
+    """
+    Serve a batch from the cache, computing only what is missing
+
+    Identical texts (same key) in one batch are computed once.
+
+    Args:
+        cache: ResultCache
+        keys: Cache key per text
+        texts: List of strings
+        compute: Callable taking a list of texts and returning their results
+
+    Returns:
+        List of results in the order of texts
+    """
+    results = [None] * len(texts)
+    missing = OrderedDict()
+
+    for i, key in enumerate(keys):
+        results[i] = cache.get(key)
+        if results[i] is None:
+            missing.setdefault(key, []).append(i)
+
+    if missing:
+        computed = compute([texts[indices[0]] for indices in missing.values()])
+        for (key, indices), result in zip(missing.items(), computed):
+            cache.put(key, result)
+            results[indices[0]] = result
+            # Duplicates get their own copy, like a cache hit would
+            for i in indices[1:]:
+                results[i] = json.loads(json.dumps(result))
+
+    return results
+
+
+class ResultCache:
+    def __init__(self, max_entries=10000, ttl_seconds=3600, db_path=None, max_disk_entries=100000,
+                 flush_every=64, flush_interval=1.0, prune_interval=300.0):
+        """
+        Initialize result cache
+
+        New results are written to the disk tier in batches, one commit
+        per flush_every results or flush_interval seconds, so a crash
+        loses at most the last batch. Expired rows, and the oldest rows
+        over max_disk_entries, are deleted every prune_interval seconds.
+
+        Args:
+            max_entries: Most results kept in memory (least recently used
+                are evicted first)
+            ttl_seconds: How long a result stays valid (None = forever)
+            db_path: sqlite file for a persistent second tier (None = memory only)
+            max_disk_entries: Most results kept in the disk tier (None = no limit)
+            flush_every: Buffered results that trigger a write to disk
+            flush_interval: Longest a buffered result waits for the next put
+                to write it
+            prune_interval: Seconds between prunes of the disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+
+        # key -> (expires_at, JSON text). Results are stored serialized, so
+        # every hit returns a fresh, identical copy callers can't mutate.
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # key -> (value, expires_at) not yet written to disk
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._last_prune = time.monotonic()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            # Forked workers write to the same file
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db.commit()
+            self.prune()
+
+    @staticmethod
+    def make_key(model_id, text, **options):
+        """
+        Build a cache key
+
+        Args:
+            model_id: Identifies the model (name, precision, backend, ...)
+            text: Normalized input text
+            **options: Anything else that changes the result (e.g. threshold)
+
+        Returns:
+            Hex digest string
+        """
+        payload = json.dumps([model_id, text, sorted(options.items())])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a result
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                del self._entries[key]
+                self.expirations += 1
+
+            if self._db is not None:
+                row = self._pending.get(key) or self._db.execute(
+                    "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and (row[1] is None or row[1] > now):
+                    self._remember(key, row[1], row[0])
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """Store a result"""
+        value = json.dumps(result)
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._pending[key] = (value, expires_at)
+                if (len(self._pending) >= self.flush_every or
+                        time.monotonic() - self._last_flush >= self.flush_interval):
+                    self.flush()
+
+    def flush(self):
+        """Write buffered results to the disk tier, pruning it when due"""
+        if self._db is None:
+            return
+        with self._lock:
+            if self._pending:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, value, expires_at) for key, (value, expires_at) in self._pending.items()]
+                )
+                self._db.commit()
+                self._pending.clear()
+            self._last_flush = time.monotonic()
+            if time.monotonic() - self._last_prune >= self.prune_interval:
+                self.prune()
+
+    def _remember(self, key, expires_at, value):
+        """Add to the memory tier, evicting the least recently used (lock held)"""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def prune(self):
+        """Delete expired results from the disk tier, then the oldest ones over max_disk_entries"""
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+            if self.max_disk_entries is not None:
+                # Rows are rewritten on every put, so the lowest rowids
+                # are the results written longest ago
+                excess = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_disk_entries
+                if excess > 0:
+                    self._db.execute(
+                        "DELETE FROM results WHERE rowid IN "
+                        "(SELECT rowid FROM results ORDER BY rowid LIMIT ?)", (excess,)
+                    )
+            self._db.commit()
+            self._last_prune = time.monotonic()
+
+    def reopen(self):
+        """
+        Open a new connection to the disk tier
+
+        A sqlite connection must not be shared across fork(), so a forked
+        process calls this before using the cache.
+        """
+        self._lock = threading.RLock()
+        # The parent writes its own buffered results
+        self._pending = {}
+        if self._db is not None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Hit / miss counters
+
+        Returns:
+            dict with hits, disk_hits, misses, hit_rate, evictions,
+            expirations, and entries
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'entries': len(self._entries),
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+
+    key = ResultCache.make_key("unitary/toxic-bert", "gg", threshold=0.7)
+    print(f"First lookup: {cache.get(key)}")
+
+    cache.put(key, {'is_inappropriate': False, 'label': 'toxic', 'confidence': 0.0012})
+    print(f"Second lookup: {cache.get(key)}")
+    print(cache.stats())
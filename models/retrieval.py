@@ -0,0 +1,130 @@
+"""
+Passage Retrieval
+Splits long documents into chunks and ranks them against a question with BM25
+"""
+
+import math
+import re
+from collections import Counter
+
+
+_TERM = re.compile(r"\w+")
+
+
+def terms(text):
+    """Lowercased word terms of a text"""
+    return _TERM.findall(text.lower())
+
+
+def chunk_text(text, chunk_size=1000, overlap=200):
+    """
+    Split text into overlapping chunks, cutting at whitespace
+
+    Args:
+        text: Document text
+        chunk_size: Target characters per chunk
+        overlap: Characters shared by neighbouring chunks, so an answer
+            near a boundary is whole in at least one chunk
+
+    Returns:
+        List of (start, end) character ranges into text
+    """
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Back up to the last whitespace so words are not split
+            space = text.rfind(" ", start + chunk_size // 2, end)
+            if space != -1:
+                end = space
+        chunks.append((start, end))
+        if end >= len(text):
+            break
+
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return chunks
+
+
+def bm25_weight(term_count, doc_length, avg_length, doc_freq, num_docs, k1=1.5, b=0.75):
+    """
+    BM25 score of one query term in one document
+
+    Args:
+        term_count: Occurrences of the term in the document
+        doc_length: Terms in the document
+        avg_length: Average terms per document
+        doc_freq: Documents containing the term
+        num_docs: Documents in the collection
+    """
+    idf = math.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    norm = term_count + k1 * (1 - b + b * doc_length / avg_length)
+    return idf * term_count * (k1 + 1) / norm
+
+
+class BM25Index:
+    def __init__(self, documents, k1=1.5, b=0.75):
+        """
+        Build an in-memory BM25 index
+
+        Args:
+            documents: List of strings (e.g. chunks of a long context)
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.counts = [Counter(terms(doc)) for doc in documents]
+        self.lengths = [sum(counts.values()) for counts in self.counts]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+        self.doc_freq = Counter()
+        for counts in self.counts:
+            self.doc_freq.update(counts.keys())
+
+    def search(self, query, top_k=3):
+        """
+        Rank documents against a query
+
+        Args:
+            query: Query text
+            top_k: Number of documents to return
+
+        Returns:
+            List of (document index, score), best first. Documents without
+            any query term are only returned when nothing matches at all.
+        """
+        scores = [0.0] * len(self.counts)
+        for term in set(terms(query)):
+            doc_freq = self.doc_freq.get(term)
+            if not doc_freq:
+                continue
+            for i, counts in enumerate(self.counts):
+                if term in counts:
+                    scores[i] += bm25_weight(
+                        counts[term], self.lengths[i], self.avg_length,
+                        doc_freq, len(self.counts), self.k1, self.b
+                    )
+
+        # Stable sort: equal scores keep document order
+        ranked = sorted(range(len(scores)), key=lambda i: -scores[i])
+        return [(i, scores[i]) for i in ranked[:top_k]]
+
+
+# Example usage
+if __name__ == "__main__":
+    document = (
+        "Discord is a VoIP and instant messaging social platform. "
+        "It was launched in 2015. " * 20 +
+        "Python was created by Guido van Rossum and first released in 1991. " +
+        "Servers are communities of users. " * 20
+    )
+
+    chunks = chunk_text(document, chunk_size=300, overlap=50)
+    index = BM25Index([document[start:end] for start, end in chunks])
+
+    for i, score in index.search("Who created Python?", top_k=2):
+        start, end = chunks[i]
+        print(f"{score:.2f}: {document[start:end][:80]}...")
@@ -3,40 +3,109 @@ Sentiment Analysis Model
 Uses distilbert for basic sentiment or RoBERTa for emotion detection
 """
 
-from transformers import pipeline
+from models.backend import pipeline
+from models.batching import length_buckets, run_bucketed, token_lengths
+from models.onnx_backend import to_onnx
+from models.precision import apply_precision
+from models.result_cache import ResultCache, cached_batch, make_normalizer
 
 
 class SentimentAnalyzer:
-    def __init__(self, model_type="basic"):
+    def __init__(self, model_type="basic", cache=None, precision="fp32", backend="torch", top_k=3):
         """
         Initialize sentiment analyzer
         
         Args:
             model_type: "basic" for positive/negative or "emotions" for 28 emotions
+            cache: Optional ResultCache for repeated messages
+            precision: "fp32", "bf16", or "int8" (dynamic quantization)
+            backend: "torch" (eager PyTorch) or "onnx" (onnxruntime, exported
+                once and cached on disk; fp32 or int8 only)
+            top_k: Number of emotions returned per text (emotions only)
         """
         if model_type == "basic":
             # Fast, simple positive/negative sentiment
+            self.model_name = "distilbert-base-uncased-finetuned-sst-2-english"
             self.model = pipeline(
                 "sentiment-analysis",
-                model="distilbert-base-uncased-finetuned-sst-2-english"
+                model=self.model_name
             )
         elif model_type == "social":
             # Better for social media/Twitter-like text
+            self.model_name = "cardiffnlp/twitter-roberta-base-sentiment"
             self.model = pipeline(
                 "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment"
+                model=self.model_name
             )
         elif model_type == "emotions":
-            # Detects 28 different emotions
+            # Detects 28 different emotions (scored in _top_emotions, which
+            # keeps only the top_k instead of building all 28 results)
+            self.model_name = "SamLowe/roberta-base-go_emotions"
             self.model = pipeline(
                 "text-classification",
-                model="SamLowe/roberta-base-go_emotions",
-                top_k=None
+                model=self.model_name
             )
         else:
             raise ValueError("model_type must be 'basic', 'social', or 'emotions'")
         
+        if backend == "onnx":
+            self.model.model = to_onnx(self.model.model, self.model.tokenizer, self.model_name, precision)
+        elif backend == "torch":
+            self.model.model = apply_precision(self.model.model, precision)
+        else:
+            raise ValueError("backend must be 'torch' or 'onnx'")
         self.model_type = model_type
+        self.top_k = min(top_k, self.model.model.config.num_labels)
+        self.precision = precision
+        self.backend = backend
+        self.cache = cache
+        self._normalize = make_normalizer(self.model.tokenizer)
+    
+    def _cache_key(self, text):
+        """Cache key for a text"""
+        options = {'top_k': self.top_k} if self.model_type == "emotions" else {}
+        return ResultCache.make_key(
+            self.model_name, self._normalize(text),
+            precision=self.precision, backend=self.backend, **options
+        )
+    
+    def _top_emotions(self, texts, batch_size=32):
+        """
+        Score texts and keep only the top_k emotions of each
+        
+        go_emotions is multi-label, so every label gets an independent
+        sigmoid score. The top_k selection runs on the whole batch's
+        score tensor at once, and only k labels per text are converted
+        to Python objects.
+        
+        Returns:
+            List of dicts with labels and scores (lists of top_k, best first)
+        """
+        import torch
+        
+        tokenizer = self.model.tokenizer
+        model = self.model.model
+        id2label = model.config.id2label
+        texts = list(texts)
+        results = [None] * len(texts)
+        if not texts:
+            return results
+        
+        lengths = token_lengths(tokenizer, texts)
+        for bucket in length_buckets(lengths, max_batch_size=batch_size):
+            inputs = tokenizer(
+                [texts[i] for i in bucket], padding=True, truncation=True, return_tensors="pt"
+            )
+            with torch.inference_mode():
+                logits = model(**inputs).logits
+            scores, indices = torch.sigmoid(logits.float()).topk(self.top_k, dim=-1)
+            
+            for i, row_scores, row_indices in zip(bucket, scores.tolist(), indices.tolist()):
+                results[i] = {
+                    'labels': [id2label[index] for index in row_indices],
+                    'scores': row_scores,
+                }
+        return results
     
     def analyze(self, text):
         """
@@ -46,27 +115,52 @@ class SentimentAnalyzer:
             text: String to analyze
             
         Returns:
-            dict with label and score
+            dict with label and score, or for emotions a dict with
+            labels and scores of the top_k emotions
         """
-        result = self.model(text)
+        result = None
+        if self.cache is not None:
+            key = self._cache_key(text)
+            result = self.cache.get(key)
         
-        if self.model_type == "emotions":
-            # Return top 3 emotions
-            return result[0][:3]
-        else:
-            return result[0]
+        if result is None:
+            if self.model_type == "emotions":
+                result = self._top_emotions([text])[0]
+            else:
+                result = self.model(text)[0]
+            if self.cache is not None:
+                self.cache.put(key, result)
+        
+        return result
+    
+    def warmup(self):
+        """Run one small forward pass so the first real request is fast"""
+        self.analyze("Warming up the sentiment model")
     
-    def analyze_batch(self, texts):
+    def analyze_batch(self, texts, batch_size=32):
         """
         Analyze multiple texts at once (faster)
         
+        Texts are grouped by token length so short messages are not
+        padded to the length of the longest one.
+        
         Args:
             texts: List of strings
+            batch_size: Maximum texts per forward pass
             
         Returns:
-            List of results
+            List of results (same order as texts)
         """
-        return self.model(texts)
+        def compute(batch):
+            if self.model_type == "emotions":
+                return self._top_emotions(batch, batch_size=batch_size)
+            return run_bucketed(self.model, batch, max_batch_size=batch_size)
+        
+        if self.cache is None:
+            return compute(texts)
+        
+        keys = [self._cache_key(text) for text in texts]
+        return cached_batch(self.cache, keys, texts, compute)
 
 
 # Example usage
@@ -82,6 +176,10 @@ if __name__ == "__main__":
     print(f"Social Sentiment: {result}")
     
     # Emotions
-    emotion_analyzer = SentimentAnalyzer(model_type="emotions")
+    emotion_analyzer = SentimentAnalyzer(model_type="emotions", top_k=3)
     result = emotion_analyzer.analyze("I'm so excited and happy!")
     print(f"Emotions: {result}")
+    
+    results = emotion_analyzer.analyze_batch(["I miss you", "This is hilarious", "ugh, again?"])
+    for result in results:
+        print(", ".join(f"{label} {score:.2f}" for label, score in zip(result['labels'], result['scores'])))
@@ -0,0 +1,178 @@
+"""
+Model Setup
+Builds the result cache, model registry and inference executor from the
+environment, shared by bot.py and inference_server.py so both read one .env
+"""
+
+import os
+
+from models.cascade_moderator import CascadeModerator, LexicalModel, load_wordlist, DEFAULT_WORDLIST
+from models.chatbot import Chatbot
+from models.content_moderator import ContentModerator
+from models.inference_executor import InferenceExecutor, PRIORITY_CLASSES
+from models.model_registry import ModelRegistry
+from models.qa_system import QASystem
+from models.result_cache import ResultCache
+from models.sentiment_analyzer import SentimentAnalyzer
+from models.text_generator import TextGenerator
+
+
+def data_path(filename):
+    """
+    Default location of a database or learned model file
+
+    Files live in DATA_DIR (default data/), which is created on first use.
+    """
+    data_dir = os.getenv('DATA_DIR', 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, filename)
+
+
+def model_precision(model_key):
+    """Precision for a model: PRECISION_<MODEL>, else MODEL_PRECISION (fp32, bf16 or int8)"""
+    return os.getenv(f'PRECISION_{model_key.upper()}') or os.getenv('MODEL_PRECISION', 'fp32')
+
+
+def model_backend(model_key):
+    """Backend for an encoder model: BACKEND_<MODEL>, else MODEL_BACKEND (torch or onnx)"""
+    return os.getenv(f'BACKEND_{model_key.upper()}') or os.getenv('MODEL_BACKEND', 'torch')
+
+
+def make_result_cache():
+    """
+    Result cache for repeated messages ("gg", emotes, copypasta)
+
+    Returns:
+        ResultCache, or None with RESULT_CACHE_SIZE=0
+    """
+    size = int(os.getenv('RESULT_CACHE_SIZE', '10000'))
+    if size <= 0:
+        return None
+    return ResultCache(
+        max_entries=size,
+        ttl_seconds=float(os.getenv('RESULT_CACHE_TTL', '3600')) or None,
+        db_path=os.getenv('RESULT_CACHE_DB') or None,
+        max_disk_entries=int(os.getenv('RESULT_CACHE_DB_MAX_ROWS', '100000')) or None
+    )
+
+
+def load_moderator(result_cache=None):
+    """
+    Load toxic-bert, wrapped in the moderation cascade unless MODERATION_CASCADE=0
+
+    Returns:
+        CascadeModerator, or ContentModerator without the cascade
+    """
+    moderator = ContentModerator(
+        model_type="toxic", cache=result_cache,
+        precision=model_precision('moderator'), backend=model_backend('moderator')
+    )
+    if os.getenv('MODERATION_CASCADE', '1') == '0':
+        return moderator
+
+    hate_moderator = None
+    if os.getenv('MODERATION_HATE_TIER', '0') != '0':
+        hate_moderator = ContentModerator(
+            model_type="hate", cache=result_cache,
+            precision=model_precision('moderator'), backend=model_backend('moderator')
+        )
+    wordlist_path = os.getenv('MODERATION_WORDLIST')
+    return CascadeModerator(
+        moderator,
+        hate_moderator=hate_moderator,
+        wordlist=load_wordlist(wordlist_path) if wordlist_path else DEFAULT_WORDLIST,
+        linear_model=LexicalModel(path=os.getenv('MODERATION_LINEAR_MODEL') or data_path('moderation_linear.joblib')),
+        clear_below=float(os.getenv('MODERATION_CLEAR_BELOW', '0.05')),
+        audit_rate=float(os.getenv('MODERATION_AUDIT_RATE', '0.02'))
+    )
+
+
+def make_registry(result_cache=None, on_moderator=None):
+    """
+    Model registry with every model registered (loaded on first use)
+
+    MODEL_MEMORY_BUDGET_MB caps the total weight memory, MODEL_IDLE_TIMEOUT
+    unloads models unused that long.
+
+    Args:
+        result_cache: ResultCache for the sentiment and moderation models
+        on_moderator: Optional callback taking the moderator each time it loads
+
+    Returns:
+        ModelRegistry
+    """
+    registry = ModelRegistry(
+        memory_budget_mb=float(os.getenv('MODEL_MEMORY_BUDGET_MB', '0')) or None,
+        idle_timeout=float(os.getenv('MODEL_IDLE_TIMEOUT', '0')) or None
+    )
+
+    def moderator_loader():
+        moderator = load_moderator(result_cache)
+        if on_moderator is not None:
+            on_moderator(moderator)
+        return moderator
+
+    registry.register('sentiment', lambda: SentimentAnalyzer(
+        model_type="basic", cache=result_cache,
+        precision=model_precision('sentiment'), backend=model_backend('sentiment')
+    ), size_hint_mb=260)
+    registry.register('moderator', moderator_loader, size_hint_mb=420)
+    registry.register('generator', lambda: TextGenerator(precision=model_precision('generator')), size_hint_mb=500)
+    registry.register('qa', lambda: QASystem(
+        precision=model_precision('qa'), backend=model_backend('qa')
+    ), size_hint_mb=480)
+    registry.register('chatbot', lambda: Chatbot(precision=model_precision('chatbot')), size_hint_mb=1400)
+    return registry
+
+
+def preload_names(registry):
+    """
+    Models listed in PRELOAD_MODELS ("all" or e.g. "sentiment,moderator")
+
+    Unknown names are reported and skipped.
+    """
+    names = [name.strip() for name in os.getenv('PRELOAD_MODELS', '').split(',') if name.strip()]
+    if names == ['all']:
+        return registry.names()
+    for name in [n for n in names if n not in registry.names()]:
+        print(f"⚠️ Unknown model in PRELOAD_MODELS: {name}")
+        names.remove(name)
+    return names
+
+
+def make_executor(model_names, default_workers=2, default_in_flight=None):
+    """
+    Inference executor configured by INFERENCE_WORKERS, MAX_IN_FLIGHT_<MODEL>
+    and INFERENCE_QUOTA_<CLASS>
+
+    Args:
+        model_names: Model keys that may have a MAX_IN_FLIGHT_<MODEL> setting
+        default_workers: Workers without INFERENCE_WORKERS
+        default_in_flight: dict of model key -> limit without MAX_IN_FLIGHT_<MODEL>
+
+    Returns:
+        InferenceExecutor
+    """
+    max_in_flight = dict(default_in_flight or {})
+    for key in model_names:
+        if os.getenv(f'MAX_IN_FLIGHT_{key.upper()}'):
+            max_in_flight[key] = int(os.getenv(f'MAX_IN_FLIGHT_{key.upper()}'))
+    return InferenceExecutor(
+        max_workers=int(os.getenv('INFERENCE_WORKERS', str(default_workers))),
+        max_in_flight=max_in_flight,
+        class_workers={
+            name: int(os.getenv(f'INFERENCE_QUOTA_{name.upper()}'))
+            for name in PRIORITY_CLASSES
+            if os.getenv(f'INFERENCE_QUOTA_{name.upper()}')
+        }
+    )
+
+
+# Example usage
+if __name__ == "__main__":
+    registry = make_registry(make_result_cache())
+    executor = make_executor(registry.names())
+    print(f"Registered: {', '.join(registry.names())}")
+    print(f"Preload: {preload_names(registry) or 'none'}")
+    print(f"Precision: {model_precision('sentiment')}, backend: {model_backend('sentiment')}")
+    print(f"Inference workers: {executor.max_workers}")
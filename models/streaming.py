@@ -0,0 +1,29 @@
+"""
+Token Streaming
+Hands generated text to a callback piece by piece while generate() runs
+"""
+
+
+def make_streamer(tokenizer, on_text, skip_prompt=True):
+    """
+    Build a transformers streamer that reports decoded text as it is produced
+
+    Text is reported in whole words (the streamer waits for a space or
+    newline), so callers never see half-decoded characters.
+
+    Args:
+        tokenizer: Tokenizer of the generating model
+        on_text: Called with each new piece of text (from the generating thread)
+        skip_prompt: Don't report the prompt tokens passed to generate()
+
+    Returns:
+        Streamer to pass as generate(streamer=...)
+    """
+    from transformers import TextStreamer
+
+    class CallbackStreamer(TextStreamer):
+        def on_finalized_text(self, text, stream_end=False):
+            if text:
+                on_text(text)
+
+    return CallbackStreamer(tokenizer, skip_prompt=skip_prompt, skip_special_tokens=True)
@@ -3,11 +3,14 @@ Text Generation
 Generate creative text, stories, or completions
 """
 
-from transformers import pipeline
+from models.backend import pipeline
+from models.generation_control import make_stopping_criteria
+from models.precision import apply_precision
+from models.streaming import make_streamer
 
 
 class TextGenerator:
-    def __init__(self, model_name="gpt2"):
+    def __init__(self, model_name="gpt2", precision="fp32"):
         """
         Initialize text generator
         
@@ -16,14 +19,32 @@ class TextGenerator:
                 - "gpt2" (fast, good quality)
                 - "gpt2-medium" (better quality)
                 - "EleutherAI/gpt-neo-1.3B" (high quality, needs more RAM)
+            precision: "fp32", "bf16", or "int8" (dynamic quantization)
         """
         self.generator = pipeline(
             "text-generation",
             model=model_name
         )
+        self.generator.model = apply_precision(self.generator.model, precision)
         self.model_name = model_name
+        self.precision = precision
     
-    def generate(self, prompt, max_length=100, num_return=1, temperature=0.8):
+    def _stopping_criteria(self, prompt, max_chars, deadline, cancel_token):
+        """Stopping criteria for a pipeline call (max_chars counts the echoed prompt)"""
+        if max_chars is None:
+            return make_stopping_criteria(deadline, cancel_token)
+        
+        tokenizer = self.generator.tokenizer
+        return make_stopping_criteria(
+            deadline, cancel_token,
+            max_chars=max_chars - len(prompt),
+            tokenizer=tokenizer,
+            # The pipeline encodes prompts without special tokens
+            prompt_tokens=len(tokenizer(prompt, add_special_tokens=False)['input_ids'])
+        )
+    
+    def generate(self, prompt, max_length=100, num_return=1, temperature=0.8, on_text=None,
+                 deadline=None, cancel_token=None, max_chars=None):
         """
         Generate text from a prompt
         
@@ -32,10 +53,28 @@ class TextGenerator:
             max_length: Maximum total length (prompt + generated)
             num_return: Number of different generations to return
             temperature: Creativity (0.1=conservative, 1.5=creative)
+            on_text: Optional callback receiving generated text as it is
+                produced (only with num_return=1)
+            deadline: time.monotonic() value at which to stop and return
+                the text so far (see generation_control.deadline_after)
+            cancel_token: CancellationToken that stops generation early
+            max_chars: Longest text wanted, prompt included (e.g. 1024 for
+                an embed field); decoding stops once it is filled and the
+                text is trimmed to it
             
         Returns:
             Generated text or list of texts
         """
+        if (cancel_token is not None and cancel_token.cancelled) or (
+                max_chars is not None and len(prompt) >= max_chars):
+            # Cancelled while it waited for a worker, or no room left
+            text = prompt[:max_chars]
+            return text if num_return == 1 else [text] * num_return
+        
+        stream_kwargs = {}
+        if on_text is not None and num_return == 1:
+            stream_kwargs['streamer'] = make_streamer(self.generator.tokenizer, on_text)
+        
         results = self.generator(
             prompt,
             max_new_tokens=max_length,
@@ -44,35 +83,50 @@ class TextGenerator:
             do_sample=True,
             top_k=50,
             top_p=0.95,
-            pad_token_id=self.generator.tokenizer.eos_token_id
+            pad_token_id=self.generator.tokenizer.eos_token_id,
+            stopping_criteria=self._stopping_criteria(prompt, max_chars, deadline, cancel_token),
+            **stream_kwargs
         )
         
+        texts = [r['generated_text'][:max_chars] for r in results]
         if num_return == 1:
-            return results[0]['generated_text']
+            return texts[0]
         else:
-            return [r['generated_text'] for r in results]
+            return texts
+    
+    def warmup(self):
+        """Run one small forward pass so the first real request is fast"""
+        self.generate("Hello", max_length=2)
     
-    def complete_sentence(self, text, max_new_tokens=50):
+    def complete_sentence(self, text, max_new_tokens=50, deadline=None, cancel_token=None,
+                          max_chars=None):
         """
         Complete an incomplete sentence
         
         Args:
             text: Incomplete text
             max_new_tokens: Max tokens to add
+            deadline: time.monotonic() value at which to stop early
+            cancel_token: CancellationToken that stops generation early
+            max_chars: Longest text wanted, the incomplete text included
             
         Returns:
             Completed text
         """
+        if max_chars is not None and len(text) >= max_chars:
+            return text[:max_chars]
+        
         result = self.generator(
             text,
             max_new_tokens=max_new_tokens,
             num_return_sequences=1,
             temperature=0.7,
             do_sample=True,
-            pad_token_id=self.generator.tokenizer.eos_token_id
+            pad_token_id=self.generator.tokenizer.eos_token_id,
+            stopping_criteria=self._stopping_criteria(text, max_chars, deadline, cancel_token)
         )
         
-        return result[0]['generated_text']
+        return result[0]['generated_text'][:max_chars]
 
 
 # Example usage
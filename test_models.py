@@ -98,6 +98,720 @@ def test_qa():
     print(f"Question: {question}")
     print(f"Answer: {result['answer']}")
     print(f"Confidence: {result['confidence']:.2f}\n")
+    
+    # Batched questions should agree with answering one at a time
+    questions = ["Who created Python?", "When was Python created?"]
+    results = qa.answer_multiple(questions, context)
+    for question, result in zip(questions, results):
+        assert result['answer'] == qa.answer(question, context)['answer']
+        print(f"{question} -> {result['answer']}")
+    print()
+
+
+def test_inference_server():
+    print("=" * 50)
+    print("TESTING INFERENCE SERVER (loopback)")
+    print("=" * 50)
+    
+    import asyncio
+    import socket
+    import threading
+    from models.chatbot import ConversationState
+    from models.inference_client import InferenceClient, InferenceError
+    from models.inference_server import InferenceServer
+    from models.model_registry import ModelRegistry
+    
+    class EchoModel:
+        """Stand-in model without weights, so this test downloads nothing"""
+        def analyze_batch(self, texts):
+            return [{'label': text.upper(), 'batch_size': len(texts)} for text in texts]
+        
+        def respond(self, text, state=None, on_text=None):
+            for word in text.split():
+                on_text(word + " ")
+            state.add_turn([len(text)])
+            return text
+    
+    registry = ModelRegistry(warmup=False)
+    registry.register('echo', EchoModel)
+    server = InferenceServer(registry, methods={'echo': ('analyze_batch', 'respond')}, batch_max_wait_ms=50)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    address = asyncio.run_coroutine_threadsafe(server.start("127.0.0.1:0"), loop).result()
+    client = InferenceClient(address, pool_size=2)
+    
+    # Four "shards" at once: their calls should share batches on the server
+    texts = [f"message {i}" for i in range(4)]
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+    
+    def shard(i):
+        barrier.wait()
+        results[i] = client.call('echo', 'analyze_batch', [texts[i]])[0]
+    
+    threads = [threading.Thread(target=shard, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [r['label'] for r in results] == [t.upper() for t in texts]
+    batching = server.stats()['batching']['echo.analyze_batch']
+    assert batching['batches'] < len(texts)
+    print(f"Batched: {batching['items']} items in {batching['batches']} batch(es)")
+    
+    # Streaming, and conversation state kept in sync with the server
+    state = ConversationState()
+    chunks = []
+    reply = client.call('echo', 'respond', "hello there", state=state, on_text=chunks.append)
+    assert reply == "hello there" and "".join(chunks) == "hello there "
+    assert state.turns == [[11]]
+    print(f"Streamed: {chunks}, history: {state.turns}")
+    
+    # Only whitelisted methods can be called
+    for method in ('missing_method', '__init__', 'analyze'):
+        try:
+            client.call('echo', method)
+            raise AssertionError("expected an InferenceError")
+        except InferenceError as e:
+            print(f"Refused: {e}")
+    
+    assert client.stats()['connections'] <= 2
+    print(f"Client: {client.stats()}\n")
+    client.close()
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    
+    # A server that accepts requests but never answers fails them after the timeout
+    silent = socket.create_server(("127.0.0.1", 0))
+    client = InferenceClient(f"127.0.0.1:{silent.getsockname()[1]}", request_timeout=0.2)
+    try:
+        client.call('echo', 'analyze_batch', ["hello"])
+        raise AssertionError("expected a TimeoutError")
+    except TimeoutError as e:
+        print(f"Timed out: {e}\n")
+    assert client.stats()['in_flight'] == 0
+    client.close()
+    silent.close()
+
+
+def test_inference_scheduling():
+    print("=" * 50)
+    print("TESTING INFERENCE SCHEDULING")
+    print("=" * 50)
+    
+    import asyncio
+    import threading
+    from models.inference_executor import InferenceExecutor
+    
+    async def run():
+        executor = InferenceExecutor(max_workers=2)
+        started = []
+        release = threading.Event()
+        
+        def job(name, wait=True):
+            started.append(name)
+            if wait:
+                release.wait(5)
+            return name
+        
+        # A burst of generations holds one worker and leaves the other free
+        generations = [
+            asyncio.create_task(executor.run('generator', job, f"generate {i}", tenant=(1, 1)))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        assert executor.stats()['generation']['running'] == 1
+        
+        # QA takes the free worker instead of queueing behind generation
+        qa = await asyncio.wait_for(executor.run('qa', job, "qa", False, tenant=(2, 2)), 1)
+        assert qa == "qa" and started == ["generate 0", "qa"]
+        
+        # With every worker busy, queued jobs start by priority
+        executor.class_workers['qa'] = 2
+        blocker = asyncio.create_task(executor.run('qa', job, "qa blocker", tenant=(2, 2)))
+        await asyncio.sleep(0.05)
+        queued = [
+            asyncio.create_task(executor.run(key, job, key, False, tenant=(3, 3)))
+            for key in ('qa', 'sentiment', 'moderator')
+        ]
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(blocker, *queued, *generations)
+        order = started[3:]
+        assert order.index('moderator') < order.index('sentiment') < order.index('qa')
+        assert order.index('qa') < order.index('generate 1')
+        print(f"Start order: {started}")
+        executor.shutdown()
+    
+    asyncio.run(run())
+    print()
+
+
+def test_micro_batcher():
+    print("=" * 50)
+    print("TESTING MICRO-BATCHING")
+    print("=" * 50)
+    
+    import asyncio
+    from models.micro_batcher import MicroBatcher
+    
+    calls = []
+    
+    def shout_batch(texts, suffix="!"):
+        calls.append(len(texts))
+        return [text.upper() + suffix for text in texts]
+    
+    async def run():
+        batcher = MicroBatcher(shout_batch, max_batch_size=4, max_wait_ms=20)
+    
+        # Ten concurrent requests run as full batches of four plus a timed-out rest
+        results = await asyncio.gather(*[batcher.submit(f"message {i}") for i in range(10)])
+        assert results == [f"MESSAGE {i}!" for i in range(10)]
+        assert sorted(calls) == [2, 4, 4]
+    
+        # Requests with different options never share a batch
+        calls.clear()
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b", suffix="?"), batcher.submit("c")
+        )
+        assert results == ["A!", "B?", "C!"]
+        assert sorted(calls) == [1, 2]
+    
+        # A failing batch fails each of its callers
+        def broken_batch(texts):
+            raise ValueError("model failed")
+    
+        broken = MicroBatcher(broken_batch, max_wait_ms=1)
+        outcomes = await asyncio.gather(broken.submit("x"), broken.submit("y"), return_exceptions=True)
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+        print(f"Batches: {batcher.stats()}")
+    
+    asyncio.run(run())
+    print()
+
+
+def test_result_cache():
+    print("=" * 50)
+    print("TESTING RESULT CACHE")
+    print("=" * 50)
+    
+    import tempfile
+    import time
+    from models.result_cache import ResultCache, cached_batch
+    
+    # LRU: the least recently used result is evicted first
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", {'label': 'a'})
+    cache.put("b", {'label': 'b'})
+    cache.get("a")
+    cache.put("c", {'label': 'c'})
+    assert cache.get("b") is None and cache.get("a") == {'label': 'a'}
+    assert cache.stats()['evictions'] == 1
+    
+    # Hits are copies, so callers can't change the cached result
+    cache.get("a")['label'] = 'changed'
+    assert cache.get("a") == {'label': 'a'}
+    
+    # TTL: expired results are misses
+    cache = ResultCache(ttl_seconds=0.05)
+    cache.put("a", 1)
+    time.sleep(0.1)
+    assert cache.get("a") is None and cache.stats()['expirations'] == 1
+    
+    # Identical texts in one batch are computed once
+    cache = ResultCache()
+    computed = []
+    
+    def compute(texts):
+        computed.extend(texts)
+        return [{'text': text} for text in texts]
+    
+    results = cached_batch(cache, ["k1", "k2", "k1"], ["x", "y", "x"], compute)
+    assert [r['text'] for r in results] == ["x", "y", "x"] and computed == ["x", "y"]
+    cached_batch(cache, ["k1", "k2"], ["x", "y"], compute)
+    assert computed == ["x", "y"]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.db")
+    
+        # Disk round-trip: buffered results are readable before and after a flush
+        cache = ResultCache(db_path=db_path, flush_every=3, flush_interval=60)
+        cache.put("a", {'label': 'a'})
+        cache.put("b", {'label': 'b'})
+        assert cache._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+        cache.put("c", {'label': 'c'})
+        assert cache._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 3
+    
+        restarted = ResultCache(db_path=db_path)
+        assert restarted.get("b") == {'label': 'b'} and restarted.stats()['disk_hits'] == 1
+    
+        # The disk tier keeps only the newest max_disk_entries results
+        bounded = ResultCache(db_path=db_path, max_disk_entries=4, flush_every=1)
+        for key in "defg":
+            bounded.put(key, {'label': key})
+        bounded.prune()
+        keys = [row[0] for row in bounded._db.execute("SELECT key FROM results ORDER BY rowid")]
+        assert keys == list("defg")
+        print(f"Disk tier after pruning: {keys}")
+    
+    print(f"Cache: {cache.stats()}\n")
+
+
+def test_knowledge_base():
+    print("=" * 50)
+    print("TESTING RETRIEVAL & KNOWLEDGE BASE")
+    print("=" * 50)
+    
+    from models.knowledge_base import KnowledgeBase
+    from models.retrieval import BM25Index, chunk_text
+    
+    # Chunks overlap, cover the whole text, and are cut at whitespace
+    text = " ".join(f"word{i}" for i in range(300))
+    chunks = chunk_text(text, chunk_size=200, overlap=50)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(text)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert start < end and text[start - 1] == " "
+    
+    # The chunk with the rarer query terms ranks first
+    index = BM25Index([
+        "Discord is a messaging platform launched in 2015.",
+        "Python was created by Guido van Rossum.",
+        "Servers are communities on the Discord platform.",
+    ])
+    ranked = index.search("Who created Python?", top_k=2)
+    assert ranked[0][0] == 1 and ranked[0][1] > ranked[1][1]
+    
+    kb = KnowledgeBase(db_path=":memory:", chunk_size=200, overlap=40)
+    python_doc = kb.add_document(1, "Python", "Python was created by Guido van Rossum and first released in 1991.")
+    kb.add_document(1, "Discord", "Discord is a VoIP and instant messaging platform launched in 2015.")
+    kb.add_document(2, "Other server", "Python is also a snake.")
+    
+    results = kb.search(1, "Who created Python?")
+    assert results[0]['title'] == "Python"
+    assert all(result['title'] != "Other server" for result in results)
+    print(f"Best match: [{results[0]['title']}] {results[0]['score']:.2f}")
+    
+    # Removing a document takes its index entries with it
+    assert kb.remove_document(1, python_doc['id'])
+    assert not kb.remove_document(2, python_doc['id'])
+    assert [r['title'] for r in kb.search(1, "Who created Python?")] == []
+    assert [r['title'] for r in kb.search(1, "When was Discord launched?")] == ["Discord"]
+    print(f"Store: {kb.stats()}")
+    
+    # Per-guild quotas on document count and stored text
+    kb = KnowledgeBase(db_path=":memory:", max_documents=2, max_mb=0.001)
+    kb.add_document(1, "First", "a" * 400)
+    for title, text in (("Too big", "b" * 700), ("Fits", "c" * 100), ("Third", "d")):
+        try:
+            kb.add_document(1, title, text)
+            assert title == "Fits"
+        except ValueError as e:
+            print(f"Refused {title}: {e}")
+    kb.add_document(2, "Other server", "e" * 1000)
+    assert [d['title'] for d in kb.list_documents(1)] == ["First", "Fits"]
+    print()
+
+
+def test_batch_worker():
+    print("=" * 50)
+    print("TESTING BATCH WORKER QUEUE POLICIES")
+    print("=" * 50)
+    
+    import asyncio
+    from models.batch_worker import BatchWorker
+    
+    async def run(policy):
+        processed = []
+    
+        async def process(batch):
+            processed.append(list(batch))
+    
+        worker = BatchWorker(process, max_queue=3, max_batch_size=2, max_wait_ms=1, policy=policy)
+        # put() only waits under "block", so without it the worker gets no
+        # chance to drain the queue during this burst
+        accepted = [await worker.put(i) for i in range(5)]
+        await asyncio.sleep(0.1)
+        await worker.stop()
+        assert all(len(batch) <= 2 for batch in processed)
+        return accepted, [item for batch in processed for item in batch], worker.stats()
+    
+    accepted, items, stats = asyncio.run(run("drop_oldest"))
+    assert accepted == [True] * 5 and items == [2, 3, 4] and stats['dropped'] == 2
+    
+    accepted, items, stats = asyncio.run(run("drop_newest"))
+    assert accepted == [True, True, True, False, False] and items == [0, 1, 2] and stats['dropped'] == 2
+    
+    accepted, items, stats = asyncio.run(run("block"))
+    assert accepted == [True] * 5 and items == [0, 1, 2, 3, 4] and stats['dropped'] == 0
+    assert stats['max_depth'] == 3
+    print(f"Blocking producer: {stats}")
+    
+    try:
+        BatchWorker(None, policy="drop_random")
+        raise AssertionError("expected a ValueError")
+    except ValueError as e:
+        print(f"Refused: {e}\n")
+
+
+def test_mood_tracker():
+    print("=" * 50)
+    print("TESTING MOOD TRACKER")
+    print("=" * 50)
+    
+    from models.mood_tracker import MoodTracker
+    
+    positive = {'label': 'POSITIVE', 'score': 1.0}
+    negative = {'label': 'NEGATIVE', 'score': 0.5}
+    assert MoodTracker.polarity(positive) == 1.0 and MoodTracker.polarity(negative) == -0.5
+    assert MoodTracker.polarity({'label': 'neutral', 'score': 0.9}) == 0.0
+    
+    # Ten-second buckets for the last minute, one-minute buckets for ten minutes
+    tracker = MoodTracker(resolutions=((10, 6), (60, 10)))
+    key = ('channel', 1)
+    start = 6000.0
+    tracker.record(key, positive, start)
+    tracker.record(key, negative, start + 5)
+    mood = tracker.query(key, 10, now=start + 5)
+    assert mood['messages'] == 2 and mood['positive'] == 0.5 and mood['mood'] == 0.25
+    
+    # A minute later the fine ring has come round to the same slot: the old
+    # bucket is reset instead of added to, and the coarse ring still has it
+    tracker.record(key, negative, start + 60)
+    assert tracker.query(key, 10, now=start + 60)['messages'] == 1
+    assert tracker.query(key, 120, now=start + 60)['messages'] == 3
+    
+    # Results older than a ring's horizon are ignored by that ring
+    tracker.record(key, positive, start)
+    assert tracker.query(key, 10, now=start + 60)['messages'] == 1
+    
+    # Windows longer than every ring use the coarsest one
+    assert tracker.query(key, 86400, now=start + 60)['messages'] == 4
+    assert tracker.query(('channel', 2), 60, now=start)['messages'] == 0
+    assert tracker.num_keys() == 1
+    print(f"Last 2 minutes: {tracker.query(key, 120, now=start + 60)}\n")
+
+
+def test_conversation_store():
+    print("=" * 50)
+    print("TESTING CONVERSATION STORE")
+    print("=" * 50)
+    
+    import tempfile
+    import time
+    from models.conversation_store import ConversationStore, pack_turns, unpack_turns
+    
+    turns = [[101, 102, 50256], [], [7, 70000]]
+    assert unpack_turns(*pack_turns(turns)) == turns
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "conversations.db")
+        evicted = []
+        store = ConversationStore(max_resident=2, idle_ttl=0.05, db_path=db_path, on_evict=evicted.append)
+    
+        # LRU: the third user spills the least recently used one to disk
+        for user_id in ("alice", "bob", "carol"):
+            with store.use(user_id) as state:
+                state.add_turn([len(user_id), 1, 2])
+        stats = store.stats()
+        assert stats['resident'] == 2 and stats['stored'] == 3 and len(evicted) == 1
+    
+        # ...and reads it back when that user chats again
+        with store.use("alice") as state:
+            assert state.turns == [[5, 1, 2]]
+        assert store.stats()['loads'] == 1
+    
+        # A held conversation is never evicted, even over the limit
+        held = store.acquire("bob")
+        for user_id in ("dave", "erin"):
+            with store.use(user_id) as state:
+                state.add_turn([1])
+        assert "bob" in store._resident
+        store.release("bob")
+    
+        # Idle conversations are spilled after idle_ttl
+        time.sleep(0.1)
+        assert store.evict_idle() == 2 and store.stats()['resident'] == 0
+    
+        # Histories survive a restart, trimmed to a smaller budget
+        restarted = ConversationStore(max_history_tokens=2, db_path=db_path)
+        with restarted.use("dave") as state:
+            assert state.turns == [[1]]
+        with restarted.use("bob") as state:
+            assert state.turns == [] and held.turns == [[3, 1, 2]]
+    
+        assert restarted.reset("dave") and not restarted.reset("nobody")
+        print(f"Store: {store.stats()}\n")
+
+
+def test_generation_control():
+    print("=" * 50)
+    print("TESTING GENERATION STOPPING CRITERIA")
+    print("=" * 50)
+    
+    import time
+    import torch
+    from models.generation_control import (
+        CancellationToken, deadline_after, expired, make_stopping_criteria
+    )
+    
+    class CharTokenizer:
+        """Stand-in tokenizer: every token ID decodes to one character"""
+        def batch_decode(self, ids, skip_special_tokens=True):
+            return ["x" * len(row) for row in ids.tolist()]
+    
+    # Two sequences: a 2-token prompt followed by 3 new tokens
+    input_ids = torch.zeros((2, 5), dtype=torch.long)
+    
+    assert make_stopping_criteria() is None
+    assert not expired(None) and not expired(deadline_after(60))
+    assert deadline_after(None) is None
+    
+    deadline = deadline_after(0.01)
+    criteria = make_stopping_criteria(deadline=deadline)
+    time.sleep(0.02)
+    assert criteria(input_ids, None).tolist() == [True, True]
+    
+    token = CancellationToken()
+    criteria = make_stopping_criteria(cancel_token=token)
+    assert criteria(input_ids, None).tolist() == [False, False]
+    token.cancel()
+    assert token.cancelled and criteria(input_ids, None).tolist() == [True, True]
+    
+    # The character budget only counts new tokens
+    for max_chars, expected in ((3, [True, True]), (4, [False, False])):
+        criteria = make_stopping_criteria(max_chars=max_chars, tokenizer=CharTokenizer(), prompt_tokens=2)
+        assert criteria(input_ids, None).tolist() == expected
+    print("Deadline, cancellation and character budget stop generation\n")
+
+
+def test_model_size_estimate():
+    print("=" * 50)
+    print("TESTING MODEL SIZE ESTIMATE")
+    print("=" * 50)
+    
+    import torch
+    from models.model_registry import estimate_model_bytes
+    from models.precision import apply_precision
+    
+    model = torch.nn.Sequential(torch.nn.Linear(256, 256))
+    assert estimate_model_bytes(model) == (256 * 256 + 256) * 4
+    
+    # An int8 layer is counted once: its packed weight plus its bias
+    quantized = apply_precision(model, "int8")
+    weight, bias = quantized[0]._packed_params._weight_bias()
+    expected = weight.numel() * weight.element_size() + bias.numel() * bias.element_size()
+    assert estimate_model_bytes(quantized) == expected
+    print(f"int8 layer: {expected} bytes\n")
+
+
+def test_model_registry():
+    print("=" * 50)
+    print("TESTING MODEL REGISTRY")
+    print("=" * 50)
+    
+    import time
+    from models.model_registry import ModelRegistry
+    
+    class FakeModel:
+        """Stand-in model that reports a fixed size, so this test downloads nothing"""
+        def __init__(self, size_mb):
+            self.weight_bytes = int(size_mb * 1024 * 1024)
+    
+        def parameters(self):
+            return []
+    
+        def buffers(self):
+            return []
+    
+        def modules(self):
+            return [self]
+    
+    registry = ModelRegistry(memory_budget_mb=2.5, idle_timeout=0.05, warmup=False)
+    for name in ('a', 'b', 'c'):
+        registry.register(name, lambda: FakeModel(1), size_hint_mb=1)
+    
+    # LRU: loading a third model unloads the least recently used one
+    registry.get('a')
+    registry.get('b')
+    registry.get('a')
+    registry.get('c')
+    assert [registry.is_loaded(name) for name in 'abc'] == [True, False, True]
+    
+    # A model in use is never unloaded, even when that means going over budget...
+    with registry.use('c'):
+        registry.get('b')
+        assert not registry.is_loaded('a')
+        with registry.use('b'):
+            registry.get('a')
+            assert registry.resident_bytes() == 3 * 1024 * 1024
+        # ...and the budget is enforced again once it is released
+        assert registry.resident_bytes() <= registry.memory_budget
+        assert registry.is_loaded('b') and registry.is_loaded('c')
+    
+    # Idle models are unloaded after idle_timeout
+    time.sleep(0.1)
+    assert sorted(registry.evict_idle()) == ['b', 'c']
+    stats = registry.stats()
+    assert stats['total']['resident_mb'] == 0 and stats['a']['evictions'] == 2
+    print(f"Registry: {stats['total']}\n")
+
+
+def test_cascade_moderator():
+    print("=" * 50)
+    print("TESTING CASCADE MODERATION ROUTING")
+    print("=" * 50)
+    
+    from models.cascade_moderator import CascadeModerator
+    
+    class StubModerator:
+        """Stand-in transformer tier that records what it was asked to check"""
+        def __init__(self, scores):
+            self.scores = scores
+            self.checked = []
+    
+        def check_batch(self, texts, threshold=0.7, batch_size=32):
+            self.checked.extend(texts)
+            return [
+                {'is_inappropriate': self.scores.get(text, 0.0) >= threshold, 'label': 'toxic',
+                 'confidence': self.scores.get(text, 0.0)}
+                for text in texts
+            ]
+    
+    class StubLinearModel:
+        """Stand-in for LexicalModel with fixed toxicity scores"""
+        samples = 10000
+    
+        def __init__(self, scores):
+            self.scores = scores
+            self.learned = []
+    
+        def predict(self, texts):
+            return [self.scores[text] for text in texts]
+    
+        def learn(self, texts, labels):
+            self.learned.extend(zip(texts, labels))
+    
+        def sync(self):
+            pass
+    
+    toxic_bert = StubModerator({"you are stupid": 0.95, "borderline remark": 0.5})
+    hate = StubModerator({"borderline remark": 0.9})
+    linear = StubLinearModel({"nice play": 0.01, "see you tomorrow": 0.01, "borderline remark": 0.4})
+    cascade = CascadeModerator(toxic_bert, hate_moderator=hate, linear_model=linear, audit_rate=0.0)
+    
+    texts = ["😂😂😂", "nice play", "you are stupid", "borderline remark"]
+    results = cascade.check_batch(texts)
+    
+    # No letters, or a confident linear model verdict: cleared without toxic-bert
+    assert results[0]['tier'] == 1 and results[1]['tier'] == 1
+    assert not results[0]['is_inappropriate'] and not results[1]['is_inappropriate']
+    # A wordlist hit always goes to toxic-bert, whatever the linear model says
+    assert results[2]['tier'] == 2 and results[2]['is_inappropriate']
+    # An uncertain score escalates, and toxic-bert's borderline result reaches the hate tier
+    assert results[3]['tier'] == 3 and results[3]['is_inappropriate']
+    assert toxic_bert.checked == ["you are stupid", "borderline remark"]
+    assert hate.checked == ["borderline remark"]
+    # toxic-bert's labels teach the linear model
+    assert linear.learned == [("you are stupid", 1), ("borderline remark", 0)]
+    
+    # Audits send cleared messages to toxic-bert but keep the tier 1 result
+    cascade.audit_rate = 1.0
+    toxic_bert.scores["see you tomorrow"] = 0.9
+    result = cascade.check("see you tomorrow")
+    assert result['tier'] == 1 and not result['is_inappropriate']
+    stats = cascade.stats()
+    assert stats['audits'] == 1 and stats['audit_misses'] == 1 and stats['tier2'] == 2
+    print(f"Cascade: {stats}\n")
+
+
+def test_process_pool():
+    print("=" * 50)
+    print("TESTING PROCESS POOL")
+    print("=" * 50)
+    
+    import signal
+    import time
+    from models.process_pool import ProcessPool
+    
+    class PidModel:
+        """Stand-in model that reports which worker ran it"""
+        def whoami(self, delay=0.0):
+            time.sleep(delay)
+            return os.getpid()
+    
+    # Generous timeout: a cold worker can take seconds to import torch
+    pool = ProcessPool({'pid': PidModel()}, num_workers=2, threads_per_worker=1, call_timeout=60)
+    try:
+        # Concurrent jobs go to the least busy worker, so each worker gets one
+        futures = [pool.submit('pid', 'whoami', 0.5) for _ in range(2)]
+        pids = {future.result(timeout=60) for future in futures}
+        assert pids == {worker['pid'] for worker in pool.stats()}
+    
+        try:
+            pool.call('pid', 'missing_method')
+            raise AssertionError("expected an AttributeError")
+        except AttributeError as e:
+            print(f"Refused: {e}")
+    
+        # A worker that dies fails its pending jobs instead of hanging them
+        future = pool.submit('pid', 'whoami', 30)
+        victim = next(worker['pid'] for worker in pool.stats() if worker['pending'])
+        os.kill(victim, signal.SIGKILL)
+        try:
+            future.result(timeout=30)
+            raise AssertionError("expected a RuntimeError")
+        except RuntimeError as e:
+            print(f"Lost job: {e}")
+    
+        # The surviving worker keeps serving
+        assert pool.call('pid', 'whoami') != victim
+    finally:
+        pool.shutdown()
+    
+    assert not any(worker['alive'] for worker in pool.stats())
+    try:
+        pool.submit('pid', 'whoami')
+        raise AssertionError("expected a RuntimeError")
+    except RuntimeError as e:
+        print(f"After shutdown: {e}\n")
+
+
+def test_length_buckets():
+    print("=" * 50)
+    print("TESTING LENGTH-BUCKETED BATCHING")
+    print("=" * 50)
+    
+    import random
+    from models.batching import length_buckets, run_bucketed
+    
+    rng = random.Random(0)
+    lengths = [rng.randint(1, 512) for _ in range(200)]
+    buckets = length_buckets(lengths, max_batch_size=16, max_batch_tokens=4096)
+    
+    # Every index exactly once, and no bucket over either limit
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+    for bucket in buckets:
+        assert len(bucket) <= 16
+        assert len(bucket) == 1 or len(bucket) * max(lengths[i] for i in bucket) <= 4096
+    assert length_buckets([]) == []
+    
+    class WordPipeline:
+        """Stand-in pipeline: one token per word, output records its batch"""
+        def __init__(self):
+            self.batches = []
+            self.tokenizer = lambda texts, truncation=True: {'input_ids': [t.split() for t in texts]}
+    
+        def __call__(self, texts, batch_size, truncation=True):
+            self.batches.append(len(texts))
+            return [{'text': text} for text in texts]
+    
+    # Outputs come back in the original order, whatever the bucketing did
+    texts = [" ".join(["word"] * n) for n in (9, 1, 5, 1, 9, 5)]
+    pipe = WordPipeline()
+    results = run_bucketed(pipe, texts, max_batch_size=2)
+    assert [r['text'] for r in results] == texts
+    assert pipe.batches == [2, 2, 2]
+    print(f"{len(lengths)} items in {len(buckets)} buckets\n")
 
 
 if __name__ == "__main__":
@@ -109,6 +823,20 @@ if __name__ == "__main__":
         test_moderator()
         test_generator()
         test_qa()
+        test_inference_server()
+        test_inference_scheduling()
+        test_micro_batcher()
+        test_result_cache()
+        test_knowledge_base()
+        test_batch_worker()
+        test_mood_tracker()
+        test_conversation_store()
+        test_generation_control()
+        test_model_size_estimate()
+        test_model_registry()
+        test_cascade_moderator()
+        test_process_pool()
+        test_length_buckets()
         
         print("=" * 50)
         print("✅ ALL TESTS COMPLETED!")